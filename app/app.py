@@ -1,34 +1,67 @@
 import os
-import uuid
+import shutil
+import threading
 import time
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-from utils.cleaner import clean_data
-from utils.fd_checker import FunctionalDependencyChecker
-from utils.first_nf_checker import to_first_nf
-from utils.second_nf_checker import SecondNFChecker
-from utils.third_nf_checker import Semantic3NFPrefixDecomposer
-from utils.er_generator import generate_er_diagram
+from html import escape
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.er_generator import ERRenderCache
+from utils.step_cache import StepCache, file_digest
+from utils.compression import MIN_COMPRESS_BYTES, compress_body, compress_chunks, negotiate
+from utils.columnar_store import LazyFrame, columnar_path, csv_shape, frame_shape, ingest_csv
+from utils.dtype_profile import load_profile
+from utils.fingerprints import compare_fingerprints, prefix_fingerprints
+from utils.result_preview import csv_page_payload, page_payload, preview_info, preview_table_html
+from utils.jobs import JobManager
+from utils.metrics import MetricsRegistry, StepMeter, profile_call
+from utils.pipeline import DEFAULT_CONFIG, Pipeline, cache_steps, validate_options, validate_steps
+from utils.storage_gc import collect_garbage
+from utils.third_nf_checker import tables_tabular_html
+from utils.upload_store import UploadStore, UploadTooLarge
 from tabulate import tabulate
 
 app = Flask(__name__)
 app.secret_key = "secret"
 UPLOAD_FOLDER = 'uploads'
 ER_FOLDER = os.path.join('static', 'er_diagrams')
+SQL_FOLDER = os.path.join('static', 'sql_exports')
+CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'step_cache')
+PROFILE_FOLDER = os.path.join(UPLOAD_FOLDER, 'profiles')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(ER_FOLDER, exist_ok=True)
-
-def step_order(step):
-    """Defines the ETL hierarchy order (lower is earlier)."""
-    order = {
-        "clean": 0,
-        "fd": 1,
-        "1nf": 2,
-        "2nf": 3,
-        "3nf": 4,
-        "er": 5
-    }
-    return order.get(step, -1)
+os.makedirs(SQL_FOLDER, exist_ok=True)
+# SQL exports are served for download like the ER diagrams
+app.config.setdefault("EXPORT_FOLDER", SQL_FOLDER)
+# FD results of earlier uploads, reused when a changed version of a file is uploaded
+app.config.setdefault("FD_STORE_FOLDER", os.path.join(UPLOAD_FOLDER, 'fd_store'))
+# Step engine settings (1NF limits, streaming thresholds, FD workers, ...): see utils.pipeline
+for key, value in DEFAULT_CONFIG.items():
+    app.config.setdefault(key, value)
+app.config.setdefault("STEP_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+app.config.setdefault("JOB_WORKERS", 4)
+app.config.setdefault("FD_PROCESS_WORKERS", None)
+app.config.setdefault("ER_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+# Per-step peak memory via tracemalloc; several times slower, so off unless diagnosing
+app.config.setdefault("METRICS_TRACE_MEMORY", False)
+# Largest upload; requests announcing more are refused before their body is read
+app.config.setdefault("MAX_CONTENT_LENGTH", 2 * 1024 * 1024 * 1024)
+app.config.setdefault("UPLOAD_CHUNK_SIZE", 1024 * 1024)
+# Retention of uploads, intermediates, ER diagrams and SQL exports (see utils.storage_gc);
+# checked after uploads, at most every STORAGE_GC_INTERVAL seconds
+app.config.setdefault("STORAGE_MAX_AGE_SECONDS", 7 * 24 * 3600)
+app.config.setdefault("STORAGE_MAX_BYTES", 10 * 1024 * 1024 * 1024)
+app.config.setdefault("STORAGE_MIN_AGE_SECONDS", 3600)
+app.config.setdefault("STORAGE_GC_INTERVAL", 600)
+# Longest gap between progress lines of a streamed job
+app.config.setdefault("STREAM_HEARTBEAT_SECONDS", 1.0)
+step_cache = StepCache(CACHE_FOLDER, max_bytes=app.config["STEP_CACHE_MAX_BYTES"])
+er_cache = ERRenderCache(ER_FOLDER, max_bytes=app.config["ER_CACHE_MAX_BYTES"])
+metrics_registry = MetricsRegistry()
+upload_store = UploadStore(UPLOAD_FOLDER, max_bytes=app.config["MAX_CONTENT_LENGTH"],
+                           chunk_size=app.config["UPLOAD_CHUNK_SIZE"])
+job_manager = JobManager(max_workers=app.config["JOB_WORKERS"], cpu_workers=app.config["FD_PROCESS_WORKERS"])
+# Rendered diagrams go through the shared, content-addressed cache
+pipeline = Pipeline(app.config, render_er=lambda tables, format, layout: er_cache.render(tables, format=format, layout=layout))
 
 @app.route("/", methods=["GET"])
 def index():
@@ -36,131 +69,521 @@ def index():
 
 @app.route("/upload_csv", methods=["POST"])
 def upload_csv():
-    file = request.files.get('csv')
-    if file and file.filename.endswith('.csv'):
-        abspath = save_temp_file(file)
-        df = pd.read_csv(abspath)
-        html = f"<h4>Uploaded: {file.filename}</h4><pre>Rows: {df.shape[0]}, Columns: {df.shape[1]}</pre>"
-        return jsonify({"csv_path": abspath, "html": html})
+    """
+    Stores an uploaded CSV, either the raw request body (file name in the
+    `filename` query argument) or the `csv` field of a multipart form. The
+    body is streamed to disk while it is hashed; identical uploads are
+    stored once.
+    """
+    if request.mimetype == "multipart/form-data":
+        file = request.files.get('csv')
+        filename, stream = (file.filename, file.stream) if file else (None, None)
     else:
+        filename, stream = request.args.get("filename"), request.stream
+    if not filename or not filename.endswith('.csv'):
         return jsonify({"error": "Please upload a valid CSV file."}), 400
+    if request.content_length and request.content_length > shutil.disk_usage(UPLOAD_FOLDER).free:
+        return jsonify({"error": "Not enough disk space for this upload."}), 507
+    try:
+        upload = upload_store.save(stream, filename)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    abspath = upload["path"]
+    changes = None
+    if is_streaming_upload(abspath):
+        n_rows, n_cols = csv_shape(abspath)
+    else:
+        frame_path = ingest_csv(abspath)
+        n_rows, n_cols = frame_shape(frame_path)
+        changes = upload_changes(frame_path, upload["previous"])
+    schedule_storage_gc()
+    html = f"<h4>Uploaded: {escape(filename)}</h4><pre>Rows: {n_rows}, Columns: {n_cols}</pre>"
+    if upload["deduplicated"]:
+        html += "<div>Same content as an earlier upload: its stored copy and results are reused.</div>"
+    if changes:
+        html += (f"<div>Since the previous upload of this file: {changes['rows']}; "
+                 f"{len(changes['unchanged'])} column(s) unchanged, changed: "
+                 f"{', '.join(map(escape, changes['changed'])) or 'none'}"
+                 + (f", added: {', '.join(map(escape, changes['added']))}" if changes["added"] else "")
+                 + (f", removed: {', '.join(map(escape, changes['removed']))}" if changes["removed"] else "")
+                 + "</div>")
+    return jsonify({"csv_path": abspath, "html": html, "changes": changes, "digest": upload["digest"],
+                    "size": upload["size"], "deduplicated": upload["deduplicated"]})
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({"error": f"Upload exceeds the limit of {app.config['MAX_CONTENT_LENGTH']} bytes."}), 413
+
+def upload_changes(frame_path, previous):
+    """
+    Column changes since the previous upload with the same file name, from
+    the fingerprints in the ingest profiles; None for a first upload.
+    """
+    profile = load_profile(frame_path)
+    previous_profile = load_profile(columnar_path(previous)) if previous else None
+    if not profile or not previous_profile:
+        return None
+    old = {col: stats.get("fingerprint") for col, stats in previous_profile["columns"].items()}
+    new = {col: stats.get("fingerprint") for col, stats in profile["columns"].items()}
+    rows, old_rows = profile["rows"], previous_profile["rows"]
+    if rows > old_rows:
+        # Unchanged columns with rows appended start with the old column
+        new = prefix_fingerprints(LazyFrame(frame_path).load(), old_rows)
+    changes = compare_fingerprints(old, new)
+    changes["rows"] = f"{old_rows} → {rows} rows" if rows != old_rows else "same rows"
+    return changes
+
+_gc_lock = threading.Lock()
+_gc_last_run = 0.0
+
+def schedule_storage_gc():
+    """Applies the retention policy in the background unless it ran within STORAGE_GC_INTERVAL."""
+    global _gc_last_run
+    with _gc_lock:
+        if time.time() - _gc_last_run < app.config["STORAGE_GC_INTERVAL"]:
+            return
+        _gc_last_run = time.time()
+    threading.Thread(target=collect_garbage, daemon=True, kwargs={
+        "folders": [UPLOAD_FOLDER, ER_FOLDER, SQL_FOLDER],
+        "max_age_seconds": app.config["STORAGE_MAX_AGE_SECONDS"],
+        "max_bytes": app.config["STORAGE_MAX_BYTES"],
+        "min_age_seconds": app.config["STORAGE_MIN_AGE_SECONDS"]
+    }).start()
+
+def is_streaming_upload(csv_path):
+    return pipeline.is_streamed("clean", csv_path)
+
+def execute_steps(csv_path, steps, job=None, options=None):
+    """
+    Runs the validated pipeline and returns the result dict. When a `job` is
+    given, per-step progress and partial results are reported to it, FD
+    mining runs on the process pool, and the run stops at the next step
+    boundary once it is cancelled. A step that refuses to run (e.g. an
+    oversized 1NF explosion) returns an error payload. Every computed step's
+    result carries its "metrics" (see utils.metrics).
+    """
+    result = {}
+    for key, value in iter_step_results(csv_path, steps, job, options):
+        if key == "error":
+            return value
+        result[key] = value
+    return result
+
+def cached_prefix(content_hash, steps, keyed_steps):
+    """
+    The longest cached prefix of `keyed_steps` (as step_cache.longest_prefix),
+    ending before the first step whose linked file is gone, e.g. an ER
+    diagram evicted from er_cache or an intermediate removed by the
+    retention policy, so that step runs again. The files of the prefix are
+    marked as used, so the retention policy keeps them while it is reused.
+    """
+    n = len(keyed_steps)
+    while n:
+        n_cached, cached = step_cache.longest_prefix(content_hash, keyed_steps[:n])
+        if cached is None:
+            break
+        files = cached.get("files", {})
+        gone = [idx for idx, step in enumerate(steps[:n_cached]) if step in files and not os.path.exists(files[step])]
+        if not os.path.exists(cached["latest_path"]):
+            # Streamed results are only on disk, and later steps load the frame from it
+            gone.append(n_cached - 1)
+        if not gone:
+            for path in [cached["latest_path"], *files.values()]:
+                upload_store.touch(path)
+            return n_cached, cached
+        n = min(gone)
+    return 0, None
+
+def iter_step_results(csv_path, steps, job=None, options=None):
+    """
+    The pipeline run of execute_steps as a generator: yields (step, result)
+    as soon as each step's result is ready, cached steps first, then
+    ("latest_path", path). A step that refuses to run yields ("error",
+    payload) and ends the run.
+    """
+    options = options or {}
+    keyed_steps = cache_steps(steps, options)
+    # Keeps the upload (and so its intermediates) from being collected while in use
+    upload_store.touch(csv_path)
+    # Resume from the longest step prefix already computed for this upload
+    content_hash = file_digest(csv_path)
+    n_cached, cached = cached_prefix(content_hash, steps, keyed_steps)
+    state = pipeline.new_state(csv_path)
+    result = {}
+    # Files the results link to, by step
+    files = {}
+    if cached is not None:
+        # Cached states are shared: work on a copy
+        state.update({key: cached[key] for key in state})
+        result = dict(cached["result"])
+        files = dict(cached.get("files", {}))
+    for idx in range(n_cached):
+        if job is not None:
+            job.finish_step(idx, result.get(steps[idx]), cached=True)
+        if steps[idx] in result:
+            yield steps[idx], result[steps[idx]]
+    run_cpu = (lambda fn, *args: job_manager.run_cpu(job, fn, *args)) if job is not None else None
 
-def save_temp_file(file):
-    tempname = f"{uuid.uuid4().hex}_{file.filename}"
-    path = os.path.join(UPLOAD_FOLDER, tempname)
-    file.save(path)
-    return os.path.abspath(path)
+    meter = None
+    try:
+        for idx in range(n_cached, len(steps)):
+            step = steps[idx]
+            if job is not None:
+                job.start_step(idx)
+            meter = StepMeter(step, trace_memory=app.config["METRICS_TRACE_MEMORY"]).start()
+            if pipeline.is_streamed(step, csv_path):
+                meter.set_input(nbytes=os.path.getsize(csv_path))
+            else:
+                meter.set_input(pipeline.load(state))
+            outcome = pipeline.run_step(step, state, csv_path, options, run_cpu)
+            if "error" in outcome:
+                yield "error", outcome
+                return
+            # ";": a step tag with several options contains commas
+            result[step] = render_step(step, outcome, state, ";".join(keyed_steps[:idx + 1]))
+            record = meter.stop(state["df"], rows=outcome.get("rows"))
+            if outcome.get("fd_levels") is not None:
+                record["fd_levels"] = outcome["fd_levels"]
+            result[step]["metrics"] = record
+            metrics_registry.observe_step(step, record)
+            if "path" in outcome:
+                files[step] = outcome["path"]
+            elif state["df"] is None:
+                # Pages of a streamed result are read from its file
+                files[step] = state["latest_path"]
+            step_cache.put(content_hash, keyed_steps[:idx + 1], {**state, "result": dict(result), "files": dict(files)})
+            if job is not None:
+                job.finish_step(idx, result.get(step))
+            yield step, result[step]
+    finally:
+        # A failed or refused step (or a client gone mid-stream) must not leave memory tracing on
+        if meter is not None:
+            meter.close()
+    yield "latest_path", state["latest_path"]
+
+def ndjson_response(events):
+    """
+    Streams `events` as NDJSON, one line per event sent as soon as it is
+    produced; compressed (flushed per line) when the client accepts it.
+    """
+    lines = (app.json.dumps(event).encode() + b"\n" for event in events)
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    response = Response(stream_with_context(compress_chunks(lines, encoding) if encoding else lines),
+                        mimetype="application/x-ndjson")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "no-cache"
+    # Proxies must pass lines through instead of buffering the response
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+@app.after_request
+def compress_response(response):
+    """Compresses JSON and HTML responses of MIN_COMPRESS_BYTES or more when the client accepts it."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype == "application/json" or response.mimetype.startswith("text/"))):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+    response.set_data(compress_body(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def render_step(step, outcome, state, result_key):
+    """The UI result of one step: HTML previews (the first page of each table) plus summary data."""
+    page_size = app.config["RESULT_PAGE_SIZE"]
+    df = state["df"]
+    if step == "clean":
+        if df is None:
+            # Streamed: only the head was read back
+            return {
+                "html": preview_table_html(outcome["head"], result_key, page_size=page_size, total_rows=outcome["rows"]),
+                "info": str(outcome["info"]),
+                **preview_info(outcome["head"]),
+                "rows": outcome["rows"]
+            }
+        return {
+            "html": preview_table_html(df, result_key, page_size=page_size),
+            "info": str(outcome["info"]),
+            **preview_info(df)
+        }
+    if step == "fd":
+        if "approximate" in outcome:
+            approximate = outcome["approximate"]
+            fd_table = [[" ,".join(fd["lhs"]), " ,".join(fd["rhs"]), f"{fd['error']:.4f}",
+                         f"{fd['confidence']:.4f}", fd["support"]] for fd in approximate]
+            fd_html = tabulate(fd_table, headers=["LHS", "RHS", "Error", "Confidence", "Support"], tablefmt='html')
+            return {"html": fd_html, "fds": outcome["fds"], "approximate": approximate, "stats": outcome["stats"]}
+        fd_table = [[" ,".join(lhs), " ,".join(rhs)] for lhs, rhs in outcome["fds"]]
+        fd_html = tabulate(fd_table, headers=["LHS", "RHS"], tablefmt='html')
+        reuse = outcome.get("fd_reuse")
+        if reuse is None:
+            return {"html": fd_html, "fds": outcome["fds"]}
+        return {"html": fd_html + fd_reuse_html(reuse), "fds": outcome["fds"], "fd_reuse": reuse}
+    if step == "1nf":
+        summary = outcome["summary"]
+        info_html = f"<div class='nf-status'><b>Info: </b>{summary}</div>" if summary else ""
+        if df is None:
+            # Streamed to disk chunk by chunk
+            table_html = preview_table_html(outcome["head"], result_key, page_size=page_size, total_rows=outcome["rows"])
+            return {"html": f"<h4>Table in 1NF</h4>{table_html}" + info_html, **preview_info(outcome["head"]),
+                    "rows": outcome["rows"]}
+        table_html = preview_table_html(df, result_key, page_size=page_size)
+        return {"html": f"<h4>Table in 1NF</h4>{table_html}" + info_html, **preview_info(df)}
+    if step == "2nf":
+        table_html = preview_table_html(df, result_key, page_size=page_size)
+        status_msg = "<b>Table is in 2NF.</b>" if outcome["is_2nf"] else "<b>Table violates 2NF.</b>"
+        violations_msg = ""
+        if outcome["violations"]:
+            violations_msg = "<ul>" + "".join(
+                f"<li>{', '.join(v['lhs'])} &rarr; {', '.join(v['rhs'])}</li>" for v in outcome["violations"]
+            ) + "</ul>"
+        return {
+            "html": f"<h4>Table for 2NF Check</h4>{table_html}"
+                    + f"<div class='nf-status'>{status_msg}</div>"
+                    + (f"<div><b>Violations:</b>{violations_msg}</div>" if violations_msg else "")
+                    + f"<div><b>Primary Key:</b> {', '.join(outcome['primary_key'])}</div>",
+            **preview_info(df)
+        }
+    if step == "3nf":
+        tables = outcome["tables"]
+        tables_html = tables_tabular_html(tables, page_size=page_size, result_key=result_key)
+        return {
+            "html": f"<h4>3NF Decomposition</h4>{tables_html}",
+            "tables": [{"table_name": t['table_name'], **preview_info(t['df'])} for t in tables]
+        }
+    if step == "sql":
+        return render_sql_export(outcome["path"], outcome["report"])
+    # er
+    er_image_path = f"er_diagrams/{os.path.basename(outcome['path'])}"
+    download = f"<a href='/static/{er_image_path}' download>Download ER Diagram</a>"
+    if outcome["path"].endswith(".gv"):
+        return {"html": f"<div>Graphviz source generated.</div>{download}"}
+    return {"html": f"<img src='/static/{er_image_path}' class='er-diagram'><br>{download}"}
+
+
+def fd_reuse_html(reuse):
+    """What the FD step took over from an earlier upload of the same data."""
+    if reuse["mode"] == "identical":
+        msg = "Same data as an earlier upload: all dependencies reused."
+    elif reuse["mode"] == "revalidated":
+        rows = "rows appended, " if reuse["rows"] == "appended" else ""
+        msg = (f"Reused an earlier upload's results ({rows}{len(reuse['columns_reused'])} column(s) unchanged): "
+               f"{reuse['candidates_reused']} candidate dependencies reused, {reuse['candidates_checked']} checked. "
+               f"Changed columns: {', '.join(map(escape, reuse['columns_changed'])) or 'none'}.")
+    else:
+        return ""
+    return f"<div class='nf-status'>{msg}</div>"
+
+def render_sql_export(path, report):
+    """Load summary per table (rows, rows/sec, keys and the keys left out), the DDL and a download link."""
+    rows = [[escape(t["table"]), t["rows"], f"{t['seconds']:.3f}", t["rows_per_sec"], ", ".join(t["primary_key"]),
+             "<br>".join(escape(note) for note in t["notes"])] for t in report["tables"]]
+    summary = tabulate(rows, headers=["Table", "Rows", "Seconds", "Rows/sec", "Primary Key", "Notes"],
+                       tablefmt="unsafehtml")
+    label = "SQLite database" if report["dialect"] == "sqlite" else "PostgreSQL script (psql -f)"
+    download = f"<a href='/static/sql_exports/{os.path.basename(path)}' download>Download {label}</a>"
+    return {
+        "html": f"<h4>SQL Export</h4>{summary}"
+                + f"<div><b>{report['rows']}</b> rows in {report['seconds']:.3f}s ({report['rows_per_sec']} rows/sec)</div>"
+                + f"<pre>{escape(report['ddl'])}</pre>{download}",
+        "tables": report["tables"],
+        "rows_per_sec": report["rows_per_sec"]
+    }
+
+def job_profile_path(job_id):
+    # Job ids are hex uuids; anything else never names a file
+    return os.path.join(PROFILE_FOLDER, f"{job_id if job_id.isalnum() else 'invalid'}.prof")
 
 @app.route("/run_etl", methods=["POST"])
 def run_etl():
+    """
+    Runs the pipeline and returns every step's result. Clients accepting
+    application/x-ndjson get one line per step as soon as it is computed
+    ({"event": "result", "step", "index", "result"}), then
+    {"event": "end", "status": "done" or "error", "latest_path" or "error"}.
+    """
     data = request.json
     csv_path = data.get("csv_path")
     steps = data.get("steps", [])
     if not csv_path or not steps:
         return jsonify({"error": "Missing CSV or steps"}), 400
+    if not os.path.exists(csv_path):
+        return jsonify({"error": "The upload has expired, please upload the file again."}), 404
+    options = data.get("options") or {}
+    error = validate_steps(steps) or validate_options(options)
+    if error:
+        return jsonify(error)
+    if not wants_ndjson():
+        return jsonify(execute_steps(csv_path, steps, options=options))
 
-    # ETL hierarchy
-    canonical = ["clean", "fd", "1nf", "2nf", "3nf", "er"]
-
-    # Always require clean to be first
-    if steps[0] != "clean":
-        msg = "Without cleaning it will generate irrelevant ER Diagram. So follow the process: Clean → FD → 1NF → 2NF → 3NF → ER."
-        return jsonify({"error": msg, "blocked_step": steps[0]})
-
-    # If ER is requested, ensure 3NF is present before it
-    if "er" in steps:
-        er_idx = steps.index("er")
-        if "3nf" not in steps[:er_idx]:
-            msg = "Complete 3NF before generating an ER Diagram."
-            return jsonify({"error": msg, "blocked_step": "er"})
-
-    # Check for "going down" the hierarchy after a higher order step
-    # Find the highest order step selected so far
-    max_order = max([step_order(step) for step in steps])
-    for idx, step in enumerate(steps):
-        # If any step is less than the highest order (i.e., user went back down), block
-        if step_order(step) < max_order and idx == len(steps) - 1:
-            msg = f"You have already selected a higher ETL step. Please follow the order: Clean → FD → 1NF → 2NF → 3NF → ER."
-            return jsonify({"error": msg, "blocked_step": step})
-
-    df = pd.read_csv(csv_path)
-    result = {}
-    current_df = df.copy()
-    fds = []
-    tables = None
-    latest_csv = csv_path
-
-    for step in steps:
-        if step == "clean":
-            current_df, info = clean_data(current_df)
-            result["clean"] = {
-                "html": tabulate(current_df, headers="keys", tablefmt="html", showindex=False),
-                "info": str(info)
-            }
-            latest_csv = csv_path.replace(".csv", f"_clean_{uuid.uuid4().hex[:6]}.csv")
-            current_df.to_csv(latest_csv, index=False)
-        elif step == "fd":
-            checker = FunctionalDependencyChecker(current_df)
-            fds = checker.find_all_fds(max_lhs_size=2)
-            fd_table = [[" ,".join(lhs), " ,".join(rhs)] for lhs, rhs in fds]
-            fd_html = tabulate(fd_table, headers=["LHS", "RHS"], tablefmt='html')
-            result["fd"] = {"html": fd_html, "fds": fds}
-        elif step == "1nf":
-            current_df, summary = to_first_nf(current_df)
-            table_html = tabulate(current_df, headers='keys', tablefmt='html', showindex=False)
-            result["1nf"] = {
-                "html": f"<h4>Table in 1NF</h4>{table_html}" +
-                        (f"<div class='nf-status'><b>Info: </b>{summary}</div>" if summary else "")
-            }
-            latest_csv = csv_path.replace(".csv", f"_1nf_{uuid.uuid4().hex[:6]}.csv")
-            current_df.to_csv(latest_csv, index=False)
-        elif step == "2nf":
-            pk = [current_df.columns[0]]
-            if not fds:
-                checker = FunctionalDependencyChecker(current_df)
-                fds = checker.find_all_fds(max_lhs_size=2)
-            checker2 = SecondNFChecker(current_df, pk, fds)
-            violations = checker2.get_violations()
-            is_2nf = checker2.is_2nf()
-            table_html = tabulate(current_df, headers='keys', tablefmt='html', showindex=False)
-            status_msg = "<b>Table is in 2NF.</b>" if is_2nf else "<b>Table violates 2NF.</b>"
-            violations_msg = ""
-            if violations:
-                violations_msg = "<ul>" + "".join(
-                    f"<li>{', '.join(v['lhs'])} &rarr; {', '.join(v['rhs'])}</li>" for v in violations
-                ) + "</ul>"
-            result["2nf"] = {
-                "html": f"<h4>Table for 2NF Check</h4>{table_html}"
-                        + f"<div class='nf-status'>{status_msg}</div>"
-                        + (f"<div><b>Violations:</b>{violations_msg}</div>" if violations_msg else "")
-                        + f"<div><b>Primary Key:</b> {', '.join(pk)}</div>"
-            }
-        elif step == "3nf":
-            decomposer = Semantic3NFPrefixDecomposer(current_df)
-            decomposer.decompose_3nf()
-            tables = decomposer.tables
-            tables_html = decomposer.get_tables_tabular_html()
-            result["3nf"] = {
-                "html": f"<h4>3NF Decomposition</h4>{tables_html}"
-            }
-        elif step == "er":
-            decomposer = Semantic3NFPrefixDecomposer(current_df)
-            decomposer.decompose_3nf()
-            tables = decomposer.tables
-            safe_basename = os.path.splitext(os.path.basename(csv_path))[0]
-            timestamp = int(time.time())
-            er_filename = f"er_diagram_{safe_basename}_{timestamp}"
-            er_image_fullpath = generate_er_diagram(
-                tables,
-                output_folder=ER_FOLDER,
-                filename=er_filename
-            )
-            er_image_path = f"er_diagrams/{er_filename}.png"
-            result["er"] = {
-                "html": f"<img src='/static/{er_image_path}' class='er-diagram'><br><a href='/static/{er_image_path}' download>Download ER Diagram</a>"
-            }
-    result["latest_csv"] = latest_csv
-    return jsonify(result)
+    def events():
+        try:
+            for key, value in iter_step_results(csv_path, steps, options=options):
+                if key == "error":
+                    yield {"event": "end", "status": "error", "error": value}
+                elif key == "latest_path":
+                    yield {"event": "end", "status": "done", "latest_path": value}
+                else:
+                    yield {"event": "result", "step": key, "index": steps.index(key), "result": value}
+        except Exception as e:
+            # The status line is long gone; report the failure in the stream
+            app.logger.exception("Streamed pipeline run failed")
+            yield {"event": "end", "status": "error", "error": {"error": f"{type(e).__name__}: {e}"}}
+
+    return ndjson_response(events())
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Starts the pipeline in the background and returns its job id. A new job
+    for the same pipeline (pipeline_id, or the upload path) supersedes and
+    cancels the previous one. With "profile": true the run is profiled and
+    the response links the stats.
+    """
+    data = request.json or {}
+    csv_path = data.get("csv_path")
+    steps = data.get("steps", [])
+    if not csv_path or not steps:
+        return jsonify({"error": "Missing CSV or steps"}), 400
+    if not os.path.exists(csv_path):
+        return jsonify({"error": "The upload has expired, please upload the file again."}), 404
+    options = data.get("options") or {}
+    error = validate_steps(steps) or validate_options(options)
+    if error:
+        return jsonify(error)
+
+    def run(job):
+        if data.get("profile"):
+            # cProfile stats of the whole run, served by /jobs/<job_id>/profile
+            outcome = profile_call(job_profile_path(job.id), execute_steps, csv_path, steps, job, options)
+        else:
+            outcome = execute_steps(csv_path, steps, job, options)
+        if "error" in outcome:
+            return outcome
+        job.result["latest_path"] = outcome["latest_path"]
+
+    job = job_manager.submit(run, steps, group=data.get("pipeline_id") or csv_path)
+    response = {"job_id": job.id, "status": job.status}
+    if data.get("profile"):
+        response["profile"] = f"/jobs/{job.id}/profile"
+    return jsonify(response), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict(from_step=request.args.get("from_step", 0, type=int)))
+
+@app.route("/jobs/<job_id>/stream", methods=["GET"])
+def job_stream(job_id):
+    """
+    The job as NDJSON, instead of polling: a "progress" line (as GET
+    /jobs/<job_id>, without results) on every change and at least every
+    STREAM_HEARTBEAT_SECONDS, a "result" line per step at index >= from_step
+    as soon as it finishes, and an "end" line with the final status.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    from_step = request.args.get("from_step", 0, type=int)
+
+    def events():
+        version, sent = -1, set()
+        while True:
+            version = job.wait_for_change(version, timeout=app.config["STREAM_HEARTBEAT_SECONDS"])
+            snapshot = job.to_dict(from_step=from_step)
+            results = snapshot.pop("result")
+            error = snapshot.pop("error")
+            yield {"event": "progress", **snapshot}
+            for idx in range(from_step, len(job.steps)):
+                step = job.steps[idx]
+                if step in results and step not in sent:
+                    sent.add(step)
+                    yield {"event": "result", "step": step, "index": idx, "result": results[step]}
+            if snapshot["status"] in ("done", "error", "cancelled"):
+                yield {"event": "end", "status": snapshot["status"], "error": error}
+                return
+
+    return ndjson_response(events())
+
+@app.route("/jobs/<job_id>/profile", methods=["GET"])
+def job_profile(job_id):
+    """pstats dump of a job submitted with "profile": true."""
+    path = job_profile_path(job_id)
+    if not os.path.exists(path):
+        return jsonify({"error": "No profile for this job"}), 404
+    return send_file(os.path.abspath(path), mimetype="application/octet-stream",
+                     as_attachment=True, download_name=f"{job_id}.prof")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-step histograms of wall/CPU time, peak memory and output size, plus FD level timings."""
+    return jsonify(metrics_registry.to_dict())
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"job_id": job_id, "status": "cancelling"})
+
+@app.route("/result_page", methods=["POST"])
+def result_page():
+    """Serves one page of a step's table from the step cache; `steps` is the table's result key."""
+    data = request.json or {}
+    csv_path = data.get("csv_path")
+    steps = data.get("steps", [])
+    if not csv_path or not steps or not os.path.exists(csv_path):
+        return jsonify({"error": "Missing CSV or steps"}), 400
+    state = step_cache.get(file_digest(csv_path), steps)
+    if state is None:
+        return jsonify({"error": "Result is no longer cached, please run the step again."}), 404
+
+    table = str(data.get("table", "current"))
+    if table == "current" and state["df"] is None:
+        # Streamed step output that was never loaded into memory
+        if data.get("sort_by"):
+            return jsonify({"error": "Sorting is not available for streamed results."}), 400
+        total_rows = state["result"].get(steps[-1].split("[")[0], {}).get("rows", 0)
+        upload_store.touch(state["latest_path"])
+        try:
+            payload = csv_page_payload(state["latest_path"], total_rows, offset=data.get("offset", 0),
+                                       limit=data.get("limit", app.config["RESULT_PAGE_SIZE"]))
+        except FileNotFoundError:
+            # Removed by the retention policy since the step ran
+            return jsonify({"error": "Result is no longer cached, please run the step again."}), 404
+        return jsonify(payload)
+    if table == "current":
+        df = state["df"]
+    else:
+        try:
+            index = int(table)
+            # A negative index would count from the end of the list
+            if index < 0:
+                raise IndexError(index)
+            df = state["tables"][index]["df"]
+        except (TypeError, ValueError, IndexError):
+            return jsonify({"error": f"Unknown table '{table}'"}), 400
+    try:
+        payload = page_payload(
+            df,
+            offset=data.get("offset", 0),
+            limit=data.get("limit", app.config["RESULT_PAGE_SIZE"]),
+            sort_by=data.get("sort_by"),
+            ascending=bool(data.get("ascending", True))
+        )
+    except KeyError as e:
+        return jsonify({"error": f"Unknown sort column {e}"}), 400
+    return jsonify(payload)
 
 if __name__ == "__main__":
     app.run(debug=True,port=5002)  
@@ -0,0 +1,49 @@
+"""
+Times ER diagram output for synthetic schemas of growing size: Graphviz
+source for each layout, the native grid SVG, a Graphviz render (when the
+binaries are installed) and a render-cache hit.
+
+    python -m benchmarks.bench_er --entities 10 50 200 500
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from benchmarks.generators import er_schema
+from utils.er_generator import ER_LAYOUTS, ERRenderCache, generate_er_diagram
+
+
+def timed(fn, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--render-layout", choices=ER_LAYOUTS, default="grid")
+    args = parser.parse_args()
+
+    can_render = shutil.which("dot") is not None
+    if not can_render:
+        print("Graphviz binaries not found: skipping rendered PNG timings")
+    with tempfile.TemporaryDirectory() as folder:
+        for n in args.entities:
+            tables = er_schema(n)
+            timings = {}
+            for layout in ER_LAYOUTS:
+                timings[f"dot-{layout}"] = timed(generate_er_diagram, tables, folder, f"s{n}_{layout}",
+                                                 format="dot", layout=layout)
+            timings["svg-grid"] = timed(generate_er_diagram, tables, folder, f"s{n}", format="svg", layout="grid")
+            cache = ERRenderCache(folder)
+            fmt = "png" if can_render else "svg"
+            layout = args.render_layout if can_render else "grid"
+            timings[f"{fmt}-{layout}-miss"] = timed(cache.render, tables, format=fmt, layout=layout)
+            timings[f"{fmt}-{layout}-hit"] = timed(cache.render, tables, format=fmt, layout=layout)
+            print(f"entities={n:<4} " + " ".join(f"{k}={v:.3f}s" for k, v in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
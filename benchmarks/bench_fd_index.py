@@ -0,0 +1,48 @@
+"""
+Times the FD index (canonical cover, candidate keys, 2NF check and 3NF
+synthesis) on synthetic FD sets with hundreds of columns.
+
+    python -m benchmarks.bench_fd_index --cols 300 --fds 3000 --shape schema
+"""
+import argparse
+import time
+
+from benchmarks.generators import random_fds, schema_fds
+from utils.fd_index import FDIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cols", type=int, nargs="+", default=[100, 300, 500])
+    parser.add_argument("--fds", type=int, nargs="+", default=[1000, 3000, 5000])
+    parser.add_argument("--shape", choices=["schema", "random"], default="schema")
+    args = parser.parse_args()
+
+    generate = schema_fds if args.shape == "schema" else random_fds
+    for cols, n_fds in zip(args.cols, args.fds):
+        columns, fds = generate(cols, n_fds)
+        timings = {}
+        started = time.perf_counter()
+        index = FDIndex(columns, fds)
+        timings["build"] = time.perf_counter() - started
+        mark = time.perf_counter()
+        cover = index.canonical_cover()
+        timings["cover"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        keys = index.candidate_keys()
+        timings["keys"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        partial = index.partial_dependencies(keys[0])
+        timings["2nf"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        relations = index.synthesize_3nf()
+        timings["3nf"] = time.perf_counter() - mark
+        total = time.perf_counter() - started
+        print(f"cols={cols:<4} fds={len(fds):<5} cover={len(cover):<5} keys={len(keys):<3} "
+              f"partial={len(partial):<3} relations={len(relations):<4} "
+              + " ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items())
+              + f" total={total:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
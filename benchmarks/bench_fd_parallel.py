@@ -0,0 +1,34 @@
+"""
+Compares FD mining with 1/4/16 worker processes on a synthetic wide table.
+
+    python -m benchmarks.bench_fd_parallel --rows 100000 --cols 30
+"""
+import argparse
+import time
+
+from benchmarks.generators import wide_table
+from utils.fd_checker import FunctionalDependencyChecker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--max-lhs", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    df = wide_table(args.rows, args.cols)
+    reference = None
+    for n_jobs in args.workers:
+        started = time.perf_counter()
+        fds = FunctionalDependencyChecker(df, n_jobs=n_jobs).find_all_fds(max_lhs_size=args.max_lhs)
+        elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = fds
+        same = "same" if fds == reference else "DIFFERENT"
+        print(f"workers={n_jobs:<3} fds={len(fds):<6} {elapsed:8.2f}s  ({same} output)")
+
+
+if __name__ == "__main__":
+    main()
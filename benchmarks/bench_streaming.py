@@ -0,0 +1,84 @@
+"""
+Compares result delivery of /run_etl on seeded synthetic tables: one
+buffered JSON response, streamed NDJSON, and NDJSON and JSON with gzip.
+Reports the time to the first step result, the total time, the bytes
+sent and the traced peak memory of the request.
+
+    python -m benchmarks.bench_streaming --rows 1000 10000 50000
+
+Every run starts from an empty step cache, with FD result reuse off, so
+all steps are computed. Buffered responses deliver their first result
+with the last one.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import zlib
+
+import app.app as etl_app
+from benchmarks.generators import denormalized_table
+from utils.metrics import StepMeter
+from utils.step_cache import StepCache
+
+STEPS = ["clean", "fd", "1nf", "2nf", "3nf"]
+MODES = {
+    "json": {},
+    "json-gzip": {"Accept-Encoding": "gzip"},
+    "ndjson": {"Accept": "application/x-ndjson"},
+    "ndjson-gzip": {"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"},
+}
+
+
+def run_once(client, csv_path: str, headers, folder: str):
+    """(seconds to the first result, total seconds, bytes received, traced peak bytes) of one request."""
+    etl_app.step_cache = StepCache(os.path.join(folder, f"cache_{time.time_ns()}"))
+    meter = StepMeter("run_etl", trace_memory=True).start()
+    started = time.perf_counter()
+    response = client.post("/run_etl", json={"csv_path": csv_path, "steps": STEPS}, headers=headers,
+                           buffered=False)
+    decoder = zlib.decompressobj(31) if response.headers.get("Content-Encoding") == "gzip" else None
+    first, received, buffered, pending = None, 0, [], b""
+    for chunk in response.response:
+        received += len(chunk)
+        data = decoder.decompress(chunk) if decoder else chunk
+        if response.mimetype != "application/x-ndjson":
+            buffered.append(data)
+            continue
+        # Parse lines as they complete, as the UI does
+        pending += data
+        while b"\n" in pending:
+            line, pending = pending.split(b"\n", 1)
+            if first is None and json.loads(line).get("event") == "result":
+                first = time.perf_counter() - started
+    if buffered:
+        json.loads(b"".join(buffered))
+    total = time.perf_counter() - started
+    response.close()
+    peak = meter.stop()["peak_memory_bytes"]
+    return first if first is not None else total, total, received, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode; the fastest is reported")
+    args = parser.parse_args()
+
+    etl_app.app.config.update(FD_STORE_FOLDER=None, METRICS_TRACE_MEMORY=False)
+    client = etl_app.app.test_client()
+    with tempfile.TemporaryDirectory() as folder:
+        etl_app.app.config["WORK_FOLDER"] = folder
+        for rows in args.rows:
+            csv_path = os.path.join(folder, f"bench_{rows}.csv")
+            denormalized_table(rows)[0].to_csv(csv_path, index=False)
+            for mode, headers in MODES.items():
+                runs = [run_once(client, csv_path, headers, folder) for _ in range(max(args.repeat, 1))]
+                first, total, received, peak = min(runs, key=lambda run: run[1])
+                print(f"rows={rows:<7} {mode:<12} first_result={first:.3f}s total={total:.3f}s "
+                      f"bytes={received:<9} peak_memory={(peak or 0) / 2 ** 20:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Seeded generators of synthetic inputs for the benchmarks: denormalized
+tables shaped like the uploads the pipeline gets (entities with planted
+FDs, multi-valued cells, numbered repeating columns), wide numeric tables
+for FD mining, FD sets for the FD index and schemas for ER output.
+The same arguments always produce the same data.
+"""
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+FD = Tuple[List[str], List[str]]
+
+ENTITY_NAMES = ["drug", "company", "disease", "trial", "product", "site", "researcher", "region"]
+ATTRIBUTE_NAMES = ["name", "category", "status", "code", "label", "type", "group", "country"]
+
+
+def _entity_name(i: int) -> str:
+    if i < len(ENTITY_NAMES):
+        return ENTITY_NAMES[i]
+    # Letters only: a trailing number would make clean_data merge the columns
+    suffix = ""
+    while True:
+        suffix = chr(ord("a") + i % 26) + suffix
+        i = i // 26 - 1
+        if i < 0:
+            return f"entity{suffix}"
+
+
+def _labels(prefix: str, n: int) -> np.ndarray:
+    return np.array([f"{prefix} {v}" for v in range(n)], dtype=object)
+
+
+def denormalized_table(rows: int = 10_000, entities: int = 3, attributes: int = 3, cardinality: int = 1_000,
+                       multi_valued: int = 1, max_values: int = 3, repeated: int = 1, repeats: int = 3,
+                       noise_columns: int = 1, null_rate: float = 0.0,
+                       seed: int = 0) -> Tuple[pd.DataFrame, List[FD]]:
+    """
+    One row per fact of a flattened export. Returns (table, planted FDs).
+
+    - `entities` groups of columns `<entity>_id`, `<entity>_<attribute>`:
+      the id determines the entity's `attributes` columns, and each
+      entity's id determines the next entity's id (a transitive chain).
+      The first id takes `cardinality` distinct values, each next entity
+      about a quarter as many (at least 2).
+    - `multi_valued` columns `tag_<name>` holding 1..`max_values` values
+      joined by ';', which 1NF splits.
+    - `repeated` groups of numbered columns (`note 1`, `note 2`, ...),
+      `repeats` each, partly empty, which clean_data stacks.
+    - `noise_columns` independent random `measure_*` columns.
+    - attributes are empty for a `null_rate` share of the ids.
+    """
+    rng = np.random.default_rng(seed)
+    data: Dict[str, object] = {}
+    planted: List[FD] = []
+
+    ids = rng.integers(0, max(cardinality, 1), rows)
+    card = max(cardinality, 1)
+    previous = None
+    for e in range(entities):
+        entity = _entity_name(e)
+        id_col = f"{entity}_id"
+        if previous is not None:
+            # Many-to-one onto a smaller entity: previous id -> this id
+            parent_card, card = card, max(card // 4, 2)
+            ids = rng.integers(0, card, parent_card)[ids]
+            planted.append(([previous], [id_col]))
+        data[id_col] = ids
+        for a in range(attributes):
+            attr = ATTRIBUTE_NAMES[a % len(ATTRIBUTE_NAMES)]
+            if a >= len(ATTRIBUTE_NAMES):
+                attr = f"{attr}_{_entity_name(a // len(ATTRIBUTE_NAMES))}"
+            col = f"{entity}_{attr}"
+            attr_card = max(int(card * rng.uniform(0.1, 1.0)), 1)
+            per_id = _labels(f"{entity} {attr}", attr_card)[rng.integers(0, attr_card, card)]
+            if null_rate:
+                # Missing for whole ids, so the planted FD still holds
+                per_id[rng.random(card) < null_rate] = None
+            data[col] = per_id[ids]
+            planted.append(([id_col], [col]))
+        previous = id_col
+
+    for m in range(multi_valued):
+        name = _entity_name(m)
+        vocabulary = _labels(name, 50)
+        counts = rng.integers(1, max_values + 1, rows)
+        picks = vocabulary[rng.integers(0, len(vocabulary), int(counts.sum()))]
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        data[f"tag_{name}"] = np.array([";".join(picks[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])],
+                                       dtype=object)
+
+    for r in range(repeated):
+        name = f"note {_entity_name(r)}"
+        vocabulary = _labels(name, 200)
+        for i in range(1, repeats + 1):
+            values = vocabulary[rng.integers(0, len(vocabulary), rows)]
+            values[rng.random(rows) < (i - 1) / repeats] = None
+            data[f"{name} {i}"] = values
+
+    for n in range(noise_columns):
+        data[f"measure_{_entity_name(n)}"] = rng.integers(0, 1_000_000, rows)
+
+    return pd.DataFrame(data), planted
+
+
+def wide_table(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Integer columns of random cardinality; every third column is a function of the previous one."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        if i % 3 == 2:
+            data[f"col_{i}"] = data[f"col_{i - 1}"] % 7
+        else:
+            data[f"col_{i}"] = rng.integers(0, rng.integers(2, 1000), rows)
+    return pd.DataFrame(data)
+
+
+def schema_fds(cols: int, fds: int, seed: int = 0) -> Tuple[List[str], List[FD]]:
+    """
+    FDs shaped like a denormalized export: entities of 4-12 columns whose
+    id determines the rest, references from one entity to an earlier one,
+    and redundant transitive / augmented FDs (as mining returns them) up to `fds`.
+    """
+    rng = random.Random(seed)
+    columns, entities, result = [], [], []
+    while len(columns) < cols:
+        size = min(rng.randint(4, 12), cols - len(columns))
+        names = [f"e{len(entities)}_c{i}" for i in range(size)]
+        columns.extend(names)
+        entities.append(names)
+        result.append(([names[0]], names[1:]))
+        if len(entities) > 1 and size > 1:
+            parent = rng.choice(entities[:-1])
+            result.append(([names[0]], [parent[0]]))
+    while len(result) < fds:
+        entity = rng.choice(entities)
+        lhs = [entity[0]] + rng.sample(columns, rng.randint(0, 1))
+        rhs = rng.sample(entity, 1)
+        result.append((lhs, rhs))
+    return columns, result
+
+
+def random_fds(cols: int, fds: int, seed: int = 0) -> Tuple[List[str], List[FD]]:
+    """Random 1-3 column LHS pointing at a later column: long derivation chains, the hard case."""
+    rng = random.Random(seed)
+    columns = [f"c{i}" for i in range(cols)]
+    result = []
+    for _ in range(fds):
+        k = rng.choice([1, 1, 2, 2, 3])
+        i = rng.randrange(k, cols)
+        result.append((rng.sample(columns[:i], k), [columns[rng.randrange(i, cols)]]))
+    return columns, result
+
+
+def er_schema(entities: int, seed: int = 0) -> List[Dict]:
+    """Tables (as the 3NF step produces them) with 3-12 columns, each referencing up to two earlier tables."""
+    rng = random.Random(seed)
+    tables = []
+    for i in range(entities):
+        name = f"entity{i}_table"
+        columns = [f"entity{i}_id"] + [f"attr_{i}_{j}" for j in range(rng.randint(2, 11))]
+        fks = []
+        for parent in rng.sample(tables, min(len(tables), rng.randint(0, 2))):
+            ref = parent['primary_key'][0]
+            columns.append(ref)
+            fks.append({'ref_table': parent['table_name'], 'column': ref, 'ref_column': ref})
+        tables.append({'table_name': name, 'columns': columns, 'primary_key': [columns[0]],
+                       'df': None, 'foreign_keys': fks})
+    return tables
@@ -0,0 +1,248 @@
+"""
+Runs every pipeline stage on seeded synthetic tables at several sizes and
+records time and memory per stage to a JSON file, which later runs can be
+compared against (e.g. before and after a commit).
+
+    python -m benchmarks.run --rows 1000 10000 100000 --output baseline.json
+    python -m benchmarks.run --rows 1000 10000 100000 --compare baseline.json
+
+Stages run in pipeline order (ingest, clean, fd, 1nf, 2nf, 3nf-prefix,
+3nf-synthesis, er, sql-sqlite, sql-postgres), each on the previous stage's
+output as in the app.
+Times are the best of `--repeat` runs; peak memory comes from one more run
+under tracemalloc, which does not see Arrow buffers. A comparison exits
+with status 1 when a stage got slower or bigger than `--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generators import denormalized_table
+from utils.cleaner import clean_data
+from utils.dtype_profile import read_csv_compact
+from utils.er_generator import generate_er_diagram
+from utils.fd_checker import FunctionalDependencyChecker
+from utils.first_nf_checker import to_first_nf
+from utils.metrics import StepMeter
+from utils.second_nf_checker import SecondNFChecker
+from utils.sql_export import export_tables
+from utils.third_nf_checker import FDSynthesis3NFDecomposer, Semantic3NFPrefixDecomposer
+
+# Peaks below this are dominated by allocator noise
+MIN_MEMORY_BYTES = 2 ** 20
+
+
+def _ingest(state: Dict):
+    return read_csv_compact(state["csv_path"])[0]
+
+
+def _clean(state: Dict):
+    # clean_data renames the columns of its input
+    return clean_data(state["ingest"].copy(deep=False))[0]
+
+
+def _fd(state: Dict):
+    return FunctionalDependencyChecker(state["clean"]).find_all_fds(max_lhs_size=2)
+
+
+def _first_nf(state: Dict):
+    return to_first_nf(state["clean"])[0]
+
+
+def _second_nf(state: Dict):
+    checker = SecondNFChecker(state["1nf"], None, state["fd"])
+    return checker.get_violations()
+
+
+def _third_nf_prefix(state: Dict):
+    decomposer = Semantic3NFPrefixDecomposer(state["1nf"])
+    decomposer.decompose_3nf()
+    return decomposer.tables
+
+
+def _third_nf_synthesis(state: Dict):
+    decomposer = FDSynthesis3NFDecomposer(state["1nf"], state["fd"])
+    decomposer.decompose_3nf()
+    return decomposer.tables
+
+
+def _er(state: Dict):
+    return generate_er_diagram(state["3nf-prefix"], state["folder"], "er", format=state["er_format"], layout="grid")
+
+
+def _sql_sqlite(state: Dict):
+    return export_tables(state["3nf-prefix"], os.path.join(state["folder"], "export.sqlite"), "sqlite")
+
+
+def _sql_postgres(state: Dict):
+    return export_tables(state["3nf-prefix"], os.path.join(state["folder"], "export.sql"), "postgres")
+
+
+STAGES: Dict[str, Callable[[Dict], object]] = {
+    "ingest": _ingest,
+    "clean": _clean,
+    "fd": _fd,
+    "1nf": _first_nf,
+    "2nf": _second_nf,
+    "3nf-prefix": _third_nf_prefix,
+    "3nf-synthesis": _third_nf_synthesis,
+    "er": _er,
+    "sql-sqlite": _sql_sqlite,
+    "sql-postgres": _sql_postgres,
+}
+
+
+def _output_rows(output) -> Optional[int]:
+    """Rows of a frame, the number of FDs / violations / tables, or the rows exported."""
+    if isinstance(output, (pd.DataFrame, list)):
+        return len(output)
+    if isinstance(output, dict) and "rows" in output:
+        return output["rows"]
+    return None
+
+
+def measure(fn: Callable[[Dict], object], state: Dict, repeat: int, memory: bool) -> Tuple[object, Dict]:
+    """Best-of-`repeat` wall and CPU time of `fn(state)`, plus its traced peak memory."""
+    best, output = None, None
+    for _ in range(max(repeat, 1)):
+        meter = StepMeter(fn.__name__, trace_memory=False).start()
+        output = fn(state)
+        record = meter.stop()
+        if best is None or record["wall_seconds"] < best["wall_seconds"]:
+            best = record
+    result = {
+        "seconds": best["wall_seconds"],
+        "cpu_seconds": best["cpu_seconds"],
+        "rows_out": _output_rows(output),
+        "peak_memory_bytes": None
+    }
+    if memory:
+        meter = StepMeter(fn.__name__, trace_memory=True).start()
+        fn(state)
+        result["peak_memory_bytes"] = meter.stop()["peak_memory_bytes"]
+    return output, result
+
+
+def run_scale(rows: int, stages: List[str], args: argparse.Namespace) -> Dict[str, Dict]:
+    df, _ = denormalized_table(
+        rows,
+        entities=args.entities,
+        attributes=args.attributes,
+        cardinality=args.cardinality or max(rows // 10, 2),
+        multi_valued=args.multi_valued,
+        repeated=args.repeated,
+        null_rate=args.null_rate,
+        seed=args.seed
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        state = {"folder": folder, "csv_path": os.path.join(folder, "input.csv"), "er_format": args.er_format}
+        df.to_csv(state["csv_path"], index=False)
+        last = max(list(STAGES).index(stage) for stage in stages)
+        for name in list(STAGES)[:last + 1]:
+            if name in stages:
+                state[name], results[name] = measure(STAGES[name], state, args.repeat, args.memory)
+                print(f"rows={rows:<9} {name:<14} {results[name]['seconds']:9.3f}s"
+                      + (f" peak={results[name]['peak_memory_bytes'] / 2 ** 20:8.1f}MiB"
+                         if results[name]["peak_memory_bytes"] is not None else ""))
+            else:
+                # Needed as input only
+                state[name] = STAGES[name](state)
+    return results
+
+
+def _metadata() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_seconds: float) -> List[Dict]:
+    """
+    Per scale and stage present in both runs, the ratio new / old of time
+    and peak memory. A ratio above 1 + `threshold` is a regression; times
+    below `min_seconds` and peaks below MIN_MEMORY_BYTES in the baseline are
+    too noisy to judge.
+    """
+    rows = []
+    for scale, stages in current["results"].items():
+        for stage, new in stages.items():
+            old = baseline["results"].get(scale, {}).get(stage)
+            if old is None:
+                continue
+            for metric, floor in (("seconds", min_seconds), ("peak_memory_bytes", MIN_MEMORY_BYTES)):
+                if not old.get(metric) or new.get(metric) is None:
+                    continue
+                ratio = new[metric] / old[metric]
+                rows.append({
+                    "rows": scale, "stage": stage, "metric": metric,
+                    "old": old[metric], "new": new[metric], "ratio": ratio,
+                    "regression": ratio > 1 + threshold and old[metric] >= floor
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the traced run")
+    parser.add_argument("--entities", type=int, default=3)
+    parser.add_argument("--attributes", type=int, default=3)
+    parser.add_argument("--cardinality", type=int, default=None, help="distinct ids (default: rows / 10)")
+    parser.add_argument("--multi-valued", type=int, default=1)
+    parser.add_argument("--repeated", type=int, default=1)
+    parser.add_argument("--null-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--er-format", choices=["svg", "dot"], default="svg")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / growth (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    current = {
+        "meta": _metadata(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": {str(rows): run_scale(rows, args.stages, args) for rows in args.rows}
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report = compare(baseline, current, args.threshold, args.min_seconds)
+        print(f"\nAgainst {args.compare} (commit {baseline['meta'].get('commit')}):")
+        for row in report:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"rows={row['rows']:<9} {row['stage']:<14} {row['metric']:<18} "
+                  f"{row['old']:>14.4g} -> {row['new']:<14.4g} x{row['ratio']:.2f} {flag}")
+        if any(row["regression"] for row in report):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
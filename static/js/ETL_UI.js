@@ -1,17 +1,19 @@
 let csvPath = null;
 let pipelineSteps = [];
-const stepOrder = ["clean", "fd", "1nf", "2nf", "3nf", "er"];
+const stepOrder = ["clean", "fd", "1nf", "2nf", "3nf", "er", "sql"];
 const stepNames = {
     clean: "Clean",
     fd: "FD",
     "1nf": "1NF",
     "2nf": "2NF",
     "3nf": "3NF",
-    er: "ER"
+    er: "ER",
+    sql: "SQL"
 };
 let stepPositions = {};
 let dragFlags = {};
 let csvUploaded = false;
+let currentJobId = null;
 
 // Helper: find the first red (reverse) arrow index
 function findFirstRedArrowIndex(steps) {
@@ -185,6 +187,66 @@ function renderPipeline() {
     renderPipeline.blockedIdx = blockedIdx;
 }
 
+// Large tables only ship their first page; fetch the rest as the user scrolls.
+const PAGE_SIZE = 100;
+
+function appendTableRows(wrapper, rows) {
+    let tbody = wrapper.querySelector('tbody');
+    if (!tbody) {
+        tbody = document.createElement('tbody');
+        wrapper.querySelector('table').appendChild(tbody);
+    }
+    rows.forEach(row => {
+        const tr = document.createElement('tr');
+        row.forEach(value => {
+            const td = document.createElement('td');
+            td.textContent = value === null ? "" : String(value);
+            tr.appendChild(td);
+        });
+        tbody.appendChild(tr);
+    });
+}
+
+function loadNextPage(wrapper) {
+    const total = parseInt(wrapper.dataset.totalRows, 10);
+    const loaded = parseInt(wrapper.dataset.loadedRows, 10);
+    if (wrapper.dataset.loading === "1" || loaded >= total) return;
+    wrapper.dataset.loading = "1";
+    fetch('/result_page', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            csv_path: csvPath,
+            steps: wrapper.dataset.resultKey.split(";"),
+            table: wrapper.dataset.table,
+            offset: loaded,
+            limit: PAGE_SIZE
+        })
+    })
+        .then(res => res.json())
+        .then(data => {
+            wrapper.dataset.loading = "0";
+            if (data.error || !data.rows) return;
+            appendTableRows(wrapper, data.rows);
+            wrapper.dataset.loadedRows = loaded + data.rows.length;
+            let count = wrapper.previousElementSibling;
+            if (count && count.classList.contains('etl-table-count')) {
+                count.textContent = `Showing ${wrapper.dataset.loadedRows} of ${total} rows`;
+            }
+        })
+        .catch(() => { wrapper.dataset.loading = "0"; });
+}
+
+function attachTablePaging(container) {
+    container.querySelectorAll('.etl-table-wrapper[data-result-key]').forEach(wrapper => {
+        wrapper.addEventListener('scroll', () => {
+            if (wrapper.scrollTop + wrapper.clientHeight >= wrapper.scrollHeight - 40) {
+                loadNextPage(wrapper);
+            }
+        });
+    });
+}
+
 function fetchResultForStep(idx) {
     // Block if trying to view results after red arrow
     if (typeof renderPipeline.processBlocked !== "undefined" &&
@@ -202,7 +264,9 @@ function fetchResultForStep(idx) {
     if (!csvPath || pipelineSteps.length === 0) return;
     let stepsToRun = pipelineSteps.slice(0, idx + 1);
 
-    fetch('/run_etl', {
+    // The pipeline runs as a background job on the server; a new request for
+    // the same upload supersedes (and cancels) the one still running.
+    fetch('/jobs', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -212,24 +276,73 @@ function fetchResultForStep(idx) {
     })
         .then(res => res.json())
         .then(data => {
-            let resultsDiv = document.getElementById('results');
             if (data.error) {
                 showMessage(data.error, "red");
                 return;
             }
-            if (data.latest_csv) {
-                csvPath = data.latest_csv;
-            }
-            let step = stepsToRun[stepsToRun.length - 1];
-            resultsDiv.innerHTML = "";
-            if (data[step]) {
-                let stepData = data[step];
-                if (stepData.html) resultsDiv.innerHTML += stepData.html;
-            } else {
-                resultsDiv.innerHTML = "<em>No result for this step.</em>";
+            currentJobId = data.job_id;
+            streamJob(data.job_id, stepsToRun);
+        });
+}
+
+function renderJobProgress(job) {
+    let items = job.steps.map(s => {
+        let elapsed = s.elapsed !== null ? ` (${s.elapsed}s)` : "";
+        return `<li>${stepNames[s.step]}: ${s.status}${elapsed}</li>`;
+    }).join("");
+    return `<div class='etl-progress'><b>Running pipeline… ${job.elapsed}s</b><ul>${items}</ul></div>`;
+}
+
+// Calls onEvent with each line of an NDJSON response as it arrives; returning false stops reading.
+function readNdjson(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (done) return;
+            buffer += decoder.decode(value, { stream: true });
+            let lines = buffer.split("\n");
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (line && onEvent(JSON.parse(line)) === false) {
+                    reader.cancel();
+                    return;
+                }
             }
-            renderPipeline();
+            return pump();
         });
+    }
+    return pump();
+}
+
+function streamJob(jobId, stepsToRun) {
+    // Progress and the step's result are pushed on one response as they happen
+    let shown = false;
+    fetch(`/jobs/${jobId}/stream?from_step=${stepsToRun.length - 1}`)
+        .then(res => readNdjson(res, event => {
+            // Stop reading jobs that were superseded by a newer request
+            if (jobId !== currentJobId) return false;
+            let resultsDiv = document.getElementById('results');
+            if (event.event === "progress") {
+                if (!shown && (event.status === "queued" || event.status === "running")) {
+                    resultsDiv.innerHTML = renderJobProgress(event);
+                }
+            } else if (event.event === "result") {
+                shown = true;
+                resultsDiv.innerHTML = event.result.html || "";
+                attachTablePaging(resultsDiv);
+            } else if (event.event === "end") {
+                if (event.status === "cancelled") return false;
+                if (event.status === "error") {
+                    resultsDiv.innerHTML = "";
+                    showMessage(event.error ? event.error.error : "Pipeline failed.", "red");
+                    return false;
+                }
+                if (!shown) resultsDiv.innerHTML = "<em>No result for this step.</em>";
+                renderPipeline();
+            }
+        }));
 }
 
 document.querySelectorAll('.etl-sidebar-btn').forEach(btn => {
@@ -265,15 +378,19 @@ fileInput.addEventListener('change', function () {
     let file = fileInput.files[0];
     if (file) {
         fileNameSpan.textContent = file.name;
-        let formData = new FormData();
-        formData.append('csv', file);
         setStepButtonsEnabled(false);
-        fetch('/upload_csv', {
+        // The raw file as the request body: the server streams it to disk as it arrives
+        fetch(`/upload_csv?filename=${encodeURIComponent(file.name)}`, {
             method: 'POST',
-            body: formData
+            headers: {'Content-Type': 'text/csv'},
+            body: file
         })
             .then(res => res.json())
             .then(data => {
+                if (data.error) {
+                    showMessage(data.error, "red");
+                    return;
+                }
                 csvPath = data.csv_path;
                 pipelineSteps = [];
                 stepPositions = {};
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.fd_approx import discover_approximate_fds
+from utils.fd_checker import FunctionalDependencyChecker, mine_fds_reusing
+
+
+def random_frame(seed: int, missing: float = 0.0) -> pd.DataFrame:
+    """
+    A small table with few distinct values per column and some derived
+    columns, so that FDs of every LHS size hold. With `missing`, that
+    fraction of the cells is set to NaN.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = int(rng.integers(2, 40))
+    data = {f"c{i}": rng.integers(0, int(rng.integers(1, 6)), n_rows).astype(float) for i in range(4)}
+    data["d0"] = data["c0"] * 10 + data["c1"]
+    data["d1"] = (data["c2"] + data["c3"]) % 3
+    df = pd.DataFrame(data)
+    if missing:
+        df = df.mask(rng.random(df.shape) < missing)
+    return df
+
+
+def find_fds(df: pd.DataFrame, engine: str, max_lhs_size: int, n_jobs: int = 1):
+    return FunctionalDependencyChecker(df, engine=engine, n_jobs=n_jobs).find_all_fds(max_lhs_size=max_lhs_size)
+
+
+@pytest.mark.parametrize("missing", [0.0, 0.1, 0.4])
+@pytest.mark.parametrize("seed", range(20))
+def test_partition_engine_matches_bruteforce(seed, missing):
+    df = random_frame(seed, missing)
+    for max_lhs_size in (1, 2, 3):
+        assert find_fds(df, "partition", max_lhs_size) == find_fds(df, "bruteforce", max_lhs_size)
+
+
+@pytest.mark.parametrize("missing", [0.0, 0.2])
+def test_parallel_partition_engine_matches_bruteforce(missing):
+    for seed in range(3):
+        df = random_frame(seed, missing)
+        assert find_fds(df, "partition", 3, n_jobs=2) == find_fds(df, "bruteforce", 3)
+
+
+def test_missing_lhs_rows_are_ignored():
+    df = pd.DataFrame({"a": [1, 1, np.nan, np.nan], "b": [1, 1, 2, 3], "c": [1, np.nan, 1, 1]})
+    for engine in ("partition", "bruteforce"):
+        fds = find_fds(df, engine, 1)
+        assert (["a"], ["b"]) in fds
+        # NaN and 1 are two RHS values
+        assert (["a"], ["c"]) not in fds
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reused_results_match_bruteforce(seed, tmp_path):
+    df = random_frame(seed, 0.2)
+    mine_fds_reusing(df.iloc[:len(df) // 2], str(tmp_path), max_lhs_size=2)
+    fds, _, _ = mine_fds_reusing(df, str(tmp_path), max_lhs_size=2)
+    assert fds == find_fds(df, "bruteforce", 2)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_exact_approximate_fds_match_bruteforce(seed):
+    df = random_frame(seed, 0.2)
+    fds, _ = discover_approximate_fds(df, max_lhs_size=2, max_error=0.0)
+    found = {(frozenset(fd["lhs"]), fd["rhs"][0]) for fd in fds}
+    minimal = FunctionalDependencyChecker(df, engine="bruteforce").find_all_fds(max_lhs_size=2, minimal_only=True)
+    assert found == {(frozenset(lhs), rhs[0]) for lhs, rhs in minimal}
@@ -1,21 +1,135 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-def to_first_nf(df):
+MULTI_VALUE_PATTERN = r"[;,]"
+EXPLODE_MODES = ("cartesian", "zipped")
+
+def _text_columns(df):
+    # Numbers, booleans and timestamps never render with ';' or ','
+    return [col for col, dtype in df.dtypes.items()
+            if not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype))
+            or isinstance(dtype, pd.CategoricalDtype)]
+
+def _as_arrow_text(series):
+    values = pa.array(series.astype(str), from_pandas=True)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    return values.cast(pa.large_string())
+
+def detect_multi_valued_columns(df):
+    """
+    Returns the columns holding ';' or ',' separated values, found with a
+    single vectorized scan over all text columns (category columns are
+    checked on their categories only).
+    """
+    cols = _text_columns(df)
+    plain = [c for c in cols if not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    found = set()
+    if plain and len(df):
+        # All text columns back to back, so the regex runs as one Arrow kernel
+        values = pa.concat_arrays([_as_arrow_text(df[c]) for c in plain])
+        hits = pc.fill_null(pc.match_substring_regex(values, MULTI_VALUE_PATTERN), False)
+        flags = hits.to_numpy(zero_copy_only=False).reshape(len(plain), len(df)).any(axis=1)
+        found.update(c for c, flag in zip(plain, flags) if flag)
+    for c in cols:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            used = df[c].cat.categories[np.unique(df[c].cat.codes[df[c].cat.codes >= 0])]
+            if pd.Series(used.astype(str)).str.contains(MULTI_VALUE_PATTERN, regex=True).any():
+                found.add(c)
+    return [c for c in df.columns if c in found]
+
+class _ExplodePlan:
+    """Split values, per-row lengths and output row counts for one frame."""
+
+    def __init__(self, df, mode):
+        if mode not in EXPLODE_MODES:
+            raise ValueError(f"Unknown explode mode '{mode}', expected one of {EXPLODE_MODES}")
+        self.mode = mode
+        self.columns = detect_multi_valued_columns(df)
+        self.flat = {}
+        self.offsets = {}
+        self.lengths = {}
+        for col in self.columns:
+            lists = pc.split_pattern_regex(_as_arrow_text(df[col]), MULTI_VALUE_PATTERN)
+            # A missing value stays one (missing) element, as with str.split + explode
+            lists = pc.fill_null(lists, pa.scalar([None], type=lists.type))
+            lengths = pc.list_value_length(lists).to_numpy(zero_copy_only=False).astype(np.int64)
+            self.flat[col] = pc.list_flatten(lists).to_numpy(zero_copy_only=False)
+            self.offsets[col] = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+            self.lengths[col] = lengths
+        n = len(df)
+        if not self.columns:
+            self.repeats = np.ones(n, dtype=np.int64)
+        elif mode == "cartesian":
+            self.repeats = np.prod(np.vstack([self.lengths[c] for c in self.columns]), axis=0)
+        else:
+            self.repeats = np.max(np.vstack([self.lengths[c] for c in self.columns]), axis=0)
+
+    @property
+    def output_rows(self):
+        return int(self.repeats.sum())
+
+    @property
+    def summary(self):
+        return "".join(f"Splitting multi-valued column: {col}\n" for col in self.columns)
+
+    def build(self, df, start=0, stop=None):
+        """Exploded rows for source rows [start, stop) with one index-repeat and gather."""
+        stop = len(df) if stop is None else stop
+        repeats = self.repeats[start:stop]
+        rows = np.repeat(np.arange(start, stop, dtype=np.int64), repeats)
+        group_starts = np.concatenate([[0], np.cumsum(repeats)[:-1]]).astype(np.int64)
+        within = np.arange(len(rows), dtype=np.int64) - np.repeat(group_starts, repeats)
+
+        out = df.take(rows)
+        stride = np.ones(len(rows), dtype=np.int64)
+        # In cartesian mode the first multi-valued column varies slowest, like successive explodes
+        for col in reversed(self.columns):
+            lengths = self.lengths[col][rows]
+            if self.mode == "cartesian":
+                k = (within // stride) % lengths
+                stride = stride * lengths
+                values = self.flat[col][self.offsets[col][rows] + k]
+            else:
+                present = within < lengths
+                values = np.full(len(rows), np.nan, dtype=object)
+                values[present] = self.flat[col][self.offsets[col][rows[present]] + within[present]]
+            out[col] = pd.Series(values, index=out.index, dtype=object).astype(str).str.strip()
+        return out.reset_index(drop=True)
+
+def to_first_nf(df, mode="cartesian", max_rows=None):
     """
     Converts a DataFrame to 1NF by splitting multi-valued attributes.
     Returns the 1NF DataFrame and a summary string.
+
+    `mode="cartesian"` expands every combination of the split values (one
+    row per combination, as successive explodes would); `mode="zipped"`
+    pairs the i-th values of each column and pads shorter lists with NaN.
+    Raises ValueError when the result would have more than `max_rows` rows.
+    """
+    plan = _ExplodePlan(df, mode)
+    if max_rows is not None and plan.output_rows > max_rows:
+        raise ValueError(
+            f"1NF would expand {len(df)} rows to {plan.output_rows} (limit {max_rows}) "
+            f"while splitting {', '.join(map(str, plan.columns))}."
+        )
+    if not plan.columns:
+        return df.reset_index(drop=True), ""
+    return plan.build(df), plan.summary
+
+def iter_first_nf(df, mode="cartesian", chunk_rows=500_000):
+    """
+    Streaming form of to_first_nf for explosions too large to hold at once.
+    Yields (chunk, summary) pairs of about `chunk_rows` output rows each.
     """
-    import re
-    df1 = df.copy()
-    summary = ""
-    for col in df1.columns:
-        # Detect lists/sets as comma or semicolon separated
-        if df1[col].astype(str).str.contains(r"[;,]").any():
-            summary += f"Splitting multi-valued column: {col}\n"
-            df1 = df1.assign(**{
-                col: df1[col].astype(str).str.split(r"[;,]")
-            })
-            df1 = df1.explode(col)
-            df1[col] = df1[col].astype(str).str.strip()
-    df1 = df1.reset_index(drop=True)
-    return df1, summary
+    plan = _ExplodePlan(df, mode)
+    ends = np.cumsum(plan.repeats)
+    start = 0
+    while start < len(df):
+        done = ends[start - 1] if start else 0
+        stop = int(np.searchsorted(ends, done + chunk_rows, side="right"))
+        stop = max(stop, start + 1)
+        yield plan.build(df, start, stop), plan.summary
+        start = stop
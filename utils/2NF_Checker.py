@@ -1,43 +1,24 @@
 import pandas as pd
-from typing import List, Dict
-
-def is_subset(subset, superset):
-    return all(item in superset for item in subset)
+from typing import List, Dict, Optional
+from utils.fd_index import FDIndex
 
 class SecondNFChecker:
-    def __init__(self, df: pd.DataFrame, primary_key: List[str], fds: List[tuple]):
+    """
+    2NF check over mined FDs using attribute closures. Without a
+    `primary_key` the smallest candidate key derived from the FDs is used.
+    Non-prime attributes are those outside every candidate key.
+    """
+    def __init__(self, df: pd.DataFrame, primary_key: Optional[List[str]] = None, fds: List[tuple] = ()):
         self.df = df
-        self.primary_key = primary_key
         self.fds = fds
+        self.index = FDIndex(list(df.columns), fds)
+        self.primary_key = list(primary_key) if primary_key else self.index.candidate_keys()[0]
+        self._violations = None
 
     def is_2nf(self) -> bool:
-        prime_attrs = set(self.primary_key)
-        all_attrs = set(self.df.columns)
-        non_prime_attrs = all_attrs - prime_attrs
-
-        for lhs, rhs in self.fds:
-            lhs_set = set(lhs)
-            rhs_set = set(rhs)
-            if (not rhs_set.isdisjoint(non_prime_attrs)
-                and is_subset(lhs_set, self.primary_key)
-                and lhs_set != set(self.primary_key)):
-                return False
-        return True
+        return not self.get_violations()
 
     def get_violations(self) -> List[Dict]:
-        violations = []
-        prime_attrs = set(self.primary_key)
-        all_attrs = set(self.df.columns)
-        non_prime_attrs = all_attrs - prime_attrs
-
-        for lhs, rhs in self.fds:
-            lhs_set = set(lhs)
-            rhs_set = set(rhs)
-            if (not rhs_set.isdisjoint(non_prime_attrs)
-                and is_subset(lhs_set, self.primary_key)
-                and lhs_set != set(self.primary_key)):
-                violations.append({
-                    "lhs": lhs,
-                    "rhs": rhs
-                })
-        return violations
+        if self._violations is None:
+            self._violations = self.index.partial_dependencies(self.primary_key)
+        return self._violations
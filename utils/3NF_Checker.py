@@ -1,51 +1,84 @@
+import numpy as np
 import pandas as pd
 import re
 from collections import defaultdict
 from tabulate import tabulate
+from utils.result_preview import preview_table_html
+from utils.fd_index import FDIndex
+
+TRAILING_INDEX = re.compile(r'[\d_]+$')
+PREFIX_SEPARATOR = re.compile(r'[_\-\s\.]+')
 
 class Semantic3NFPrefixDecomposer:
+    """
+    Groups columns by name prefix into tables. Numbered repeats of a column
+    (e.g. `author_1`, `author_2`) are stacked into one column first.
+
+    All tables are projections of one shared, dictionary-encoded frame
+    (`self.df`, categorical columns): a table keeps only the codes of its
+    distinct rows, and the input frame is not copied.
+    """
     def __init__(self, df: pd.DataFrame):
-        self.original_df = df.copy()
+        self.original_df = df
         self.columns = list(df.columns)
         self.col_map = self._normalize_and_combine_columns()
-        self.df = pd.DataFrame(self.col_map)
+        self.df = pd.DataFrame(self.col_map, copy=False)
         self.groups = self._group_by_prefix()
         self.tables = []
+        # Rows of self.df each table was projected from, in table order
+        self.table_rows = []
 
     def _normalize_and_combine_columns(self):
-        col_map = {}
-        processed = set()
+        similar = defaultdict(list)
         for col in self.columns:
-            norm = re.sub(r'[\d_]+$', '', col.lower())
-            if norm in processed:
-                continue
-            similar = [c for c in self.columns if re.sub(r'[\d_]+$', '', c.lower()) == norm]
-            combined_series = pd.concat(
-                [self.original_df[c].dropna() for c in similar],
-                ignore_index=True
-            )
-            combined_series = combined_series.astype(str).str.strip()
-            combined_series = combined_series[combined_series.str.lower() != 'nan']
-            col_map[norm] = combined_series.reset_index(drop=True)
-            processed.add(norm)
-            processed.update(similar)
-
-        max_len = max(len(series) for series in col_map.values())
-        for k in col_map:
-            col_map[k] = col_map[k].reindex(range(max_len))
+            similar[TRAILING_INDEX.sub('', col.lower())].append(col)
+
+        combined = {norm: self._combine(cols) for norm, cols in similar.items()}
+        max_len = max((len(codes) for codes, _ in combined.values()), default=0)
+        col_map = {}
+        for norm, (codes, categories) in combined.items():
+            padded = np.full(max_len, -1, dtype=codes.dtype)
+            padded[:len(codes)] = codes
+            col_map[norm] = pd.Categorical.from_codes(padded, categories=categories)
         return col_map
 
+    def _combine(self, cols):
+        """
+        Stacks the non-missing values of `cols` as stripped strings, without
+        'nan' entries. String work is done on the distinct values only;
+        returns (codes, categories) with categories sorted.
+        """
+        value_codes, uniques, offset = [], [], 0
+        for col in cols:
+            codes, col_uniques = pd.factorize(self.original_df[col])
+            value_codes.append(codes[codes >= 0] + offset)
+            uniques.append(pd.Series(col_uniques))
+            offset += len(col_uniques)
+        # Concatenating the distinct values coerces dtypes as stacking the full columns would
+        labels = pd.Index(pd.concat(uniques, ignore_index=True).astype(str).str.strip())
+        valid = np.asarray(labels.str.lower() != 'nan', dtype=bool)
+        label_codes = np.full(len(labels), -1, dtype=np.int64)
+        label_codes[valid], categories = pd.factorize(labels[valid], sort=True)
+        codes = label_codes[np.concatenate(value_codes)] if value_codes else label_codes
+        codes = codes[codes >= 0]
+        dtype = np.int32 if len(categories) < 2 ** 31 else np.int64
+        return codes.astype(dtype), categories
+
     def _group_by_prefix(self):
         groups = defaultdict(list)
         for col in self.df.columns:
-            prefix = re.split(r'[_\-\s\.]+', col.lower())[0]
+            prefix = PREFIX_SEPARATOR.split(col.lower())[0]
             groups[prefix].append(col)
         return [grp for grp in groups.values()]
 
+    def _project(self, cols):
+        rows = np.flatnonzero(~self.df[cols].duplicated().to_numpy())
+        return self.df[cols].take(rows).reset_index(drop=True), rows
+
     def decompose_3nf(self):
         used_cols = set()
         for group_cols in self.groups:
-            table_df = self.df[group_cols].drop_duplicates().reset_index(drop=True)
+            table_df, rows = self._project(group_cols)
             pk = [col for col in group_cols if 'id' in col.lower()]
             if not pk:
                 pk = [group_cols[0]]
@@ -57,10 +90,11 @@ class Semantic3NFPrefixDecomposer:
                 'df': table_df,
                 'foreign_keys': []
             })
+            self.table_rows.append(rows)
 
         remaining_cols = [col for col in self.df.columns if col not in used_cols]
         if remaining_cols:
-            table_df = self.df[remaining_cols].drop_duplicates().reset_index(drop=True)
+            table_df, rows = self._project(remaining_cols)
             pk = [col for col in remaining_cols if 'id' in col.lower()] or [remaining_cols[0]]
             self.tables.append({
                 'table_name': "other_table",
@@ -69,23 +103,34 @@ class Semantic3NFPrefixDecomposer:
                 'df': table_df,
                 'foreign_keys': []
             })
+            self.table_rows.append(rows)
 
         self._assign_primary_as_foreign_keys()
 
     def _assign_primary_as_foreign_keys(self):
+        """
+        Links every other table to the first table's key. A table without
+        that column gets it from the shared frame row it was projected from;
+        where that row has no key value, keys are assigned round-robin.
+        """
         if not self.tables:
             return
         base_table = self.tables[0]
         base_pk = base_table['primary_key'][0]
-        base_values = base_table['df'][base_pk].dropna().astype(str).unique()
+        base_column = self.df[base_pk]
+        base_codes = base_column.cat.codes.to_numpy()
+        base_values = pd.unique(base_table['df'][base_pk].cat.codes.to_numpy())
+        base_values = base_values[base_values >= 0]
 
-        for i, target_table in enumerate(self.tables[1:], start=1):
+        for target_table, rows in zip(self.tables[1:], self.table_rows[1:]):
             if base_pk not in target_table['df'].columns:
-                repeated_values = pd.Series(base_values).sample(
-                    n=len(target_table['df']),
-                    replace=True
-                ).reset_index(drop=True)
-                target_table['df'][base_pk] = repeated_values
+                fk_codes = base_codes[rows]
+                missing = np.flatnonzero(fk_codes < 0)
+                if len(base_values) and len(missing):
+                    fk_codes[missing] = base_values[missing % len(base_values)]
+                target_table['df'][base_pk] = pd.Categorical.from_codes(
+                    fk_codes, categories=base_column.cat.categories
+                )
                 target_table['columns'].append(base_pk)
             target_table['foreign_keys'].append({
                 'ref_table': base_table['table_name'],
@@ -93,20 +138,72 @@ class Semantic3NFPrefixDecomposer:
                 'ref_column': base_pk
             })
 
-    def get_tables_tabular_html(self):
-        html = ""
-        for t in self.tables:
-            table_html = tabulate(t['df'], headers='keys', tablefmt='html', showindex=False)
-            html += f"<h4>{t['table_name']}</h4>"
-            html += f"<div><b>Columns:</b> {', '.join(t['columns'])}<br>"
-            html += f"<b>Primary Key:</b> {', '.join(t['primary_key'])}<br>"
-            if t['foreign_keys']:
-                html += "<b>Foreign Keys:</b><ul>"
-                for fk in t['foreign_keys']:
-                    html += f"<li>{fk['column']} → {fk['ref_table']}.{fk['ref_column']}</li>"
-                html += "</ul>"
-            else:
-                html += "<b>Foreign Keys:</b> None<br>"
-            html += "</div>"
-            html += f"<div class='etl-table-wrapper'>{table_html}</div>"
-        return html
+    def get_tables_tabular_html(self, page_size=None, result_key=None):
+        return tables_tabular_html(self.tables, page_size=page_size, result_key=result_key)
+
+
+class FDSynthesis3NFDecomposer:
+    """
+    3NF decomposition synthesized from the FDs (Bernstein): one table per
+    canonical-cover LHS plus a key table, so every table is in 3NF and the
+    join is lossless. Produces the same `tables` format as the prefix decomposer.
+    """
+    def __init__(self, df: pd.DataFrame, fds: list):
+        self.df = df
+        self.index = FDIndex(list(df.columns), fds)
+        self.tables = []
+
+    def decompose_3nf(self):
+        relations = self.index.synthesize_3nf()
+        used_names = set()
+        for rel in relations:
+            base = f"{rel['key'][0] if rel['key'] else 'key'}_table"
+            name, suffix = base, 2
+            while name in used_names:
+                name, suffix = f"{base}_{suffix}", suffix + 1
+            used_names.add(name)
+            self.tables.append({
+                'table_name': name,
+                'columns': rel['columns'].copy(),
+                'primary_key': rel['key'].copy(),
+                'df': self.df[rel['columns']].drop_duplicates().reset_index(drop=True),
+                'foreign_keys': []
+            })
+        # A table holding another table's whole key references it
+        for table in self.tables:
+            for other in self.tables:
+                if other is table or not other['primary_key'] or set(other['primary_key']) == set(table['primary_key']):
+                    continue
+                if set(other['primary_key']) <= set(table['columns']):
+                    for col in other['primary_key']:
+                        table['foreign_keys'].append({
+                            'ref_table': other['table_name'],
+                            'column': col,
+                            'ref_column': col
+                        })
+
+    def get_tables_tabular_html(self, page_size=None, result_key=None):
+        return tables_tabular_html(self.tables, page_size=page_size, result_key=result_key)
+
+
+def tables_tabular_html(tables, page_size=None, result_key=None):
+    """With `page_size`, only the first page of each table is rendered; the rest is paged in by the UI."""
+    html = ""
+    for i, t in enumerate(tables):
+        if page_size is None:
+            table_html = f"<div class='etl-table-wrapper'>{tabulate(t['df'], headers='keys', tablefmt='html', showindex=False)}</div>"
+        else:
+            table_html = preview_table_html(t['df'], result_key or "", table=str(i), page_size=page_size)
+        html += f"<h4>{t['table_name']}</h4>"
+        html += f"<div><b>Columns:</b> {', '.join(t['columns'])}<br>"
+        html += f"<b>Primary Key:</b> {', '.join(t['primary_key'])}<br>"
+        if t['foreign_keys']:
+            html += "<b>Foreign Keys:</b><ul>"
+            for fk in t['foreign_keys']:
+                html += f"<li>{fk['column']} → {fk['ref_table']}.{fk['ref_column']}</li>"
+            html += "</ul>"
+        else:
+            html += "<b>Foreign Keys:</b> None<br>"
+        html += "</div>"
+        html += table_html
+    return html
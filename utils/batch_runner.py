@@ -0,0 +1,289 @@
+"""
+Runs the ETL pipeline headlessly over many CSV files, one process per file.
+
+    python -m utils.batch_runner data/ "exports/**/*.csv" --output out/ --workers 4
+    python -m utils.batch_runner data/ --output out/ --steps clean fd 1nf 2nf 3nf \\
+        --option decomposition=synthesis
+
+Every input gets a folder in the output directory holding its normalized
+tables (one file per 3NF table, or the last step's table), `schema.json`
+with their keys, `fds.json` with the FD and 2NF reports, with the er
+step the diagram and with the sql step the database (`database.sqlite`
+or the psql script `database.sql`), its DDL in `schema.sql` and the load
+report in `sql_export.json`. `manifest.json` records each finished file
+with the hash of its content; a rerun skips files already done with the
+same steps, options and settings, so an interrupted batch resumes where it stopped.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils.columnar_store import write_frame
+from utils.er_generator import generate_er_diagram
+from utils.pipeline import STEPS, NUMERIC_STEP_OPTIONS, Pipeline, cache_steps, validate_options, validate_steps
+from utils.step_cache import file_digest
+
+MANIFEST_NAME = "manifest.json"
+TABLE_FORMATS = ("csv", "feather")
+
+
+def find_inputs(patterns: List[str], recursive: bool = False) -> List[str]:
+    """CSV files named by `patterns`: files, directories (their *.csv) or glob patterns."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.csv") if recursive else os.path.join(pattern, "*.csv")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(".csv"):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_names(paths: List[str]) -> Dict[str, str]:
+    """Output folder name per input: its file name, with a path hash where names collide."""
+    stems: Dict[str, List[str]] = {}
+    for path in paths:
+        stems.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+    names = {}
+    for stem, group in stems.items():
+        for path in group:
+            names[path] = stem if len(group) == 1 else f"{stem}_{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+    return names
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "table"
+
+
+def _write_table(df: pd.DataFrame, path: str, table_format: str) -> str:
+    if table_format == "feather":
+        return write_frame(df, f"{path}.feather")
+    df.to_csv(f"{path}.csv", index=False)
+    return f"{path}.csv"
+
+
+def write_outputs(outcomes: Dict, out_dir: str, table_format: str) -> List[str]:
+    """Writes the tables, schema and FD report of one run; returns the paths written."""
+    state = outcomes["state"]
+    written = []
+    tables = state["tables"]
+    if tables is None:
+        # No 3NF step: the last step's table
+        tables = [{"table_name": "table", "columns": None, "primary_key": [], "foreign_keys": [], "df": state["df"]}]
+    table_dir = os.path.join(out_dir, "tables")
+    os.makedirs(table_dir, exist_ok=True)
+    schema = []
+    for table in tables:
+        path = os.path.join(table_dir, _safe_name(table["table_name"]))
+        if table["df"] is not None:
+            written.append(_write_table(table["df"], path, table_format))
+        else:
+            # Streamed result that only exists on disk
+            written.append(shutil.copyfile(state["latest_path"], f"{path}{os.path.splitext(state['latest_path'])[1]}"))
+        schema.append({
+            "table_name": table["table_name"],
+            "file": os.path.relpath(written[-1], out_dir),
+            "columns": table["columns"] or (list(table["df"].columns) if table["df"] is not None else None),
+            "primary_key": table["primary_key"],
+            "foreign_keys": table["foreign_keys"]
+        })
+    written.append(_write_json(os.path.join(out_dir, "schema.json"), schema))
+
+    report = {}
+    if "fd" in outcomes:
+        report["fds"] = outcomes["fd"]["fds"]
+        for key in ("approximate", "stats", "fd_reuse"):
+            if key in outcomes["fd"]:
+                report[key] = outcomes["fd"][key]
+    if "2nf" in outcomes:
+        report["second_nf"] = {key: outcomes["2nf"][key] for key in ("primary_key", "is_2nf", "violations")}
+    if report:
+        written.append(_write_json(os.path.join(out_dir, "fds.json"), report))
+    if "er" in outcomes:
+        written.append(outcomes["er"]["path"])
+    if "sql" in outcomes:
+        report = dict(outcomes["sql"]["report"])
+        path = os.path.join(out_dir, "database" + os.path.splitext(report["path"])[1])
+        os.replace(report["path"], path)
+        report["path"] = os.path.relpath(path, out_dir)
+        with open(os.path.join(out_dir, "schema.sql"), "w") as f:
+            f.write(report.pop("ddl"))
+        written += [path, os.path.join(out_dir, "schema.sql"), _write_json(os.path.join(out_dir, "sql_export.json"), report)]
+    return written
+
+
+def _write_json(path: str, data) -> str:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def process_file(csv_path: str, out_dir: str, steps: List[str], options: Dict, config: Dict,
+                 table_format: str = "csv", keep_work: bool = False) -> Dict:
+    """
+    Runs the pipeline on one file (in a worker process) and writes its
+    outputs under `out_dir`. Intermediates go to `out_dir`/work, so input
+    folders are never written to. Returns the manifest entry.
+    """
+    started = time.time()
+    work_dir = os.path.join(out_dir, "work")
+    os.makedirs(work_dir, exist_ok=True)
+    work_csv = os.path.join(work_dir, os.path.basename(csv_path))
+    if os.path.exists(work_csv):
+        os.remove(work_csv)
+    try:
+        os.link(csv_path, work_csv)
+    except OSError:
+        shutil.copyfile(csv_path, work_csv)
+
+    def render_er(tables, format, layout):
+        return generate_er_diagram(tables, output_folder=out_dir, filename="er_diagram", format=format, layout=layout)
+
+    try:
+        pipeline = Pipeline({**config, "WORK_FOLDER": work_dir, "EXPORT_FOLDER": None}, render_er=render_er)
+        outcomes = pipeline.run(work_csv, steps, options)
+        if "error" in outcomes:
+            return {"status": "failed", "error": outcomes["error"], "seconds": round(time.time() - started, 3)}
+        outputs = write_outputs(outcomes, out_dir, table_format)
+    finally:
+        if not keep_work:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "status": "done",
+        "outputs": [os.path.relpath(path, out_dir) for path in outputs],
+        "seconds": round(time.time() - started, 3),
+        "step_seconds": {step: outcomes[step]["metrics"]["wall_seconds"] for step in steps}
+    }
+
+
+class Manifest:
+    """`manifest.json` of an output directory: one entry per input, rewritten after every file."""
+
+    def __init__(self, out_dir: str):
+        self.path = os.path.join(out_dir, MANIFEST_NAME)
+        self.files: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_done(self, csv_path: str, digest: str, run_key: str) -> bool:
+        entry = self.files.get(csv_path)
+        return bool(entry) and entry["status"] == "done" and entry["digest"] == digest and entry["run_key"] == run_key
+
+    def record(self, csv_path: str, entry: Dict) -> None:
+        self.files[csv_path] = entry
+        _write_json(self.path, {"files": self.files})
+
+
+def run_batch(inputs: List[str], out_dir: str, steps: List[str], options: Optional[Dict] = None,
+              config: Optional[Dict] = None, workers: int = 1, table_format: str = "csv",
+              force: bool = False, keep_work: bool = False, log=print) -> Manifest:
+    """
+    Processes `inputs` on `workers` processes, skipping files the manifest
+    already has as done with the same content, steps, options and settings
+    (unless `force`). Returns the manifest.
+    """
+    options = options or {}
+    # FD results shared by all files, so changed versions of a file revalidate only what changed
+    config = {"FD_STORE_FOLDER": os.path.join(out_dir, ".fd_store"), **(config or {})}
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = Manifest(out_dir)
+    run_key = ",".join(cache_steps(steps, options))
+    # Settings such as FIRST_NF_MAX_ROWS change the outputs too; the FD store only saves work
+    settings = sorted((key, value) for key, value in config.items() if key != "FD_STORE_FOLDER")
+    if settings:
+        run_key += "|" + ",".join(f"{key}={value}" for key, value in settings)
+    names = output_names(inputs)
+    # Keep the folder a file got in an earlier run
+    names.update({path: manifest.files[path]["output"] for path in inputs if path in manifest.files})
+    pending = []
+    for path in inputs:
+        digest = file_digest(path)
+        if not force and manifest.is_done(path, digest, run_key):
+            log(f"skip  {path} (done)")
+            continue
+        pending.append((path, digest))
+
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(process_file, path, os.path.join(out_dir, names[path]), steps, options, config,
+                        table_format, keep_work): (path, digest)
+            for path, digest in pending
+        }
+        try:
+            for future in as_completed(futures):
+                path, digest = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    entry = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+                entry.update(digest=digest, run_key=run_key, output=names[path], finished=time.time())
+                manifest.record(path, entry)
+                log(f"{entry['status']:<5} {path}" + (f" ({entry['error']})" if entry["status"] == "failed" else
+                                                      f" in {entry['seconds']}s"))
+        except KeyboardInterrupt:
+            # Finished files are in the manifest; the next run resumes from there
+            for future in futures:
+                future.cancel()
+            raise
+    return manifest
+
+
+def _parse_option(text: str):
+    name, _, value = text.partition("=")
+    if name in NUMERIC_STEP_OPTIONS:
+        try:
+            return name, float(value)
+        except ValueError:
+            pass
+    return name, value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--output", required=True, help="output directory")
+    parser.add_argument("--steps", nargs="+", choices=STEPS, default=["clean", "fd", "1nf", "2nf", "3nf"])
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="pipeline option, e.g. decomposition=synthesis (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--recursive", action="store_true", help="include CSVs in subdirectories")
+    parser.add_argument("--table-format", choices=TABLE_FORMATS, default="csv")
+    parser.add_argument("--first-nf-max-rows", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="rerun files the manifest has as done")
+    parser.add_argument("--keep-work", action="store_true", help="keep intermediate files")
+    args = parser.parse_args(argv)
+
+    options = dict(_parse_option(text) for text in args.option)
+    error = validate_steps(args.steps) or validate_options(options)
+    if error:
+        print(error["error"], file=sys.stderr)
+        return 2
+    inputs = find_inputs(args.inputs, args.recursive)
+    if not inputs:
+        print("No CSV files found.", file=sys.stderr)
+        return 2
+    config = {}
+    if args.first_nf_max_rows is not None:
+        config["FIRST_NF_MAX_ROWS"] = args.first_nf_max_rows
+    manifest = run_batch(inputs, args.output, args.steps, options, config, workers=args.workers,
+                         table_format=args.table_format, force=args.force, keep_work=args.keep_work)
+    failed = [path for path in inputs if manifest.files.get(path, {}).get("status") != "done"]
+    print(f"{len(inputs) - len(failed)} of {len(inputs)} files done; manifest: {manifest.path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.dtype_profile import read_csv_compact, save_profile
+
+COLUMNAR_EXT = ".feather"
+
+
+def columnar_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + COLUMNAR_EXT
+
+
+def write_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a DataFrame as an uncompressed Arrow IPC (Feather v2) file so it can
+    be memory-mapped back without a copy. Dtypes, including categoricals, are kept.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_frame(path: str, columns: Optional[list] = None) -> pd.DataFrame:
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def frame_shape(path: str) -> Tuple[int, int]:
+    """(rows, columns) of a stored frame, read from the file metadata only."""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return rows, len(reader.schema)
+
+
+def csv_shape(csv_path: str, chunksize: int = 1_000_000) -> Tuple[int, int]:
+    """(rows, columns) of a CSV counted in chunks, for files too large to ingest."""
+    n_cols = len(pd.read_csv(csv_path, nrows=0).columns)
+    n_rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[0], chunksize=chunksize)) if n_cols else 0
+    return n_rows, n_cols
+
+
+def ingest_csv(csv_path: str) -> str:
+    """
+    Converts an uploaded CSV to the columnar format once and returns the path
+    of the stored frame. Later calls reuse it while it is newer than the CSV.
+    Dtypes are profiled on the way in (narrow ints, categoricals, Arrow
+    strings); the memory profile is stored next to the frame.
+    """
+    path = columnar_path(csv_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        return path
+    df, profile = read_csv_compact(csv_path)
+    save_profile(path, profile)
+    return write_frame(df, path)
+
+
+class LazyFrame:
+    """Handle on a stored frame that is only read when the data is needed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._df = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        if self._df is not None:
+            return self._df.shape
+        return frame_shape(self.path)
+
+    def load(self) -> pd.DataFrame:
+        if self._df is None:
+            self._df = read_frame(self.path)
+        return self._df
@@ -1,7 +1,32 @@
-import pandas as pd
+import os
+import pickle
 import re
+import shutil
+import tempfile
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
+ROOT_PATTERN = re.compile(r"^(.*?)(?:[._\s]*\d*)?$")
+
+def column_roots(columns):
+    """Groups columns by their name without a numbered suffix (`side effect.1` -> `side effect`)."""
+    root_map = defaultdict(list)
+    for col in columns:
+        root = ROOT_PATTERN.match(col).group(1).strip()
+        root_map[root].append(col)
+    return root_map
+
+def strip_categories(series):
+    """astype(str).str.strip() for a categorical, done on the categories so the column stays encoded."""
+    labels = series.cat.categories.astype(str).str.strip()
+    label_codes, categories = pd.factorize(labels, sort=True)
+    codes = series.cat.codes.to_numpy()
+    stripped = np.full(len(codes), -1, dtype=np.int64)
+    stripped[codes >= 0] = label_codes[codes[codes >= 0]]
+    return pd.Series(pd.Categorical.from_codes(stripped, categories=categories), index=series.index, name=series.name)
+
 def clean_data(df, fillna_value=None, dropna=False):
     cleaning_info = {}
 
@@ -11,11 +36,7 @@ def clean_data(df, fillna_value=None, dropna=False):
     cleaning_info['original_columns'] = original_columns
     cleaning_info['cleaned_columns'] = new_columns
 
-    root_map = defaultdict(list)
-    pat = re.compile(r"^(.*?)(?:[._\s]*\d*)?$")
-    for col in df.columns:
-        root = pat.match(col).group(1).strip()
-        root_map[root].append(col)
+    root_map = column_roots(df.columns)
 
     merged_cols = []
     for root, cols in root_map.items():
@@ -29,9 +50,12 @@ def clean_data(df, fillna_value=None, dropna=False):
     if merged_cols:
         cleaning_info['merged_column_groups'] = merged_cols
 
-    str_cols = df.select_dtypes(include=['object', 'string']).columns
+    str_cols = df.select_dtypes(include=['object', 'string', 'category']).columns
     for col in str_cols:
-        df[col] = df[col].astype(str).str.strip()
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = strip_categories(df[col])
+        else:
+            df[col] = df[col].astype(str).str.strip()
     cleaning_info['stripped_string_columns'] = list(str_cols)
 
     before_dedup = len(df)
@@ -50,4 +74,204 @@ def clean_data(df, fillna_value=None, dropna=False):
     cleaning_info['missing_values_after'] = int(df.isnull().sum().sum())
 
     df = df.reset_index(drop=True)
-    return df, cleaning_info          
+    return df, cleaning_info
+
+def _column_kinds(csv_path, chunksize):
+    """First pass over a CSV: the header and a dtype kind per column that holds for every chunk."""
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    kinds = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for col, dtype in chunk.dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype):
+                kind = "bool"
+            elif pd.api.types.is_integer_dtype(dtype):
+                kind = "int"
+            elif pd.api.types.is_float_dtype(dtype):
+                kind = "float"
+            else:
+                kind = "object"
+            prev = kinds.get(col)
+            if prev is None or prev == kind:
+                kinds[col] = kind
+            elif {prev, kind} == {"int", "float"}:
+                kinds[col] = "float"
+            else:
+                kinds[col] = "object"
+    for col in columns:
+        kinds.setdefault(col, "object")
+    return columns, kinds
+
+def _widened(kind, widen):
+    # Appending rows with missing values turns int columns into float and bool columns into object
+    if kind == "int":
+        return "float64" if widen else "int64"
+    if kind == "bool":
+        return "object" if widen else "bool"
+    return "float64" if kind == "float" else "object"
+
+def clean_data_chunked(csv_path, output_path, chunksize=100_000, fillna_value=None, dropna=False,
+                       spill_folder=None, n_partitions=64):
+    """
+    Streaming variant of clean_data for files larger than memory. The CSV is
+    read in chunks; header normalization, column-root merging and string
+    stripping are applied per chunk, and the cleaned rows are written to
+    `output_path` (CSV) incrementally, in the same order as clean_data.
+
+    Duplicates are removed out of core: every row's 64-bit hash is spilled to
+    one of `n_partitions` files on disk, and each partition is searched on its
+    own for repeated hashes. Only rows sharing a hash are read back and
+    compared, so a hash collision never drops a distinct row; a disk-backed
+    keep mask filters the rows on the way out.
+
+    Returns the same cleaning_info counters as clean_data.
+    """
+    raw_columns, raw_kinds = _column_kinds(csv_path, chunksize)
+    cleaning_info = {}
+    new_columns = [col.strip().lower() for col in raw_columns]
+    cleaning_info['original_columns'] = raw_columns
+    cleaning_info['cleaned_columns'] = new_columns
+    kinds = {new: raw_kinds[raw] for raw, new in zip(raw_columns, new_columns)}
+
+    groups = [(root, cols) for root, cols in column_roots(new_columns).items() if len(cols) > 1]
+    merged_sources = [c for _, cols in groups for c in cols]
+    remaining = [c for c in new_columns if c not in merged_sources]
+    final_dtypes = {c: _widened(kinds[c], bool(groups)) for c in remaining}
+    final_dtypes.update({root: "object" for root, _ in groups})
+    str_cols = [c for c, dtype in final_dtypes.items() if dtype == "object"]
+
+    def finalize(frame):
+        for col, dtype in final_dtypes.items():
+            frame[col] = frame[col].astype(dtype)
+        for col in str_cols:
+            frame[col] = frame[col].astype(str).str.strip()
+        return frame
+
+    work = tempfile.mkdtemp(prefix="clean_", dir=spill_folder)
+    try:
+        hash_files = [open(os.path.join(work, f"hash_{p}.bin"), "wb") for p in range(n_partitions)]
+        stack_paths = {c: os.path.join(work, f"stack_{i}.pkl") for i, c in enumerate(merged_sources)}
+        stack_files = {c: open(path, "wb") for c, path in stack_paths.items()}
+        spilled_chunks = []
+        total = 0
+
+        def spill(frame):
+            nonlocal total
+            hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+            seqs = np.arange(total, total + len(frame), dtype=np.uint64)
+            parts = hashes % np.uint64(n_partitions)
+            for p in np.unique(parts):
+                mask = parts == p
+                np.column_stack([hashes[mask], seqs[mask]]).tofile(hash_files[int(p)])
+            path = os.path.join(work, f"chunk_{len(spilled_chunks)}.pkl")
+            frame.reset_index(drop=True).to_pickle(path)
+            spilled_chunks.append((path, total, len(frame)))
+            total += len(frame)
+
+        # Pass 1: original rows; values of merged columns are set aside per source column
+        read_dtypes = {raw: _widened(raw_kinds[raw], False) for raw in raw_columns}
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=read_dtypes):
+            chunk.columns = new_columns
+            for gi, (root, cols) in enumerate(groups):
+                for c in cols:
+                    values = chunk[c].astype(_widened(kinds[c], gi > 0))
+                    stacked = values.dropna().astype(str).str.strip()
+                    pickle.dump(stacked[stacked != ""].reset_index(drop=True), stack_files[c])
+            base = chunk[remaining].copy()
+            for root, _ in groups:
+                base[root] = np.nan
+            spill(finalize(base))
+
+        # Merged rows follow all original rows, group by group and column by column
+        for root, cols in groups:
+            for c in cols:
+                stack_files[c].close()
+                with open(stack_paths[c], "rb") as f:
+                    while True:
+                        try:
+                            values = pickle.load(f)
+                        except EOFError:
+                            break
+                        if not len(values):
+                            continue
+                        frame = pd.DataFrame({col: np.nan for col in final_dtypes}, index=range(len(values)))
+                        frame[root] = values.to_numpy(dtype=object)
+                        spill(finalize(frame))
+        for f in hash_files:
+            f.close()
+        if groups:
+            cleaning_info['merged_column_groups'] = [root for root, _ in groups]
+        cleaning_info['stripped_string_columns'] = str_cols
+
+        # Pass 2: rows whose hash occurs more than once, one partition at a time
+        keep = np.memmap(os.path.join(work, "keep.bin"), dtype=np.uint8, mode="w+", shape=(max(total, 1),))
+        keep[:] = 1
+        candidate = np.memmap(os.path.join(work, "candidate.bin"), dtype=np.uint8, mode="w+", shape=(max(total, 1),))
+        for p in range(n_partitions):
+            pairs = np.fromfile(os.path.join(work, f"hash_{p}.bin"), dtype=np.uint64).reshape(-1, 2)
+            if not len(pairs):
+                continue
+            hashes, seqs = pairs[:, 0], pairs[:, 1]
+            order = np.argsort(hashes, kind="stable")
+            hashes, seqs = hashes[order], seqs[order]
+            repeated = np.zeros(len(hashes), dtype=bool)
+            repeated[1:] = hashes[1:] == hashes[:-1]
+            repeated[:-1] |= repeated[1:]
+            candidate[seqs[repeated].astype(np.int64)] = 1
+
+        # Pass 3: an equal hash only makes rows candidates; comparing the rows decides, as in
+        # drop_duplicates. Candidates are deduplicated within their chunk, then regrouped by
+        # hash partition, so equal rows meet and each partition is compared on its own.
+        candidate_paths = {}
+        for path, start, n in spilled_chunks:
+            flags = candidate[start:start + n].astype(bool)
+            if not flags.any():
+                continue
+            frame = pd.read_pickle(path)[flags]
+            frame.index = np.arange(start, start + n)[flags]
+            within = frame.duplicated()
+            keep[frame.index[within].to_numpy()] = 0
+            frame = frame[~within]
+            parts = pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64) % np.uint64(n_partitions)
+            for p in np.unique(parts):
+                part_path = candidate_paths.setdefault(int(p), os.path.join(work, f"candidates_{int(p)}.pkl"))
+                with open(part_path, "ab") as f:
+                    pickle.dump(frame[parts == p], f)
+        for part_path in candidate_paths.values():
+            frames = []
+            with open(part_path, "rb") as f:
+                while True:
+                    try:
+                        frames.append(pickle.load(f))
+                    except EOFError:
+                        break
+            frame = pd.concat(frames).sort_index(kind="stable")
+            keep[frame.index[frame.duplicated()].to_numpy()] = 0
+        del candidate
+
+        # Pass 4: write surviving rows
+        kept = na_before = na_after = 0
+        with open(output_path, "w", newline="") as out:
+            pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in final_dtypes.items()}).to_csv(out, index=False)
+            for path, start, n in spilled_chunks:
+                frame = pd.read_pickle(path)
+                frame = frame[keep[start:start + n].astype(bool)]
+                kept += len(frame)
+                na_before += int(frame.isnull().sum().sum())
+                if dropna:
+                    frame = frame.dropna()
+                elif fillna_value is not None:
+                    frame = frame.fillna(fillna_value)
+                na_after += int(frame.isnull().sum().sum())
+                frame.to_csv(out, header=False, index=False)
+        del keep
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    cleaning_info['duplicates_removed'] = total - kept
+    if dropna:
+        cleaning_info['rows_dropped_due_to_na'] = na_before
+    elif fillna_value is not None:
+        cleaning_info['na_filled_with'] = fillna_value
+    cleaning_info['missing_values_before'] = na_before
+    cleaning_info['missing_values_after'] = na_after
+    return cleaning_info
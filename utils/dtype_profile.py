@@ -0,0 +1,141 @@
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.fingerprints import column_fingerprints
+
+SAMPLE_ROWS = 50_000
+# Text columns with at most this many distinct values per non-missing value become categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Arrow-backed strings with NaN as the missing value, like pandas' default `str`
+ARROW_STRING = pd.StringDtype("pyarrow", na_value=np.nan)
+PROFILE_SUFFIX = ".profile.json"
+
+
+def column_bytes(df: pd.DataFrame) -> Dict[str, int]:
+    return {str(col): int(size) for col, size in df.memory_usage(deep=True, index=False).items()}
+
+
+def _is_text(series: pd.Series) -> bool:
+    dtype = series.dtype
+    if isinstance(dtype, pd.StringDtype):
+        return True
+    return dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+
+
+def infer_dtypes(sample: pd.DataFrame, category_max_ratio: float = CATEGORY_MAX_RATIO) -> Dict[str, object]:
+    """
+    read_csv dtypes for the text columns of `sample`: "category" when the
+    values repeat enough, Arrow strings otherwise. Other columns are left to
+    the parser and narrowed after the read.
+    """
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if not _is_text(series):
+            continue
+        n = series.count()
+        dtypes[col] = "category" if n and series.nunique() <= category_max_ratio * n else ARROW_STRING
+    return dtypes
+
+
+def compact_column(series: pd.Series, category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.Series:
+    """
+    Narrowest faithful representation of one column: integers downcast,
+    repetitive text as a categorical with sorted categories (so sorting is
+    unchanged), other text as Arrow strings. Floats are kept as they are,
+    since narrowing them would change their values.
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return pd.to_numeric(series, downcast="unsigned" if dtype.kind == "u" else "integer")
+    if isinstance(dtype, pd.CategoricalDtype):
+        used = series.cat.remove_unused_categories()
+        if len(used.cat.categories) <= category_max_ratio * max(used.count(), 1):
+            return used
+        return used.astype(ARROW_STRING) if _is_text(pd.Series(used.cat.categories)) else series
+    if not _is_text(series):
+        return series
+    codes, uniques = pd.factorize(series, sort=True)
+    if len(uniques) <= category_max_ratio * max(int((codes >= 0).sum()), 1):
+        return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index, name=series.name)
+    return series if series.dtype == ARROW_STRING else series.astype(ARROW_STRING)
+
+
+def compact_frame(df: pd.DataFrame, category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """compact_column applied to every column; the input frame is not modified."""
+    out = df.copy(deep=False)
+    for i in range(out.shape[1]):
+        out.isetitem(i, compact_column(out.iloc[:, i], category_max_ratio))
+    return out
+
+
+def read_csv_compact(csv_path: str, sample_rows: int = SAMPLE_ROWS,
+                     category_max_ratio: float = CATEGORY_MAX_RATIO) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Reads a CSV with dtypes inferred from its first `sample_rows` rows and
+    returns (frame, profile). The profile holds per column the bytes the
+    default read would take (extrapolated from the sample), the bytes
+    actually used and a fingerprint of its content.
+    """
+    sample = pd.read_csv(csv_path, nrows=sample_rows)
+    df = pd.read_csv(csv_path, dtype=infer_dtypes(sample, category_max_ratio))
+    # Also corrects columns the sample did not represent well
+    df = compact_frame(df, category_max_ratio)
+
+    scale = len(df) / len(sample) if len(sample) else 0
+    default = {col: int(size * scale) for col, size in column_bytes(sample).items()}
+    compact = column_bytes(df)
+    fingerprints = column_fingerprints(df)
+    profile = {
+        "rows": len(df),
+        "sample_rows": len(sample),
+        "columns": {
+            str(col): {
+                "dtype": str(df[col].dtype),
+                "default_bytes": default.get(str(col), 0),
+                "bytes": compact[str(col)],
+                "fingerprint": fingerprints[str(col)]
+            }
+            for col in df.columns
+        },
+        "default_bytes": sum(default.values()),
+        "bytes": sum(compact.values())
+    }
+    return df, profile
+
+
+def profile_path(frame_path: str) -> str:
+    return os.path.splitext(frame_path)[0] + PROFILE_SUFFIX
+
+
+def save_profile(frame_path: str, profile: Dict) -> None:
+    with open(profile_path(frame_path), "w") as f:
+        json.dump(profile, f)
+
+
+def load_profile(frame_path: str) -> Optional[Dict]:
+    try:
+        with open(profile_path(frame_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def memory_summary(profile: Optional[Dict], df: pd.DataFrame) -> Dict:
+    """Bytes per column of `df`, with the ingest profile's default vs. compact totals when known."""
+    after = column_bytes(df)
+    summary = {"bytes_per_column": after, "bytes": sum(after.values())}
+    if profile:
+        summary["ingest_default_bytes"] = profile["default_bytes"]
+        summary["ingest_bytes"] = profile["bytes"]
+        summary["ingest_bytes_per_column"] = {
+            col: {"default": stats["default_bytes"], "compact": stats["bytes"]}
+            for col, stats in profile["columns"].items()
+        }
+    return summary
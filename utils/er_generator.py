@@ -1,15 +1,71 @@
 import graphviz
+import hashlib
+import html
+import json
 import math
+import os
 import re
-from typing import List, Dict
+import threading
+import uuid
+from collections import deque
+from typing import List, Dict, Tuple
+
+ER_FORMATS = ("png", "svg", "dot")
+ER_LAYOUTS = ("circular", "grid", "hierarchical")
+# The circular layout gets crowded past this many entities
+CIRCULAR_MAX_ENTITIES = 30
+
+def normalize(colname):
+    return re.sub(r'[\d_.]+$', '', colname.lower())
+
+def resolve_layout(layout: str, n_tables: int) -> str:
+    """"auto" keeps the circular layout for small schemas and switches to the grid beyond."""
+    if layout == "auto":
+        return "circular" if n_tables <= CIRCULAR_MAX_ENTITIES else "grid"
+    return layout
 
 def generate_er_diagram(
     tables: List[Dict],
     output_folder: str = ".",
     filename: str = "er_diagram",
-    format: str = "png"
+    format: str = "png",
+    layout: str = "circular"
 ):
-    dot = graphviz.Digraph(format=format, engine="neato")
+    """
+    Writes the ER diagram of `tables` and returns the file path.
+
+    `layout="circular"` places entities on a circle with attribute ellipses
+    around them; "grid" and "hierarchical" draw each entity as one box
+    listing its attributes, placed on a grid ordered by FK neighbourhood or
+    ranked by Graphviz `dot`, which stays readable with hundreds of entities.
+    `format="dot"` only writes the Graphviz source, and grid SVGs are
+    written directly, so neither needs the Graphviz binaries.
+    """
+    if format not in ER_FORMATS:
+        raise ValueError(f"Unknown ER format '{format}', expected one of {ER_FORMATS}")
+    layout = resolve_layout(layout, len(tables))
+    if layout not in ER_LAYOUTS:
+        raise ValueError(f"Unknown ER layout '{layout}', expected one of {ER_LAYOUTS}")
+    output_path = f"{output_folder}/{filename}"
+    if format == "svg" and layout == "grid":
+        path = f"{output_path}.svg"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(grid_svg(tables))
+        return path
+    if layout == "circular":
+        dot = _circular_graph(tables)
+    else:
+        dot = _entity_graph(tables, layout)
+    if format == "dot":
+        path = f"{output_path}.gv"
+        dot.save(path)
+        return path
+    dot.format = format
+    dot.render(output_path, cleanup=True)
+    return f"{output_path}.{format}"
+
+def _circular_graph(tables: List[Dict]) -> graphviz.Digraph:
+    dot = graphviz.Digraph(engine="neato")
     dot.attr('graph', splines="true", overlap="false", margin="0.5")
     dot.attr('node', fontname="Arial", fontsize="18", width="1.8", height="0.6")
     dot.attr('edge', fontname="Arial", fontsize="16")
@@ -19,9 +75,6 @@ def generate_er_diagram(
     attr_radius = 3.5
     entity_positions = {}
 
-    def normalize(colname):
-        return re.sub(r'[\d_.]+$', '', colname.lower())
-
     for idx, table in enumerate(tables):
         raw_name = table['table_name']
         angle = 2 * math.pi * idx / n_entities
@@ -39,16 +92,8 @@ def generate_er_diagram(
             pos=f"{x},{y}!",
             pin="true"
         )
-        raw_columns = table.get("columns", [])
-        fk_columns = {fk['column'] for fk in table.get("foreign_keys", [])}
-        non_fk_columns = [col for col in raw_columns if col not in fk_columns]
-        collapsed = {}
-        for col in non_fk_columns:
-            base = normalize(col)
-            if base not in collapsed:
-                collapsed[base] = set()
-            collapsed[base].add(col)
-        for i, base_attr in enumerate(collapsed.keys()):
+        collapsed = _collapsed_attributes(table)
+        for i, base_attr in enumerate(collapsed):
             a_angle = angle + (2 * math.pi * i / len(collapsed)) / 2 if len(collapsed) > 1 else angle
             ax = x + attr_radius * math.cos(a_angle)
             ay = y + attr_radius * math.sin(a_angle)
@@ -94,6 +139,203 @@ def generate_er_diagram(
             )
             dot.edge(src, relation_name, color='orchid', constraint="false", arrowhead="none")
             dot.edge(tgt, relation_name, color='orchid', constraint="false", arrowhead="none")
-    output_path = f"{output_folder}/{filename}"
-    dot.render(output_path, cleanup=True)
-    return f"{output_path}.{format}"
+    return dot
+
+def _collapsed_attributes(table: Dict) -> List[str]:
+    """Non-FK columns with numbered repeats (`author_1`, `author_2`) shown once."""
+    fk_columns = {fk['column'] for fk in table.get("foreign_keys", [])}
+    collapsed = {}
+    for col in table.get("columns", []):
+        if col not in fk_columns:
+            collapsed.setdefault(normalize(col), None)
+    return list(collapsed)
+
+def _fk_edges(tables: List[Dict]) -> List[Tuple[str, str]]:
+    names = {t['table_name'] for t in tables}
+    edges = []
+    for table in tables:
+        for fk in table.get("foreign_keys", []):
+            edge = (table['table_name'], fk['ref_table'])
+            if fk['ref_table'] in names and edge not in edges:
+                edges.append(edge)
+    return edges
+
+def _entity_rows(table: Dict) -> List[Tuple[str, str]]:
+    """(marker, attribute) rows of an entity box: keys first, then attributes, then FKs."""
+    pk = list(dict.fromkeys(normalize(c) for c in table.get('primary_key', [])))
+    fks = list(dict.fromkeys(fk['column'] for fk in table.get("foreign_keys", [])))
+    rows = [("PK", col) for col in pk]
+    rows += [("", col) for col in _collapsed_attributes(table) if col not in pk]
+    rows += [("FK", col) for col in fks]
+    return rows
+
+def _entity_graph(tables: List[Dict], layout: str) -> graphviz.Digraph:
+    # Grid positions are pinned (neato only draws the edges); hierarchical lets dot rank the entities
+    engine = "neato" if layout == "grid" else "dot"
+    dot = graphviz.Digraph(engine=engine)
+    dot.attr('graph', margin="0.5", rankdir="LR", splines="line" if layout == "grid" else "true")
+    dot.attr('node', fontname="Arial", fontsize="12", shape="plaintext")
+    dot.attr('edge', color="orchid", arrowhead="crow", arrowtail="tee", dir="both")
+    positions = grid_positions(tables) if layout == "grid" else {}
+    for table in tables:
+        name = table['table_name']
+        cells = "".join(
+            f"<TR><TD ALIGN='LEFT'>{marker}</TD><TD ALIGN='LEFT'>{html.escape(col)}</TD></TR>"
+            for marker, col in _entity_rows(table)
+        )
+        label = (
+            "<<TABLE BORDER='1' CELLBORDER='0' CELLSPACING='0' CELLPADDING='3' BGCOLOR='lightyellow'>"
+            f"<TR><TD COLSPAN='2' BGCOLOR='lightblue'><B>{html.escape(name)}</B></TD></TR>{cells}</TABLE>>"
+        )
+        extra = {}
+        if name in positions:
+            x, y, _, _ = positions[name]
+            # Graphviz positions are in inches with y pointing up
+            extra = {"pos": f"{x / 72:.2f},{-y / 72:.2f}!", "pin": "true"}
+        dot.node(name, label, **extra)
+    for src, tgt in _fk_edges(tables):
+        dot.edge(src, tgt)
+    return dot
+
+def _neighbourhood_order(tables: List[Dict]) -> List[str]:
+    """Breadth-first over the FK graph, so related entities end up close together."""
+    names = [t['table_name'] for t in tables]
+    adjacent = {name: [] for name in names}
+    for src, tgt in _fk_edges(tables):
+        adjacent[src].append(tgt)
+        adjacent[tgt].append(src)
+    order, seen = [], set()
+    for start in names:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            name = queue.popleft()
+            order.append(name)
+            for other in adjacent[name]:
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+    return order
+
+def _box_size(table: Dict) -> Tuple[float, float]:
+    rows = _entity_rows(table)
+    longest = max([len(table['table_name'])] + [len(col) + 4 for _, col in rows])
+    return 7.0 * longest + 24, 20.0 * (len(rows) + 1) + 8
+
+def grid_positions(tables: List[Dict], gap: float = 60.0) -> Dict[str, Tuple[float, float, float, float]]:
+    """
+    Top-left corner and size (x, y, width, height, in points) of every
+    entity on a near-square grid, filled row by row in FK-neighbourhood order.
+    """
+    by_name = {t['table_name']: t for t in tables}
+    order = _neighbourhood_order(tables)
+    per_row = max(1, math.ceil(math.sqrt(len(order))))
+    sizes = {name: _box_size(by_name[name]) for name in order}
+    col_width = max((w for w, _ in sizes.values()), default=0) + gap
+    positions = {}
+    y = gap / 2
+    for start in range(0, len(order), per_row):
+        row = order[start:start + per_row]
+        for i, name in enumerate(row):
+            w, h = sizes[name]
+            positions[name] = (gap / 2 + i * col_width, y, w, h)
+        y += max(sizes[name][1] for name in row) + gap
+    return positions
+
+def grid_svg(tables: List[Dict]) -> str:
+    """The grid layout as a standalone SVG document, drawn without Graphviz."""
+    positions = grid_positions(tables)
+    width = max((x + w for x, _, w, _ in positions.values()), default=0) + 30
+    height = max((y + h for _, y, _, h in positions.values()), default=0) + 30
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{width:.0f}' height='{height:.0f}' "
+        f"viewBox='0 0 {width:.0f} {height:.0f}' font-family='Arial' font-size='12'>"
+    ]
+    for src, tgt in _fk_edges(tables):
+        x1, y1, w1, h1 = positions[src]
+        x2, y2, w2, h2 = positions[tgt]
+        parts.append(
+            f"<line x1='{x1 + w1 / 2:.1f}' y1='{y1 + h1 / 2:.1f}' x2='{x2 + w2 / 2:.1f}' "
+            f"y2='{y2 + h2 / 2:.1f}' stroke='orchid' stroke-width='1.5'/>"
+        )
+    for table in tables:
+        x, y, w, h = positions[table['table_name']]
+        parts.append(f"<g transform='translate({x:.1f},{y:.1f})'>")
+        parts.append(f"<rect width='{w:.1f}' height='{h:.1f}' fill='lightyellow' stroke='black'/>")
+        parts.append(f"<rect width='{w:.1f}' height='22' fill='lightblue' stroke='black'/>")
+        parts.append(f"<text x='8' y='15' font-weight='bold'>{html.escape(table['table_name'])}</text>")
+        for i, (marker, col) in enumerate(_entity_rows(table)):
+            text = f"{marker} {col}" if marker else f"    {col}"
+            parts.append(f"<text x='8' y='{38 + 20 * i}' xml:space='preserve'>{html.escape(text)}</text>")
+        parts.append("</g>")
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+def schema_digest(tables: List[Dict], format: str, layout: str) -> str:
+    """Hash of everything the diagram shows, so identical schemas share a rendered file."""
+    schema = [
+        [t['table_name'], list(t.get('columns', [])), list(t.get('primary_key', [])),
+         [[fk['column'], fk['ref_table'], fk['ref_column']] for fk in t.get('foreign_keys', [])]]
+        for t in tables
+    ]
+    payload = json.dumps([format, resolve_layout(layout, len(tables)), schema], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ERRenderCache:
+    """
+    Content-addressed store of rendered diagrams in `folder`. A schema is
+    rendered once; later requests reuse the file. When the files exceed
+    `max_bytes`, the least recently used are deleted.
+    """
+    PREFIX = "er_"
+
+    def __init__(self, folder: str, max_bytes: int = 256 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def render(self, tables: List[Dict], format: str = "png", layout: str = "circular") -> str:
+        """Returns the path of the diagram, rendering it only on a cache miss."""
+        name = f"{self.PREFIX}{schema_digest(tables, format, layout)[:32]}"
+        ext = "gv" if format == "dot" else format
+        path = os.path.join(self.folder, f"{name}.{ext}")
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+                return path
+        # Render under a unique name so concurrent misses never see a partial file
+        tmp_name = f"tmp_{uuid.uuid4().hex}"
+        try:
+            tmp_path = generate_er_diagram(tables, output_folder=self.folder, filename=tmp_name,
+                                           format=format, layout=layout)
+        except Exception:
+            # e.g. Graphviz missing: drop the source file written before rendering
+            for entry in os.scandir(self.folder):
+                if entry.name.startswith(tmp_name):
+                    os.remove(entry.path)
+            raise
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.startswith(self.PREFIX) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,166 @@
+import math
+import time
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.fd_partitions import factorize_columns, missing_as_value
+
+DEFAULT_MAX_ERROR = 0.01
+DEFAULT_SAMPLE_ROWS = 20_000
+
+
+def stratified_sample_rows(n_rows: int, sample_rows: int, strata: int = 100, seed: int = 0) -> np.ndarray:
+    """
+    Sorted row positions, an equal share drawn from each of `strata`
+    contiguous blocks, so every part of the file (e.g. one bad export
+    batch) is represented in the sample.
+    """
+    rng = np.random.default_rng(seed)
+    strata = max(1, min(strata, n_rows))
+    bounds = np.linspace(0, n_rows, strata + 1).astype(np.int64)
+    shares = np.full(strata, sample_rows // strata, dtype=np.int64)
+    shares[:sample_rows % strata] += 1
+    rows = [
+        lo + rng.choice(hi - lo, size=min(int(share), hi - lo), replace=False)
+        for lo, hi, share in zip(bounds[:-1], bounds[1:], shares) if hi > lo
+    ]
+    return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+
+
+def _dense_codes(codes: np.ndarray) -> np.ndarray:
+    """Codes renumbered from 0; missing values keep code -1."""
+    dense = np.full(len(codes), -1, dtype=np.int64)
+    has_value = codes >= 0
+    dense[has_value] = pd.factorize(codes[has_value])[0]
+    return dense
+
+
+class _G3Validator:
+    """
+    g3 errors of candidate FDs over a set of rows (all of them, or a sample).
+    As in the exact search, rows missing an LHS value are ignored and missing
+    RHS values count as one value.
+    """
+
+    def __init__(self, codes: Dict[str, np.ndarray], rows: Optional[np.ndarray] = None, max_lhs_size: int = 2):
+        self.codes = {col: c if rows is None else _dense_codes(c[rows]) for col, c in codes.items()}
+        self.n_rows = len(rows) if rows is not None else len(next(iter(codes.values()), []))
+        self.cards = {col: int(c.max()) + 1 if len(c) else 0 for col, c in self.codes.items()}
+        self.max_lhs_size = max_lhs_size
+        # Groups of the LHS being checked and of the shorter ones the next level extends
+        self._lhs: Dict[Tuple[str, ...], Tuple[np.ndarray, int]] = {}
+
+    def release(self, x: Tuple[str, ...]) -> None:
+        """Forgets the groups of `x` once its candidates are checked, unless a longer LHS extends it."""
+        if len(x) >= self.max_lhs_size:
+            self._lhs.pop(x, None)
+
+    def drop_below(self, size: int) -> None:
+        for x in [x for x in self._lhs if len(x) < size]:
+            del self._lhs[x]
+
+    def lhs_groups(self, x: Tuple[str, ...]) -> Tuple[np.ndarray, int]:
+        """Dense group id of every row under the columns `x` (-1 when one is missing), and the group count."""
+        if x not in self._lhs:
+            if len(x) == 1:
+                self._lhs[x] = (self.codes[x[0]], self.cards[x[0]])
+            else:
+                parent, n_parent = self.lhs_groups(x[:-1])
+                codes = self.codes[x[-1]]
+                groups = np.full(self.n_rows, -1, dtype=np.int64)
+                has_value = (parent >= 0) & (codes >= 0)
+                keys, uniques = pd.factorize(parent[has_value] * max(self.cards[x[-1]], 1) + codes[has_value])
+                groups[has_value] = keys
+                self._lhs[x] = (groups, len(uniques))
+        return self._lhs[x]
+
+    def g3(self, x: Tuple[str, ...], a: str) -> Tuple[int, int]:
+        """
+        (rows to remove for x -> a to hold exactly, rows in LHS groups of two
+        or more). Only rows sharing their LHS value with another row can
+        violate the dependency, so the second number is its support.
+        """
+        if not self.n_rows:
+            return 0, 0
+        groups, n_groups = self.lhs_groups(x)
+        rhs = self.codes[a]
+        if groups.min() < 0:
+            has_value = groups >= 0
+            groups, rhs = groups[has_value], rhs[has_value]
+        rhs = missing_as_value(rhs)
+        pairs, _ = pd.factorize(groups * (self.cards[a] + 1) + rhs)
+        pair_counts = np.bincount(pairs)
+        pair_group = np.empty(len(pair_counts), dtype=np.int64)
+        pair_group[pairs] = groups
+        # Keep the most frequent RHS value of every LHS group
+        best = np.zeros(n_groups, dtype=np.int64)
+        np.maximum.at(best, pair_group, pair_counts)
+        sizes = np.bincount(groups, minlength=n_groups)
+        return len(groups) - int(best.sum()), int(sizes[sizes >= 2].sum())
+
+
+def discover_approximate_fds(df: pd.DataFrame, max_lhs_size: int = 2, max_error: float = DEFAULT_MAX_ERROR,
+                             sample_rows: int = DEFAULT_SAMPLE_ROWS, strata: int = 100,
+                             delta: float = 0.01, seed: int = 0) -> Tuple[List[Dict], Dict]:
+    """
+    Minimal approximate FDs X -> A (|X| <= max_lhs_size) whose g3 error, the
+    fraction of rows that must be removed for the FD to hold, is at most
+    `max_error`.
+
+    On tables larger than `sample_rows`, candidates are first checked on a
+    stratified sample and dropped when their sample error exceeds
+    `max_error` by more than a Hoeffding margin for confidence 1 - `delta`
+    (removing the full-data violators also fixes the sample, so the sample
+    error is not expected to be higher). Survivors are confirmed on every row.
+
+    Returns (fds, stats); each FD is a dict with lhs, rhs, error,
+    confidence (1 - error) and support (rows whose LHS value repeats).
+    """
+    columns = list(df.columns)
+    n_rows = len(df)
+    codes = factorize_columns(df)
+    full = _G3Validator(codes, max_lhs_size=max_lhs_size)
+    validators = [full]
+    sample = None
+    margin = 0.0
+    if n_rows > sample_rows and columns:
+        sample = _G3Validator(codes, stratified_sample_rows(n_rows, sample_rows, strata, seed), max_lhs_size)
+        validators.append(sample)
+        margin = math.sqrt(math.log(1 / delta) / (2 * sample.n_rows))
+
+    found: Dict[str, List[FrozenSet[str]]] = {col: [] for col in columns}
+    fds = []
+    stats = {"candidates": 0, "pruned_by_sample": 0, "checked_on_full_data": 0,
+             "sample_rows": sample.n_rows if sample is not None else 0, "levels": []}
+    for r in range(1, min(max_lhs_size, len(columns)) + 1):
+        started, before = time.perf_counter(), stats["candidates"]
+        # Only the previous level is extended by this one
+        for validator in validators:
+            validator.drop_below(r - 1)
+        for x in combinations(columns, r):
+            x_set = frozenset(x)
+            for a in columns:
+                # g3 can only shrink when the LHS grows: skip supersets of an accepted LHS
+                if a in x_set or any(lhs <= x_set for lhs in found[a]):
+                    continue
+                stats["candidates"] += 1
+                if sample is not None:
+                    removed, _ = sample.g3(x, a)
+                    if removed / sample.n_rows > max_error + margin:
+                        stats["pruned_by_sample"] += 1
+                        continue
+                stats["checked_on_full_data"] += 1
+                removed, support = full.g3(x, a)
+                if removed <= max_error * n_rows:
+                    error = removed / n_rows if n_rows else 0.0
+                    found[a].append(x_set)
+                    fds.append({"lhs": list(x), "rhs": [a], "error": error,
+                                "confidence": 1 - error, "support": support})
+            for validator in validators:
+                validator.release(x)
+        stats["levels"].append({"level": r, "candidates": stats["candidates"] - before,
+                                "seconds": round(time.perf_counter() - started, 6)})
+    return fds, stats
@@ -1,22 +1,98 @@
+import time
 import pandas as pd
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+from utils.fd_approx import DEFAULT_MAX_ERROR, DEFAULT_SAMPLE_ROWS, discover_approximate_fds
+from utils.fd_partitions import discover_minimal_fds, expand_fds
+from utils.fd_reuse import FDResultStore, discover_with_reuse
+
+FD_ENGINES = ("partition", "bruteforce")
 
 class FunctionalDependencyChecker:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, engine: str = "partition", n_jobs: int = 1):
+        if engine not in FD_ENGINES:
+            raise ValueError(f"Unknown FD engine '{engine}', expected one of {FD_ENGINES}")
         self.df = df
+        self.engine = engine
+        # Worker processes used by the partition engine to validate candidates
+        self.n_jobs = max(int(n_jobs or 1), 1)
+        # Per LHS size of the last search: candidates and wall time
+        self.level_metrics: List[Dict] = []
 
     def check_fd(self, x_cols: List[str], y_cols: List[str]) -> bool:
         grouped = self.df.groupby(x_cols)[y_cols].nunique(dropna=False)
         return (grouped <= 1).all().all()
 
-    def find_all_fds(self, max_lhs_size=2) -> List[Tuple[List[str], List[str]]]:
+    def find_all_fds(self, max_lhs_size=2, minimal_only=False) -> List[Tuple[List[str], List[str]]]:
+        """
+        Returns every (lhs, rhs) dependency with 1..max_lhs_size LHS columns.
+        The partition engine returns the same list as the brute-force one;
+        `minimal_only` drops dependencies already implied by a smaller LHS.
+        """
+        self.level_metrics = []
+        if self.engine == "bruteforce":
+            fds = self._find_all_fds_bruteforce(max_lhs_size)
+            if minimal_only:
+                found = {(frozenset(lhs), rhs[0]) for lhs, rhs in fds}
+                fds = [(lhs, rhs) for lhs, rhs in fds
+                       if not any((frozenset(lhs) - {col}, rhs[0]) in found for col in lhs)]
+            return fds
+        minimal = discover_minimal_fds(self.df, max_lhs_size=max_lhs_size, n_jobs=self.n_jobs,
+                                       on_level=self.level_metrics.append)
+        return expand_fds(list(self.df.columns), minimal, max_lhs_size=max_lhs_size,
+                          minimal_only=minimal_only)
+
+    def find_approximate_fds(self, max_lhs_size=2, max_error=DEFAULT_MAX_ERROR,
+                             sample_rows=DEFAULT_SAMPLE_ROWS) -> Tuple[List[Dict], Dict]:
+        """
+        Minimal dependencies that hold on all but a `max_error` fraction of
+        the rows (g3 error), each with its error, confidence and support.
+        Returns (fds, stats); see utils.fd_approx.
+        """
+        return discover_approximate_fds(self.df, max_lhs_size=max_lhs_size, max_error=max_error,
+                                        sample_rows=sample_rows)
+
+    def _find_all_fds_bruteforce(self, max_lhs_size=2) -> List[Tuple[List[str], List[str]]]:
         from itertools import combinations
         fds = []
         columns = list(self.df.columns)
         for r in range(1, min(max_lhs_size, len(columns)) + 1):
+            started, candidates = time.perf_counter(), 0
             for x in combinations(columns, r):
                 y_candidates = [col for col in columns if col not in x]
+                candidates += len(y_candidates)
                 for y in y_candidates:
                     if self.check_fd(list(x), [y]):
                         fds.append((list(x), [y]))
+            self.level_metrics.append({"level": r, "candidates": candidates,
+                                       "seconds": round(time.perf_counter() - started, 6)})
         return fds
+
+
+def mine_fds(df: pd.DataFrame, max_lhs_size=2, engine: str = "partition",
+             n_jobs: int = 1) -> List[Tuple[List[str], List[str]]]:
+    """Module-level entry point so FD mining can run in a worker process."""
+    return FunctionalDependencyChecker(df, engine=engine, n_jobs=n_jobs).find_all_fds(max_lhs_size=max_lhs_size)
+
+
+def mine_fds_with_metrics(df: pd.DataFrame, max_lhs_size=2, engine: str = "partition",
+                          n_jobs: int = 1) -> Tuple[List[Tuple[List[str], List[str]]], List[Dict]]:
+    """mine_fds, also returning the per-level candidate counts and timings."""
+    checker = FunctionalDependencyChecker(df, engine=engine, n_jobs=n_jobs)
+    return checker.find_all_fds(max_lhs_size=max_lhs_size), checker.level_metrics
+
+
+def mine_fds_reusing(df: pd.DataFrame, store_folder: str, max_lhs_size=2,
+                     n_jobs: int = 1) -> Tuple[List[Tuple[List[str], List[str]]], List[Dict], Dict]:
+    """
+    mine_fds with the partition engine, reusing the results stored in
+    `store_folder` for an earlier version of the frame (see utils.fd_reuse).
+    Returns (fds, per-level metrics, reuse report).
+    """
+    minimal, levels, reuse = discover_with_reuse(df, FDResultStore(store_folder), max_lhs_size, n_jobs)
+    return expand_fds(list(df.columns), minimal, max_lhs_size=max_lhs_size), levels, reuse
+
+
+def mine_approximate_fds(df: pd.DataFrame, max_lhs_size=2, max_error: float = DEFAULT_MAX_ERROR,
+                         sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Tuple[List[Dict], Dict]:
+    """Module-level entry point for approximate mining in a worker process."""
+    return FunctionalDependencyChecker(df).find_approximate_fds(max_lhs_size, max_error, sample_rows)
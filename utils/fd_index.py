@@ -0,0 +1,289 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+FD = Tuple[List[str], List[str]]
+
+
+def _members(bits: int) -> Iterator[int]:
+    """Positions of the set bits, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _LinClosure:
+    """
+    LinClosure over FDs given as (lhs, rhs) bitset lists: each FD keeps a
+    count of LHS attributes not yet in the closure and fires when it drops
+    to zero, so one closure costs time proportional to the FD occurrences
+    of the attributes it actually adds.
+    """
+
+    def __init__(self, lhs: List[int], rhs: List[int], n_attrs: int):
+        self.lhs = lhs
+        self.rhs = rhs
+        self.active = [True] * len(lhs)
+        self.missing = [bin(x).count("1") for x in lhs]
+        self.uses: List[List[int]] = [[] for _ in range(n_attrs)]
+        for i, x in enumerate(lhs):
+            for a in _members(x):
+                self.uses[a].append(i)
+        self.unconditional = [i for i, x in enumerate(lhs) if not x]
+
+    def closure(self, x: int, stop: int = 0) -> int:
+        """Closure of `x`; returns early once it covers the bits in `stop`."""
+        missing = self.missing[:]
+        result = x
+        todo = list(_members(x))
+        for i in self.unconditional:
+            if self.active[i] and self.rhs[i] & ~result:
+                todo.extend(_members(self.rhs[i] & ~result))
+                result |= self.rhs[i]
+        while todo:
+            if stop and result & stop == stop:
+                return result
+            for i in self.uses[todo.pop()]:
+                missing[i] -= 1
+                if not missing[i] and self.active[i]:
+                    new = self.rhs[i] & ~result
+                    if new:
+                        result |= new
+                        if new & (new - 1):
+                            todo.extend(_members(new))
+                        else:
+                            todo.append(new.bit_length() - 1)
+        return result
+
+
+class FDIndex:
+    """
+    Attribute-closure index over a set of functional dependencies.
+
+    Attribute sets are bitsets (Python ints, one bit per column in table
+    order) and closures use LinClosure, so the index stays fast with
+    hundreds of columns and thousands of FDs. FDs that mention columns
+    outside `attributes` are ignored, which allows passing FDs mined on an
+    earlier version of the table.
+    """
+
+    def __init__(self, attributes: Sequence[str], fds: Iterable[FD]):
+        self.attributes = list(attributes)
+        self.position = {a: i for i, a in enumerate(self.attributes)}
+        self.all_bits = (1 << len(self.attributes)) - 1
+
+        rows: Dict[int, int] = {}
+        for lhs, rhs in fds:
+            if not all(a in self.position for a in list(lhs) + list(rhs)):
+                continue
+            x = self._bits(lhs)
+            y = self._bits(rhs) & ~x
+            if y:
+                rows[x] = rows.get(x, 0) | y
+        self.fds = _LinClosure(list(rows), list(rows.values()), len(self.attributes))
+        self._cover: Optional[_LinClosure] = None
+        self._keys: Optional[List[int]] = None
+        self._keys_limit = 0
+
+    def _bits(self, names: Iterable[str]) -> int:
+        bits = 0
+        for name in names:
+            bits |= 1 << self.position[name]
+        return bits
+
+    def _names(self, bits: int) -> List[str]:
+        return [self.attributes[i] for i in _members(bits)]
+
+    def closure(self, attrs: Iterable[str]) -> List[str]:
+        return self._names(self.fds.closure(self._bits(attrs)))
+
+    def implies(self, lhs: Iterable[str], rhs: Iterable[str]) -> bool:
+        y = self._bits(rhs)
+        return self.fds.closure(self._bits(lhs), stop=y) & y == y
+
+    def is_superkey(self, attrs: Iterable[str]) -> bool:
+        return self._is_superkey(self._bits(attrs))
+
+    def _is_superkey(self, bits: int) -> bool:
+        return self.fds.closure(bits, stop=self.all_bits) == self.all_bits
+
+    # Canonical cover
+
+    def _canonical_cover(self) -> _LinClosure:
+        if self._cover is not None:
+            return self._cover
+        memo: Dict[int, int] = {}
+
+        # Single-attribute RHS without extraneous LHS attributes. Closures are
+        # taken under the original set (equivalent to the reduced one) and shared
+        reduced, seen = [], set()
+        for x, y in zip(self.fds.lhs, self.fds.rhs):
+            for a in _members(y):
+                lhs = x
+                for b in _members(x):
+                    smaller = lhs & ~(1 << b)
+                    if smaller not in memo:
+                        memo[smaller] = self.fds.closure(smaller)
+                    if memo[smaller] >> a & 1:
+                        lhs = smaller
+                if (lhs, a) not in seen:
+                    seen.add((lhs, a))
+                    reduced.append((lhs, 1 << a))
+
+        # Drop FDs implied by the remaining ones; an FD that is the only
+        # source of its attribute cannot be, so it needs no closure
+        single = _LinClosure([x for x, _ in reduced], [y for _, y in reduced], len(self.attributes))
+        sources: Dict[int, int] = {}
+        for _, y in reduced:
+            sources[y] = sources.get(y, 0) + 1
+        for i, (x, y) in enumerate(reduced):
+            if sources[y] == 1:
+                continue
+            single.active[i] = False
+            if single.closure(x, stop=y) & y:
+                sources[y] -= 1
+            else:
+                single.active[i] = True
+
+        # Merge what is left by LHS, in first-seen order
+        merged: Dict[int, int] = {}
+        for (x, y), keep in zip(reduced, single.active):
+            if keep:
+                merged[x] = merged.get(x, 0) | y
+        self._cover = _LinClosure(list(merged), list(merged.values()), len(self.attributes))
+        return self._cover
+
+    def canonical_cover(self) -> List[FD]:
+        """Minimal equivalent FD set: no extraneous LHS attributes, no redundant FDs, one FD per LHS."""
+        cover = self._canonical_cover()
+        return [(self._names(x), self._names(y)) for x, y in zip(cover.lhs, cover.rhs)]
+
+    # Keys
+
+    def _candidate_keys(self, max_keys: int) -> List[int]:
+        cover = self._canonical_cover()
+        in_lhs = in_rhs = 0
+        for x, y in zip(cover.lhs, cover.rhs):
+            in_lhs |= x
+            in_rhs |= y
+        rhs_only = in_rhs & ~in_lhs
+
+        def minimize(s):
+            # Attributes never on a LHS are derivable from any superkey, and
+            # attributes never on a RHS belong to every key: only the rest needs a closure test.
+            # While s is a superkey, s - {a} is one exactly when it still derives a
+            s &= ~rhs_only
+            for i in _members(s & in_rhs):
+                smaller = s & ~(1 << i)
+                if cover.closure(smaller, stop=1 << i) >> i & 1:
+                    s = smaller
+            return s
+
+        # Lucchesi-Osborn: every other key is found from a known key and one FD
+        keys = [minimize(self.all_bits)]
+        k = 0
+        while k < len(keys) and len(keys) < max_keys:
+            for x, y in zip(cover.lhs, cover.rhs):
+                s = x | (keys[k] & ~y)
+                if all(key & ~s for key in keys):
+                    keys.append(minimize(s))
+                    if len(keys) >= max_keys:
+                        break
+            k += 1
+        return keys
+
+    def candidate_keys(self, max_keys: int = 64) -> List[List[str]]:
+        """
+        Candidate keys, smallest first (ties in column order). The search
+        stops after `max_keys` keys, since a schema can have exponentially many.
+        """
+        # Search again only if a larger limit could find more keys
+        if self._keys is None or (max_keys > self._keys_limit and len(self._keys) >= self._keys_limit):
+            keys = self._candidate_keys(max_keys)
+            self._keys_limit = max_keys
+            self._keys = sorted(keys, key=lambda bits: (bin(bits).count("1"), list(_members(bits))))
+        return [self._names(bits) for bits in self._keys[:max_keys]]
+
+    def _prime_bits(self) -> int:
+        self.candidate_keys()
+        prime = 0
+        for key in self._keys:
+            prime |= key
+        return prime
+
+    def prime_attributes(self) -> List[str]:
+        return self._names(self._prime_bits())
+
+    # Normal form checks
+
+    def _minimal_lhs(self, x: int, y: int) -> int:
+        for b in _members(x):
+            smaller = x & ~(1 << b)
+            if self.fds.closure(smaller, stop=y) & y == y:
+                x = smaller
+        return x
+
+    def partial_dependencies(self, key: Sequence[str]) -> List[Dict]:
+        """
+        2NF violations: non-prime attributes determined by a proper subset of
+        `key`, reported as {"lhs", "rhs"}. Cover FDs inside the key come first;
+        anything only implied by combining them gets its own minimal LHS.
+        """
+        key_bits = self._bits(key)
+        non_prime = self.all_bits & ~(self._prime_bits() | key_bits)
+        found: Dict[int, int] = {}
+        cover = self._canonical_cover()
+        for x in cover.lhs:
+            if x & ~key_bits == 0 and x != key_bits:
+                rhs = self.fds.closure(x) & non_prime
+                if rhs:
+                    found[x] = found.get(x, 0) | rhs
+        explained = 0
+        for rhs in found.values():
+            explained |= rhs
+        # Closure is monotone, so the largest proper subsets see every partial dependency
+        for drop in _members(key_bits):
+            rest = self.fds.closure(key_bits & ~(1 << drop)) & non_prime & ~explained
+            if rest:
+                lhs = self._minimal_lhs(key_bits & ~(1 << drop), rest)
+                found[lhs] = found.get(lhs, 0) | rest
+                explained |= rest
+        return [{"lhs": self._names(x), "rhs": self._names(y)} for x, y in found.items()]
+
+    def transitive_dependencies(self) -> List[Dict]:
+        """3NF violations: cover FDs whose LHS is not a superkey and whose RHS has non-prime attributes."""
+        prime = self._prime_bits()
+        cover = self._canonical_cover()
+        violations = []
+        for x, y in zip(cover.lhs, cover.rhs):
+            if y & ~prime and not self._is_superkey(x):
+                violations.append({"lhs": self._names(x), "rhs": self._names(y & ~prime)})
+        return violations
+
+    def synthesize_3nf(self) -> List[Dict]:
+        """
+        Bernstein synthesis: one relation per canonical-cover LHS, plus a
+        relation on a candidate key when no relation holds one. Relations
+        contained in another are dropped. Returns [{"columns", "key"}] with
+        columns in table order.
+        """
+        cover = self._canonical_cover()
+        relations = [(x | y, x) for x, y in zip(cover.lhs, cover.rhs)]
+        self.candidate_keys()
+        if not any(key & ~attrs == 0 for key in self._keys for attrs, _ in relations):
+            relations.append((self._keys[0], self._keys[0]))
+
+        # Containment is only tested against relations sharing the rarest attribute
+        holders: List[List[int]] = [[] for _ in self.attributes]
+        for j, (attrs, _) in enumerate(relations):
+            for a in _members(attrs):
+                holders[a].append(j)
+        kept = []
+        for i, (attrs, key) in enumerate(relations):
+            candidates = min((holders[a] for a in _members(attrs)), key=len) if attrs else []
+            contained = any(
+                j != i and attrs & ~relations[j][0] == 0 and (attrs != relations[j][0] or j < i)
+                for j in candidates
+            )
+            if not contained:
+                kept.append((attrs, key))
+        return [{"columns": self._names(attrs), "key": self._names(key)} for attrs, key in kept]
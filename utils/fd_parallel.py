@@ -0,0 +1,147 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, FrozenSet, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Set in each worker by _attach_codes
+_SHM = None
+_CODES = None
+_CARDS = None
+_MISSING = None
+
+
+def _attach_codes(shm_name: str, shape: Tuple[int, int], dtype: str, cards: np.ndarray,
+                  missing: np.ndarray) -> None:
+    global _SHM, _CODES, _CARDS, _MISSING
+    _SHM = shared_memory.SharedMemory(name=shm_name)
+    _CODES = np.ndarray(shape, dtype=dtype, buffer=_SHM.buf)
+    _CARDS = cards
+    _MISSING = missing
+
+
+def _group_error(cols: Tuple[int, ...], rhs: int = -1) -> int:
+    """
+    Partition error under the columns `cols`, ignoring the rows missing one
+    of their values (code -1); with `rhs` >= 0, also under that column with
+    its missing values counted as one value.
+    """
+    valid = None
+    for c in cols:
+        if _MISSING[c]:
+            has_value = _CODES[c] >= 0
+            valid = has_value if valid is None else valid & has_value
+    keys = [(_CODES[c] if valid is None else _CODES[c][valid], int(_CARDS[c])) for c in cols]
+    if rhs >= 0:
+        rhs_codes = _CODES[rhs] if valid is None else _CODES[rhs][valid]
+        keys.append((np.where(rhs_codes < 0, _CARDS[rhs], rhs_codes), int(_CARDS[rhs]) + 1))
+    group = keys[0][0].astype(np.int64)
+    card = keys[0][1]
+    for codes, c_card in keys[1:]:
+        if card * c_card >= 2 ** 62:
+            group, uniques = pd.factorize(group)
+            card = len(uniques)
+        group = group * c_card + codes
+        card *= c_card
+    return len(group) - len(pd.unique(group)) if len(group) else 0
+
+
+def _batch_errors(batch: List[Tuple[Tuple[int, ...], int]]) -> List[int]:
+    return [_group_error(cols, rhs) for cols, rhs in batch]
+
+
+class ParallelErrors:
+    """
+    Partition errors computed on a process pool. The factorized columns are
+    copied once into a shared memory block that every worker maps, so tasks
+    only carry column index tuples. Results come back in submission order.
+
+    Missing values are handled as in _SerialErrors. For every set of a level
+    that contains columns with missing values, the error with each of them
+    as RHS is computed along with the set's own error.
+    """
+
+    def __init__(self, codes: Dict[str, np.ndarray], n_rows: int, n_jobs: int,
+                 batches_per_worker: int = 4):
+        self.columns = list(codes)
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        self.n_rows = n_rows
+        self.n_jobs = n_jobs
+        self.batches_per_worker = batches_per_worker
+        dtype = np.int32 if n_rows < 2 ** 31 else np.int64
+        self._matrix_shape = (len(self.columns), n_rows)
+        self._dtype = np.dtype(dtype).str
+        self._codes = codes
+        self._cards = np.array([int(c.max()) + 1 if len(c) else 0 for c in codes.values()], dtype=np.int64)
+        self._missing = np.array([bool(len(c)) and int(c.min()) < 0 for c in codes.values()])
+        self.missing = frozenset(col for col, m in zip(self.columns, self._missing) if m)
+        self._errors: Dict[FrozenSet[str], int] = {frozenset(): max(n_rows - 1, 0)}
+        # Errors of lhs | {a} with the missing values of a kept, by (lhs | {a}, a)
+        self._rhs_errors: Dict[Tuple[FrozenSet[str], str], int] = {}
+        for col, card in zip(self.columns, self._cards):
+            col_codes = codes[col]
+            if col in self.missing:
+                self._errors[frozenset([col])] = int((col_codes >= 0).sum()) - int(card)
+                self._rhs_errors[(frozenset([col]), col)] = n_rows - int(card) - 1
+            else:
+                self._errors[frozenset([col])] = n_rows - int(card)
+        self._shm = None
+        self._pool = None
+
+    def __enter__(self) -> "ParallelErrors":
+        nbytes = max(int(np.prod(self._matrix_shape)) * np.dtype(self._dtype).itemsize, 1)
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        matrix = np.ndarray(self._matrix_shape, dtype=self._dtype, buffer=self._shm.buf)
+        for i, col in enumerate(self.columns):
+            matrix[i] = self._codes[col]
+        del matrix
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.n_jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach_codes,
+            initargs=(self._shm.name, self._matrix_shape, self._dtype, self._cards, self._missing)
+        )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+
+    def error(self, x: FrozenSet[str]) -> int:
+        return self._errors[x]
+
+    def holds(self, lhs: FrozenSet[str], a: str) -> bool:
+        """Whether lhs -> a holds; lhs | {a} must be in the current level."""
+        x = lhs | {a}
+        return self._errors[lhs] == self._rhs_errors.get((x, a), self._errors[x])
+
+    def add_level(self, joins: List[Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]],
+                  final: bool = False) -> None:
+        # (set, rhs column or None) for every error of the level
+        keys = [(x, None) for x, _, _ in joins]
+        keys += [(x, a) for x, _, _ in joins for a in sorted(x & self.missing)]
+        if not keys:
+            return
+        tasks = [(tuple(sorted(self.index[c] for c in (x if a is None else x - {a}))),
+                  -1 if a is None else self.index[a]) for x, a in keys]
+        size = max(1, math.ceil(len(tasks) / (self.n_jobs * self.batches_per_worker)))
+        batches = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+        results = self._pool.map(_batch_errors, batches)
+        for batch_start, batch_errors in zip(range(0, len(keys), size), results):
+            for (x, a), err in zip(keys[batch_start:batch_start + size], batch_errors):
+                if a is None:
+                    self._errors[x] = err
+                else:
+                    self._rhs_errors[(x, a)] = err
+
+    def drop_below(self, size: int) -> None:
+        for x in [x for x in self._errors if len(x) < size]:
+            del self._errors[x]
+        for key in [key for key in self._rhs_errors if len(key[0]) < size]:
+            del self._rhs_errors[key]
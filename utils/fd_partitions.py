@@ -0,0 +1,255 @@
+import time
+import numpy as np
+import pandas as pd
+from itertools import combinations
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+class StrippedPartition:
+    """
+    Equivalence classes of the rows of a table under a set of columns,
+    with singleton classes stripped out (TANE). Rows in classes of size >= 2
+    are kept in `rows`, and `labels` holds the class id of each of them.
+    """
+
+    def __init__(self, rows: np.ndarray, labels: np.ndarray, n_classes: int):
+        self.rows = rows
+        self.labels = labels
+        self.n_classes = n_classes
+
+    @property
+    def error(self) -> int:
+        # ||pi|| - |pi|: number of rows to remove to make the columns a key
+        return len(self.rows) - self.n_classes
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray) -> "StrippedPartition":
+        # Rows with a missing value (negative code) are in no class, like singletons
+        if len(codes) and codes.min() < 0:
+            rows = np.flatnonzero(codes >= 0)
+            return cls._strip(rows, codes[rows])
+        return cls._strip(np.arange(len(codes), dtype=np.int64), codes)
+
+    @classmethod
+    def _strip(cls, rows: np.ndarray, keys: np.ndarray) -> "StrippedPartition":
+        labels, _ = pd.factorize(keys)
+        counts = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+        keep = counts[labels] >= 2
+        kept_labels, _ = pd.factorize(labels[keep])
+        return cls(rows[keep], kept_labels.astype(np.int64), int((counts >= 2).sum()))
+
+    def product(self, other: "StrippedPartition", n_rows: int) -> "StrippedPartition":
+        lookup = np.full(n_rows, -1, dtype=np.int64)
+        lookup[other.rows] = other.labels
+        other_labels = lookup[self.rows]
+        mask = other_labels >= 0
+        keys = self.labels[mask] * max(other.n_classes, 1) + other_labels[mask]
+        return self._strip(self.rows[mask], keys)
+
+
+def factorize_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Factorizes every column once into integer codes; missing values get code -1."""
+    codes = {}
+    for col in df.columns:
+        col_codes, _ = pd.factorize(df[col])
+        codes[col] = col_codes.astype(np.int64)
+    return codes
+
+
+def missing_as_value(codes: np.ndarray) -> np.ndarray:
+    """Codes with the missing values (-1) given one code of their own, for the RHS of an FD."""
+    if not len(codes) or codes.min() >= 0:
+        return codes
+    return np.where(codes < 0, codes.max() + 1, codes)
+
+
+class _SerialErrors:
+    """
+    Partition errors from stripped partition products of the two parents.
+
+    As in the brute-force check (a default pandas groupby), rows missing a
+    value of the LHS are ignored, while missing values of the RHS count as
+    one value. The columns with missing values are in `missing`; an FD with
+    one of them as RHS is checked on its own partition with missing values
+    kept.
+    """
+
+    def __init__(self, codes: Dict[str, np.ndarray], n_rows: int):
+        self.n_rows = n_rows
+        self.missing = frozenset(col for col, c in codes.items() if len(c) and c.min() < 0)
+        self._rhs = {col: StrippedPartition.from_codes(missing_as_value(codes[col])) for col in self.missing}
+        self.partitions = {}
+        if n_rows >= 2:
+            self.partitions[frozenset()] = StrippedPartition(
+                np.arange(n_rows, dtype=np.int64), np.zeros(n_rows, dtype=np.int64), 1)
+        else:
+            self.partitions[frozenset()] = StrippedPartition(
+                np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
+        for col, col_codes in codes.items():
+            self.partitions[frozenset([col])] = StrippedPartition.from_codes(col_codes)
+        self.errors = {x: p.error for x, p in self.partitions.items()}
+
+    def error(self, x: FrozenSet[str]) -> int:
+        return self.errors[x]
+
+    def holds(self, lhs: FrozenSet[str], a: str) -> bool:
+        """Whether lhs -> a holds; the errors of lhs and lhs | {a} must be known."""
+        if a not in self._rhs:
+            return self.errors[lhs] == self.errors[lhs | {a}]
+        return self.partitions[lhs].product(self._rhs[a], self.n_rows).error == self.errors[lhs]
+
+    def add_level(self, joins: List[Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]],
+                  final: bool = False) -> None:
+        # The last level is never joined again, so only its errors are kept
+        for x, y, z in joins:
+            partition = self.partitions[y].product(self.partitions[z], self.n_rows)
+            self.errors[x] = partition.error
+            if not final:
+                self.partitions[x] = partition
+
+    def drop_below(self, size: int) -> None:
+        for x in [x for x in self.errors if len(x) < size]:
+            del self.errors[x]
+            self.partitions.pop(x, None)
+
+
+def discover_minimal_fds(df: pd.DataFrame, max_lhs_size: int = 2, n_jobs: int = 1,
+                         on_level: Optional[Callable[[Dict], None]] = None) -> Dict[str, List[FrozenSet[str]]]:
+    """
+    Level-wise TANE search for the minimal, non-trivial functional dependencies
+    of `df` whose LHS has at most `max_lhs_size` columns.
+
+    With `n_jobs` > 1 the partition errors of each level are computed on a
+    process pool that reads the factorized columns from shared memory; the
+    search itself, and so the output, is the same as the serial one.
+
+    `on_level`, when given, is called after each level with its number,
+    candidate count, surviving candidates and wall time.
+
+    Returns a mapping rhs column -> list of minimal LHS column sets. An empty LHS
+    means the column is constant.
+    """
+    columns = list(df.columns)
+    codes = factorize_columns(df)
+    if n_jobs > 1 and len(columns) > 1:
+        from utils.fd_parallel import ParallelErrors
+        with ParallelErrors(codes, len(df), n_jobs) as errors:
+            return _tane(columns, errors, max_lhs_size, on_level)
+    return _tane(columns, _SerialErrors(codes, len(df)), max_lhs_size, on_level)
+
+
+def _tane(columns: List[str], errors, max_lhs_size: int,
+          on_level: Optional[Callable[[Dict], None]] = None) -> Dict[str, List[FrozenSet[str]]]:
+    all_attrs = frozenset(columns)
+    minimal: Dict[str, List[FrozenSet[str]]] = {col: [] for col in columns}
+    if not columns:
+        return minimal
+
+    positions = {col: i for i, col in enumerate(columns)}
+    cplus = {frozenset(): set(columns)}
+    level = [frozenset([col]) for col in columns]
+
+    level_no = 1
+    while level and level_no <= max_lhs_size + 1:
+        level_started = time.perf_counter()
+        # Compute dependencies with LHS X \ {A}
+        for x in level:
+            rhs_candidates = None
+            for a in x:
+                parent = cplus.get(x - {a})
+                if parent is None:
+                    rhs_candidates = set()
+                    break
+                rhs_candidates = set(parent) if rhs_candidates is None else rhs_candidates & parent
+            cplus[x] = rhs_candidates or set()
+        for x in level:
+            for a in [a for a in columns if a in x and a in cplus[x]]:
+                lhs = x - {a}
+                if errors.holds(lhs, a):
+                    minimal[a].append(lhs)
+                    cplus[x].discard(a)
+                    # Pruning through transitivity on a: unsound when a has missing
+                    # values, as the rows missing a are ignored by an LHS containing it
+                    if a not in errors.missing:
+                        cplus[x] -= all_attrs - x
+
+        # Prune empty candidate sets and keys; every minimal FD with a smaller
+        # LHS is already recorded, so X -> A is minimal unless one of them applies.
+        survivors = []
+        for x in level:
+            if not cplus[x]:
+                continue
+            if errors.error(x) == 0:
+                if level_no <= max_lhs_size:
+                    for a in [a for a in columns if a in cplus[x] and a not in x]:
+                        if not any(lhs <= x for lhs in minimal[a]):
+                            minimal[a].append(x)
+                if not x & errors.missing:
+                    continue
+                # A key with missing values only separates the rows it has all
+                # values of, so its supersets may still have minimal FDs
+                cplus[x] &= x
+                if not cplus[x]:
+                    continue
+            survivors.append(x)
+
+        if level_no > max_lhs_size:
+            _report_level(on_level, level_no, level, survivors, level_started)
+            break
+        joins = _next_level(survivors, positions)
+        errors.add_level(joins, final=level_no == max_lhs_size)
+        errors.drop_below(level_no)
+        # The level's time includes the partition products for the next one
+        _report_level(on_level, level_no, level, survivors, level_started)
+        level = [x for x, _, _ in joins]
+        level_no += 1
+    return minimal
+
+
+def _report_level(on_level, level_no: int, level: List[FrozenSet[str]], survivors: List[FrozenSet[str]],
+                  started: float) -> None:
+    if on_level is not None:
+        on_level({"level": level_no, "candidates": len(level), "survivors": len(survivors),
+                  "seconds": round(time.perf_counter() - started, 6)})
+
+
+def _next_level(level: List[FrozenSet[str]], positions: Dict[str, int]
+                ) -> List[Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]]:
+    # Joins sets that share all but their last column (in table order)
+    present = set(level)
+    keyed = sorted((tuple(sorted(positions[c] for c in s)), s) for s in level)
+    joins = []
+    seen = set()
+    for i, (y_key, y) in enumerate(keyed):
+        for z_key, z in keyed[i + 1:]:
+            if y_key[:-1] != z_key[:-1]:
+                break
+            x = y | z
+            if x in seen:
+                continue
+            if all(x - {a} in present for a in x):
+                joins.append((x, y, z))
+                seen.add(x)
+    return joins
+
+
+def expand_fds(columns: List[str], minimal: Dict[str, List[FrozenSet[str]]],
+               max_lhs_size: int = 2, minimal_only: bool = False) -> List[Tuple[List[str], List[str]]]:
+    """
+    Enumerates (lhs, rhs) pairs in the same order as the brute-force search:
+    every LHS combination of 1..max_lhs_size columns, every RHS outside it.
+    With `minimal_only`, pairs implied by a smaller non-empty LHS are skipped.
+    """
+    fds = []
+    for r in range(1, min(max_lhs_size, len(columns)) + 1):
+        for x in combinations(columns, r):
+            x_set = frozenset(x)
+            for y in columns:
+                if y in x_set:
+                    continue
+                if not any(lhs <= x_set for lhs in minimal[y]):
+                    continue
+                if minimal_only and r > 1 and any(lhs < x_set for lhs in minimal[y]):
+                    continue
+                fds.append((list(x), [y]))
+    return fds
@@ -0,0 +1,301 @@
+"""
+Reuses FD discovery results across versions of a table, e.g. a daily
+extract re-uploaded with a few columns or rows changed.
+
+Whether X -> A holds depends only on the columns X and A. Every mined
+frame is recorded in an FDResultStore with the fingerprint of each column
+and its minimal FDs. A later frame is matched to the stored frame it shares
+the most columns with:
+
+- Same rows: for a candidate whose columns are all unchanged, the stored
+  result is reused as is; only candidates touching a changed column are
+  checked.
+- Rows appended (every unchanged column of the old frame is a prefix of
+  the new one): a dependency that failed before still fails, so only
+  dependencies that held before, and candidates touching a changed
+  column, are checked.
+
+Checks use stripped partitions, as the partition engine does, and the
+result is the same set of minimal FDs a full search returns.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.fd_partitions import StrippedPartition, discover_minimal_fds, missing_as_value
+from utils.fingerprints import digest, row_hashes
+
+STORE_MAX_RECORDS = 256
+# Above this share of changed columns a full search is faster than checking candidates one by one
+REUSE_MAX_CHANGED = 0.5
+# Stored frames tried as the unchanged prefix of a frame with more rows
+APPEND_CANDIDATES = 4
+# Rows of the sample candidates are first checked on, for frames over twice as large
+SAMPLE_CHECK_ROWS = 10_000
+
+Minimal = Dict[str, List[FrozenSet[str]]]
+
+
+def frame_key(fingerprints: Dict[str, str], max_lhs_size: int) -> str:
+    payload = json.dumps([max_lhs_size, sorted(fingerprints.items())])
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class FDResultStore:
+    """
+    Minimal FDs of mined frames, one JSON record per frame in `folder`,
+    keyed by the fingerprints of its columns. Records are written
+    atomically, so several processes can share a store; past `max_records`
+    the least recently written are removed.
+    """
+
+    def __init__(self, folder: str, max_records: int = STORE_MAX_RECORDS):
+        self.folder = folder
+        self.max_records = max_records
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def records(self) -> List[Dict]:
+        """All records, most recent first."""
+        records = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced or removed by another process
+        return sorted(records, key=lambda r: r["created"], reverse=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The record of `key`, marked as recently used; None when missing."""
+        try:
+            with open(self._path(key)) as f:
+                record = json.load(f)
+            os.utime(self._path(key))
+            return record
+        except (OSError, ValueError):
+            return None
+
+    def put(self, fingerprints: Dict[str, str], n_rows: int, max_lhs_size: int, minimal: Minimal) -> str:
+        key = frame_key(fingerprints, max_lhs_size)
+        record = {
+            "key": key,
+            "created": time.time(),
+            "rows": n_rows,
+            "max_lhs_size": max_lhs_size,
+            "fingerprints": fingerprints,
+            "minimal": {col: [sorted(lhs) for lhs in lhss] for col, lhss in minimal.items()}
+        }
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+        return key
+
+    def _evict(self) -> None:
+        paths = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith(".json")]
+        if len(paths) <= self.max_records:
+            return
+        paths.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+        for path in paths[:len(paths) - self.max_records]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _match_columns(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, str]:
+    """
+    Maps new columns to old columns with the same fingerprint, each old
+    column used once: same name first, then any name (a renamed column).
+    """
+    mapping = {col: col for col, fp in new.items() if old.get(col) == fp}
+    unused: Dict[str, List[str]] = {}
+    for col, fp in old.items():
+        if col not in mapping.values():
+            unused.setdefault(fp, []).append(col)
+    for col, fp in new.items():
+        if col not in mapping and unused.get(fp):
+            mapping[col] = unused[fp].pop(0)
+    return mapping
+
+
+def find_base(store: FDResultStore, hashes: Dict[str, np.ndarray], fingerprints: Dict[str, str],
+              max_lhs_size: int) -> Tuple[Optional[Dict], Dict[str, str], bool]:
+    """
+    The stored frame to revalidate against: (record, new column -> old
+    column for unchanged columns, whether rows were appended). Frames with
+    the same rows are preferred; (None, {}, False) when nothing matches.
+    """
+    n_rows = len(next(iter(hashes.values()))) if hashes else 0
+    best, best_mapping = None, {}
+    appended_candidates = []
+    for record in store.records():
+        if record["max_lhs_size"] != max_lhs_size:
+            continue
+        if record["rows"] == n_rows:
+            mapping = _match_columns(record["fingerprints"], fingerprints)
+            if len(mapping) > len(best_mapping):
+                best, best_mapping = record, mapping
+        elif 0 < record["rows"] < n_rows and set(record["fingerprints"]) & set(fingerprints):
+            appended_candidates.append(record)
+    if best is not None:
+        return best, best_mapping, False
+
+    best_appended, prefixes = None, {}
+    for record in appended_candidates[:APPEND_CANDIDATES]:
+        rows = record["rows"]
+        if rows not in prefixes:
+            prefixes[rows] = {col: digest(col_hashes[:rows]) for col, col_hashes in hashes.items()}
+        mapping = _match_columns(record["fingerprints"], prefixes[rows])
+        if len(mapping) > len(best_mapping):
+            best_appended, best_mapping = record, mapping
+    if best_appended is not None:
+        return best_appended, best_mapping, True
+    return None, {}, False
+
+
+class _PartitionOracle:
+    """
+    Checks candidate FDs on stripped partitions; single-column partitions and
+    errors are kept. Missing values are handled as in discover_minimal_fds.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n_rows = len(df)
+        self._singles: Dict[str, StrippedPartition] = {}
+        self._rhs_singles: Dict[str, StrippedPartition] = {}
+        self._errors: Dict[Tuple[FrozenSet[str], str], int] = {}
+        # Partition of the last LHS checked; candidates come grouped by LHS
+        self._x, self._x_partition = None, None
+
+    def _single(self, col: str) -> StrippedPartition:
+        if col not in self._singles:
+            codes, _ = pd.factorize(self.df[col])
+            self._singles[col] = StrippedPartition.from_codes(codes.astype(np.int64))
+        return self._singles[col]
+
+    def _rhs_single(self, col: str) -> StrippedPartition:
+        # The column's partition with its missing values as one more value
+        if col not in self._rhs_singles:
+            codes, _ = pd.factorize(self.df[col])
+            self._rhs_singles[col] = StrippedPartition.from_codes(missing_as_value(codes.astype(np.int64)))
+        return self._rhs_singles[col]
+
+    def _partition(self, x: FrozenSet[str]) -> StrippedPartition:
+        if not x:
+            rows = np.arange(self.n_rows if self.n_rows >= 2 else 0, dtype=np.int64)
+            return StrippedPartition(rows, np.zeros(len(rows), dtype=np.int64), 1 if len(rows) else 0)
+        cols = sorted(x)
+        partition = self._single(cols[0])
+        for col in cols[1:]:
+            partition = partition.product(self._single(col), self.n_rows)
+        return partition
+
+    def holds(self, x: FrozenSet[str], a: str) -> bool:
+        """Whether x -> a holds: adding a splits no class of x."""
+        if self._x != x:
+            self._x, self._x_partition = x, self._partition(x)
+        if (x, a) not in self._errors:
+            single = self._rhs_single(a)
+            self._errors[(x, a)] = self._x_partition.product(single, self.n_rows).error if x else single.error
+        return self._x_partition.error == self._errors[(x, a)]
+
+
+def revalidate(df: pd.DataFrame, base: Dict, mapping: Dict[str, str], appended: bool,
+               max_lhs_size: int) -> Tuple[Minimal, List[Dict], Dict]:
+    """
+    Minimal FDs of `df` from the stored result `base`, checking only the
+    candidates the unchanged columns (`mapping`) cannot answer. Returns
+    (minimal, per-level metrics, counts of reused and checked candidates).
+    """
+    columns = list(df.columns)
+    old_minimal = {col: [frozenset(lhs) for lhs in lhss] for col, lhss in base["minimal"].items()}
+    unchanged = frozenset(mapping)
+    oracle = _PartitionOracle(df)
+    # Most candidates fail; a violation among sampled rows is a violation, so most are rejected cheaply
+    sample = None
+    if len(df) > 2 * SAMPLE_CHECK_ROWS:
+        rows = np.sort(np.random.default_rng(0).choice(len(df), SAMPLE_CHECK_ROWS, replace=False))
+        sample = _PartitionOracle(df.iloc[rows])
+    minimal: Minimal = {col: [] for col in columns}
+    levels, reused, checked = [], 0, 0
+
+    def held_before(x: FrozenSet[str], a: str) -> bool:
+        old_x = frozenset(mapping[col] for col in x)
+        return any(lhs <= old_x for lhs in old_minimal.get(mapping[a], []))
+
+    for size in range(0, max_lhs_size + 1):
+        started, level_checked, level_candidates = time.perf_counter(), 0, 0
+        for x in map(frozenset, combinations(columns, size)):
+            for a in columns:
+                if a in x or any(lhs <= x for lhs in minimal[a]):
+                    continue
+                level_candidates += 1
+                if a in unchanged and x <= unchanged:
+                    holds = held_before(x, a)
+                    if not appended or not holds:
+                        reused += 1
+                        if holds:
+                            minimal[a].append(x)
+                        continue
+                level_checked += 1
+                if (sample is None or sample.holds(x, a)) and oracle.holds(x, a):
+                    minimal[a].append(x)
+        checked += level_checked
+        levels.append({"level": size + 1, "candidates": level_candidates, "checked": level_checked,
+                       "seconds": round(time.perf_counter() - started, 6)})
+    return minimal, levels, {"reused": reused, "checked": checked}
+
+
+def discover_with_reuse(df: pd.DataFrame, store: FDResultStore, max_lhs_size: int = 2,
+                        n_jobs: int = 1) -> Tuple[Minimal, List[Dict], Dict]:
+    """
+    Minimal FDs of `df` (as discover_minimal_fds), reusing the store's
+    result for the closest earlier version of the frame; the new result
+    is stored. Returns (minimal, per-level metrics, reuse report).
+    """
+    started = time.perf_counter()
+    hashes = {str(col): row_hashes(df[col]) for col in df.columns}
+    fingerprints = {col: digest(col_hashes) for col, col_hashes in hashes.items()}
+    columns = list(df.columns)
+    # mode: "identical" (stored result returned), "revalidated" or "full" (no usable earlier version)
+    report = {"mode": "full", "base": None, "rows": None, "columns_reused": [], "columns_changed": columns,
+              "candidates_reused": 0, "candidates_checked": None}
+
+    key = frame_key(fingerprints, max_lhs_size)
+    record = store.get(key)
+    if record is not None and list(record["fingerprints"]) == columns:
+        # The same frame again
+        minimal = {col: [frozenset(lhs) for lhs in lhss] for col, lhss in record["minimal"].items()}
+        report.update(mode="identical", base=key, rows="same", columns_reused=columns, columns_changed=[],
+                      candidates_reused=None, candidates_checked=0,
+                      seconds=round(time.perf_counter() - started, 6))
+        return minimal, [], report
+
+    base, mapping, appended = find_base(store, hashes, fingerprints, max_lhs_size)
+    levels = []
+    if base is not None and len(columns) - len(mapping) <= REUSE_MAX_CHANGED * len(columns):
+        minimal, levels, counts = revalidate(df, base, mapping, appended, max_lhs_size)
+        report.update(mode="revalidated", base=base["key"], rows="appended" if appended else "same",
+                      columns_reused=[col for col in columns if col in mapping],
+                      columns_changed=[col for col in columns if col not in mapping],
+                      candidates_reused=counts["reused"], candidates_checked=counts["checked"])
+    else:
+        minimal = discover_minimal_fds(df, max_lhs_size=max_lhs_size, n_jobs=n_jobs, on_level=levels.append)
+    store.put(fingerprints, len(df), max_lhs_size, minimal)
+    report["seconds"] = round(time.perf_counter() - started, 6)
+    return minimal, levels, report
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+
+def row_hashes(series: pd.Series) -> np.ndarray:
+    """
+    A 64-bit hash per value. Equal values hash equally whatever the column's
+    encoding (Arrow strings, categoricals, narrowed ints), so recoding a
+    column does not change its fingerprint.
+    """
+    return hash_pandas_object(series, index=False).to_numpy()
+
+
+def digest(hashes: np.ndarray) -> str:
+    """Fingerprint of a column (or of its first rows) from its row hashes."""
+    return hashlib.blake2b(np.ascontiguousarray(hashes).tobytes(), digest_size=16).hexdigest()
+
+
+def column_fingerprints(df: pd.DataFrame) -> Dict[str, str]:
+    """Content fingerprint of every column: its values in row order."""
+    return {str(col): digest(row_hashes(df[col])) for col in df.columns}
+
+
+def compare_fingerprints(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Columns of `new` by name that are unchanged or changed since `old`, and the ones added or removed."""
+    return {
+        "unchanged": [col for col in new if old.get(col) == new[col]],
+        "changed": [col for col in new if col in old and old[col] != new[col]],
+        "added": [col for col in new if col not in old],
+        "removed": [col for col in old if col not in new],
+    }
+
+
+def prefix_fingerprints(df: pd.DataFrame, rows: int) -> Dict[str, str]:
+    """Fingerprints of the first `rows` rows of every column, to recognise appended rows."""
+    return {str(col): digest(row_hashes(df[col])[:rows]) for col in df.columns}
@@ -0,0 +1,191 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One pipeline run. Progress is reported per step and the result dict is
+    filled in as steps finish, so pollers can show partial results; every
+    change bumps `version`, which streaming readers wait on.
+    """
+
+    def __init__(self, steps: List[str], group: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.group = group
+        self.steps = list(steps)
+        self.status = "queued"
+        self.step_status = [{"step": step, "status": "pending", "elapsed": None} for step in steps]
+        self.result: Dict = {}
+        self.error: Optional[Dict] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._step_started: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.version = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def start_step(self, idx: int) -> None:
+        self.check_cancelled()
+        with self._lock:
+            self._step_started[idx] = time.time()
+            self.step_status[idx]["status"] = "running"
+            self._bump()
+
+    def finish_step(self, idx: int, step_result: Optional[Dict], cached: bool = False) -> None:
+        with self._lock:
+            started = self._step_started.get(idx)
+            self.step_status[idx]["status"] = "cached" if cached else "done"
+            self.step_status[idx]["elapsed"] = 0.0 if cached or started is None else round(time.time() - started, 3)
+            if step_result is not None:
+                self.result[self.steps[idx]] = step_result
+            self._bump()
+
+    def set_status(self, status: str, finished: bool = False) -> None:
+        with self._lock:
+            self.status = status
+            if finished:
+                self.finished = time.time()
+            self._bump()
+
+    def _bump(self) -> None:
+        self.version += 1
+        self._changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Blocks until the job changed since `version` (or `timeout` passed); returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def to_dict(self, from_step: int = 0) -> Dict:
+        """Status snapshot; results are only included for steps at index >= from_step."""
+        with self._lock:
+            now = self.finished or time.time()
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "steps": [dict(s) for s in self.step_status],
+                "elapsed": round(now - self.started, 3) if self.started else 0.0,
+                "result": {step: self.result[step] for step in self.steps[from_step:] if step in self.result},
+                "error": self.error
+            }
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded thread pool. CPU-bound work inside a job
+    (FD mining) can be pushed to a process pool with `run_cpu`. Submitting a
+    job for a group cancels the previous job of that group.
+    """
+
+    def __init__(self, max_workers: int = 4, cpu_workers: Optional[int] = None,
+                 keep_finished_seconds: int = 3600):
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etl-job")
+        self._cpu_workers = cpu_workers
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._groups: Dict[str, str] = {}
+        self._keep_finished = keep_finished_seconds
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Job], Dict], steps: List[str], group: Optional[str] = None) -> Job:
+        job = Job(steps, group)
+        with self._lock:
+            self._prune()
+            if group is not None:
+                previous = self._jobs.get(self._groups.get(group))
+                if previous is not None and previous.finished is None:
+                    previous.cancel()
+                self._groups[group] = job.id
+            self._jobs[job.id] = job
+        self._threads.submit(self._run, fn, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def run_cpu(self, job: Optional[Job], fn: Callable, *args, poll_seconds: float = 0.25):
+        """
+        Runs `fn(*args)` in the process pool and waits for it, giving up early
+        if the job is cancelled. An already running task is left to finish in
+        its worker; its result is discarded.
+        """
+        future = self._process_pool().submit(fn, *args)
+        while True:
+            try:
+                return future.result(timeout=poll_seconds)
+            except FutureTimeout:
+                if job is not None and job.cancelled:
+                    future.cancel()
+                    raise JobCancelled(job.id)
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # spawn: forking a multi-threaded web server is not safe
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self._cpu_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+
+    def _run(self, fn: Callable[[Job], Dict], job: Job) -> None:
+        job.started = time.time()
+        if job.cancelled:
+            job.set_status("cancelled", finished=True)
+            return
+        job.set_status("running")
+        status = "error"
+        try:
+            error = fn(job)
+            if error:
+                job.error = error
+            else:
+                status = "done"
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            job.error = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            job.set_status(status, finished=True)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._keep_finished
+        for job_id in [jid for jid, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            job = self._jobs.pop(job_id)
+            if job.group is not None and self._groups.get(job.group) == job_id:
+                del self._groups[job.group]
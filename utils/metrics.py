@@ -0,0 +1,190 @@
+import bisect
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Histogram bucket upper bounds; observations above the last one land in "+Inf"
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BYTES_BUCKETS = tuple(2 ** p for p in range(20, 36, 2))  # 1 MiB .. 16 GiB
+ROWS_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+# Whether tracing was started here, so tracing started by someone else is left running
+_tracing_owned = False
+
+
+def _start_tracing() -> None:
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracing() -> int:
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+        return peak
+
+
+def max_rss_bytes() -> Optional[int]:
+    """High-water mark of this process's resident memory (Linux reports KiB, macOS bytes)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def frame_size(df: Optional[pd.DataFrame]) -> Tuple[Optional[int], Optional[int]]:
+    """(rows, bytes) of a frame, or (None, None) when there is none."""
+    if df is None:
+        return None, None
+    return len(df), int(df.memory_usage(deep=True, index=False).sum())
+
+
+class StepMeter:
+    """
+    Wall time, CPU time of the calling thread and, with `trace_memory`, the
+    peak memory traced by tracemalloc while one step runs. The peak is
+    process-wide, so steps of concurrent jobs see each other's allocations;
+    work sent to the process pool counts towards wall time only. The
+    process's resident-memory high-water mark is recorded either way.
+    """
+
+    def __init__(self, step: str, trace_memory: bool = True):
+        self.step = step
+        self.trace_memory = trace_memory
+        self.record: Dict = {"step": step}
+        self._running = False
+
+    def set_input(self, df: Optional[pd.DataFrame] = None, rows: Optional[int] = None,
+                  nbytes: Optional[int] = None) -> None:
+        """Input size, from `df` or given as `rows` / `nbytes`."""
+        if df is not None:
+            rows, nbytes = frame_size(df)
+        self.record.update(rows_in=rows, bytes_in=nbytes)
+
+    def start(self) -> "StepMeter":
+        self.record.update(rows_in=None, bytes_in=None)
+        if self.trace_memory:
+            _start_tracing()
+        self._running = True
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def stop(self, df: Optional[pd.DataFrame] = None, rows: Optional[int] = None,
+             nbytes: Optional[int] = None) -> Dict:
+        """Stops measuring and returns the record, with the output size as for `set_input`."""
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        peak = self.close()
+        if df is not None:
+            rows, nbytes = frame_size(df)
+        self.record.update(
+            wall_seconds=round(wall, 6),
+            cpu_seconds=round(cpu, 6),
+            peak_memory_bytes=peak,
+            max_rss_bytes=max_rss_bytes(),
+            rows_out=rows,
+            bytes_out=nbytes
+        )
+        return self.record
+
+    def close(self) -> Optional[int]:
+        """Ends memory tracing without recording (e.g. the step failed); safe to call twice."""
+        if not self._running:
+            return None
+        self._running = False
+        return _stop_tracing() if self.trace_memory else None
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> Dict:
+        """Cumulative bucket counts by upper bound ("le"), as in Prometheus."""
+        cumulative, total = [], 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            cumulative.append({"le": bound, "count": total})
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": cumulative}
+
+
+class MetricsRegistry:
+    """Per-step histograms of the step records, aggregated over all runs of this process."""
+
+    HISTOGRAMS = {
+        "wall_seconds": SECONDS_BUCKETS,
+        "cpu_seconds": SECONDS_BUCKETS,
+        "peak_memory_bytes": BYTES_BUCKETS,
+        "rows_out": ROWS_BUCKETS,
+        "bytes_out": BYTES_BUCKETS,
+    }
+
+    def __init__(self):
+        self._steps: Dict[str, Dict[str, Histogram]] = {}
+        self._fd_levels: Dict[int, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe_step(self, step: str, record: Dict) -> None:
+        with self._lock:
+            histograms = self._steps.setdefault(
+                step, {name: Histogram(buckets) for name, buckets in self.HISTOGRAMS.items()}
+            )
+            for name, histogram in histograms.items():
+                if record.get(name) is not None:
+                    histogram.observe(record[name])
+            for level in record.get("fd_levels", []):
+                self._fd_levels.setdefault(level["level"], Histogram(SECONDS_BUCKETS)).observe(level["seconds"])
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "steps": {step: {name: h.to_dict() for name, h in histograms.items()}
+                          for step, histograms in self._steps.items()},
+                "fd_level_seconds": {str(level): h.to_dict() for level, h in sorted(self._fd_levels.items())}
+            }
+
+
+def profile_call(profile_path: str, fn, *args, **kwargs):
+    """
+    Runs `fn` under cProfile and writes the stats to `profile_path` in
+    pstats format (readable by pstats, snakeviz or flameprof). Only the
+    calling thread is profiled.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+        profiler.dump_stats(profile_path)
+
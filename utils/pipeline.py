@@ -0,0 +1,332 @@
+import os
+import uuid
+from typing import Callable, Dict, List, Mapping, Optional
+
+import pandas as pd
+
+from utils.cleaner import clean_data, clean_data_chunked
+from utils.columnar_store import LazyFrame, columnar_path, csv_shape, ingest_csv, write_frame
+from utils.dtype_profile import compact_frame, load_profile, memory_summary
+from utils.er_generator import generate_er_diagram
+from utils.fd_checker import mine_approximate_fds, mine_fds_reusing, mine_fds_with_metrics
+from utils.first_nf_checker import iter_first_nf, to_first_nf
+from utils.metrics import StepMeter
+from utils.second_nf_checker import SecondNFChecker
+from utils.sql_export import BATCH_ROWS, EXTENSIONS, export_tables
+from utils.third_nf_checker import FDSynthesis3NFDecomposer, Semantic3NFPrefixDecomposer
+
+# ETL hierarchy
+STEPS = ["clean", "fd", "1nf", "2nf", "3nf", "er", "sql"]
+
+# Request options that change a step's output, with their allowed values (default first)
+STEP_OPTIONS = {
+    "decomposition": (("3nf", "er"), ("prefix", "synthesis")),
+    "er_layout": (("er",), ("auto", "circular", "grid", "hierarchical")),
+    "er_format": (("er",), ("png", "svg", "dot")),
+    "fd_mode": (("fd",), ("exact", "approximate")),
+    "sql_dialect": (("sql",), ("sqlite", "postgres")),
+}
+# Numeric request options: (affected steps, default, minimum, maximum)
+NUMERIC_STEP_OPTIONS = {
+    # Largest g3 error (fraction of violating rows) of an approximate FD
+    "fd_max_error": (("fd",), 0.01, 0.0, 1.0),
+}
+
+# Settings the step engine reads; the app passes its config, which may override them
+DEFAULT_CONFIG = {
+    "FD_WORKERS": 1,
+    # Exact FD results by column fingerprints, reused for re-uploads of a changed file; off when unset
+    "FD_STORE_FOLDER": None,
+    # Approximate FD mode: rows in the stratified sample used to prune candidates
+    "FD_SAMPLE_ROWS": 20_000,
+    # Uploads at least this large are cleaned in chunks instead of being loaded whole
+    "STREAMING_CLEAN_MIN_BYTES": 1024 * 1024 * 1024,
+    "STREAMING_CHUNK_ROWS": 200_000,
+    # 1NF explosion: "cartesian" or "zipped", and what to do past FIRST_NF_MAX_ROWS ("refuse" or "stream")
+    "FIRST_NF_MODE": "cartesian",
+    "FIRST_NF_MAX_ROWS": 5_000_000,
+    "FIRST_NF_OVERFLOW": "refuse",
+    # Rows kept as a preview of streamed step output
+    "RESULT_PAGE_SIZE": 100,
+    # Intermediate files; next to the input CSV when unset
+    "WORK_FOLDER": None,
+    # SQL exports; in the work folder when unset
+    "EXPORT_FOLDER": None,
+    "SQL_BATCH_ROWS": BATCH_ROWS,
+}
+
+
+def step_order(step):
+    """Defines the ETL hierarchy order (lower is earlier)."""
+    return STEPS.index(step) if step in STEPS else -1
+
+
+def validate_steps(steps):
+    """Returns an error payload if the requested steps break the ETL hierarchy, else None."""
+    # Always require clean to be first
+    if steps[0] != "clean":
+        msg = "Without cleaning it will generate irrelevant ER Diagram. So follow the process: Clean → FD → 1NF → 2NF → 3NF → ER."
+        return {"error": msg, "blocked_step": steps[0]}
+
+    # If ER is requested, ensure 3NF is present before it
+    if "er" in steps:
+        er_idx = steps.index("er")
+        if "3nf" not in steps[:er_idx]:
+            msg = "Complete 3NF before generating an ER Diagram."
+            return {"error": msg, "blocked_step": "er"}
+
+    # The SQL export loads the 3NF tables
+    if "sql" in steps and "3nf" not in steps[:steps.index("sql")]:
+        return {"error": "Complete 3NF before exporting to SQL.", "blocked_step": "sql"}
+
+    # Check for "going down" the hierarchy after a higher order step
+    # Find the highest order step selected so far
+    max_order = max([step_order(step) for step in steps])
+    for idx, step in enumerate(steps):
+        # If any step is less than the highest order (i.e., user went back down), block
+        if step_order(step) < max_order and idx == len(steps) - 1:
+            msg = f"You have already selected a higher ETL step. Please follow the order: Clean → FD → 1NF → 2NF → 3NF → ER."
+            return {"error": msg, "blocked_step": step}
+    return None
+
+
+def validate_options(options):
+    """Returns an error payload for unknown options or values, else None."""
+    for name, value in options.items():
+        if name in NUMERIC_STEP_OPTIONS:
+            _, _, low, high = NUMERIC_STEP_OPTIONS[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+                return {"error": f"Option '{name}' must be a number between {low} and {high}."}
+            continue
+        if name not in STEP_OPTIONS:
+            return {"error": f"Unknown option '{name}'."}
+        allowed = STEP_OPTIONS[name][1]
+        if value not in allowed:
+            return {"error": f"Option '{name}' must be one of {', '.join(allowed)}."}
+    return None
+
+
+def cache_steps(steps, options):
+    """
+    Step names as used in cache keys and result keys: a step affected by a
+    non-default option carries it, e.g. "3nf[decomposition=synthesis]".
+    """
+    specs = {name: (affected, allowed[0]) for name, (affected, allowed) in STEP_OPTIONS.items()}
+    specs.update({name: (affected, default) for name, (affected, default, _, _) in NUMERIC_STEP_OPTIONS.items()})
+    tagged = []
+    for step in steps:
+        tags = [f"{name}={options[name]}" for name, (affected, default) in sorted(specs.items())
+                if step in affected and options.get(name, default) != default]
+        tagged.append(f"{step}[{','.join(tags)}]" if tags else step)
+    return tagged
+
+
+def decompose_step(df, fds, options):
+    """3NF decomposition: by column-name prefix, or synthesized from the FDs."""
+    if options.get("decomposition") == "synthesis":
+        decomposer = FDSynthesis3NFDecomposer(df, fds)
+    else:
+        decomposer = Semantic3NFPrefixDecomposer(df)
+    decomposer.decompose_3nf()
+    return decomposer
+
+
+def _run_inline(fn, *args):
+    return fn(*args)
+
+
+class Pipeline:
+    """
+    The Clean → FD → 1NF → 2NF → 3NF → ER / SQL step engine, without HTML or
+    request handling. A run state is a dict with the current frame ("df",
+    None while a streamed result is only on disk), "fds", 3NF "tables" and
+    "latest_path", the file the frame was last written to; `run_step`
+    advances it by one step and returns that step's outcome as plain data.
+
+    `config` is read on every step (so a live app config can be passed);
+    missing keys fall back to DEFAULT_CONFIG. `render_er(tables, format,
+    layout)` returns the path of a rendered diagram; by default diagrams
+    are written to the work folder.
+    """
+
+    def __init__(self, config: Optional[Mapping] = None,
+                 render_er: Optional[Callable[[List[Dict], str, str], str]] = None):
+        self.config = config if config is not None else {}
+        self.render_er = render_er or self._render_er
+
+    def setting(self, name: str):
+        return self.config.get(name, DEFAULT_CONFIG[name])
+
+    @staticmethod
+    def new_state(csv_path: str) -> Dict:
+        return {"df": None, "fds": [], "tables": None, "latest_path": csv_path}
+
+    def is_streamed(self, step: str, csv_path: str) -> bool:
+        """Cleaning an upload too large to load runs chunk by chunk from the CSV."""
+        return step == "clean" and os.path.getsize(csv_path) >= self.setting("STREAMING_CLEAN_MIN_BYTES")
+
+    def load(self, state: Dict) -> pd.DataFrame:
+        if state["df"] is None:
+            state["df"] = LazyFrame(ingest_csv(state["latest_path"])).load()
+        return state["df"]
+
+    def work_path(self, csv_path: str, tag: str, ext: str) -> str:
+        """A fresh path for an intermediate file derived from `csv_path`."""
+        folder = self.setting("WORK_FOLDER") or os.path.dirname(csv_path)
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        return os.path.join(folder, f"{stem}_{tag}_{uuid.uuid4().hex[:6]}{ext}")
+
+    def run_step(self, step: str, state: Dict, csv_path: str, options: Optional[Dict] = None,
+                 run_cpu: Optional[Callable] = None) -> Dict:
+        """
+        Runs `step` on `state` (updated in place) and returns its outcome. FD
+        mining goes through `run_cpu(fn, *args)`, e.g. to use a process pool.
+        A step that refuses to run returns {"error", "blocked_step"}.
+        """
+        options = options or {}
+        run_cpu = run_cpu or _run_inline
+        streamed = self.is_streamed(step, csv_path)
+        if not streamed:
+            self.load(state)
+        if streamed:
+            return self._clean_streamed(state, csv_path)
+        if step == "clean":
+            return self._clean(state, csv_path)
+        if step == "fd":
+            return self._fd(state, options, run_cpu)
+        if step == "1nf":
+            return self._first_nf(state, csv_path)
+        if step == "2nf":
+            return self._second_nf(state, run_cpu)
+        if step == "3nf":
+            return self._third_nf(state, options, run_cpu)
+        if step == "er":
+            return self._er(state, options)
+        if step == "sql":
+            return self._sql(state, csv_path, options)
+        raise ValueError(f"Unknown step '{step}'")
+
+    def run(self, csv_path: str, steps: List[str], options: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Validates and runs `steps` on one CSV. Returns the outcome of each
+        step, with its "metrics", and the final state under "state"; or an
+        error payload.
+        """
+        options = options or {}
+        error = validate_steps(steps) or validate_options(options)
+        if error:
+            return error
+        state = self.new_state(csv_path)
+        outcomes = {}
+        for step in steps:
+            meter = StepMeter(step, trace_memory=False).start()
+            outcome = self.run_step(step, state, csv_path, options)
+            if "error" in outcome:
+                meter.close()
+                return outcome
+            outcome["metrics"] = meter.stop(state["df"], rows=outcome.get("rows"))
+            outcomes[step] = outcome
+        outcomes["state"] = state
+        return outcomes
+
+    def _mine_fds(self, df, run_cpu):
+        """(fds, per-level metrics, reuse report or None)."""
+        if self.setting("FD_STORE_FOLDER"):
+            return run_cpu(mine_fds_reusing, df, self.setting("FD_STORE_FOLDER"), 2, self.setting("FD_WORKERS"))
+        return (*run_cpu(mine_fds_with_metrics, df, 2, "partition", self.setting("FD_WORKERS")), None)
+
+    def _mine_into(self, state, outcome, run_cpu):
+        state["fds"], outcome["fd_levels"], reuse = self._mine_fds(state["df"], run_cpu)
+        if reuse is not None:
+            outcome["fd_reuse"] = reuse
+
+    def _clean_streamed(self, state, csv_path):
+        # Larger than memory: clean chunk by chunk; the next step loads the (smaller) output
+        state["latest_path"] = self.work_path(csv_path, "clean", ".csv")
+        info = clean_data_chunked(csv_path, state["latest_path"], chunksize=self.setting("STREAMING_CHUNK_ROWS"),
+                                  spill_folder=os.path.dirname(state["latest_path"]))
+        n_rows, _ = csv_shape(state["latest_path"])
+        state["df"] = None
+        head = pd.read_csv(state["latest_path"], nrows=self.setting("RESULT_PAGE_SIZE"))
+        return {"info": info, "rows": n_rows, "head": head}
+
+    def _clean(self, state, csv_path):
+        df, info = clean_data(state["df"])
+        # Merged columns come out as plain strings; re-encode so later steps work on codes
+        df = compact_frame(df)
+        info["memory"] = memory_summary(load_profile(columnar_path(csv_path)), df)
+        state["df"] = df
+        state["latest_path"] = write_frame(df, self.work_path(csv_path, "clean", ".feather"))
+        return {"info": info}
+
+    def _fd(self, state, options, run_cpu):
+        if options.get("fd_mode") == "approximate":
+            max_error = options.get("fd_max_error", NUMERIC_STEP_OPTIONS["fd_max_error"][1])
+            approximate, stats = run_cpu(mine_approximate_fds, state["df"], 2, max_error,
+                                         self.setting("FD_SAMPLE_ROWS"))
+            # Later steps treat the accepted near-FDs as exact
+            state["fds"] = [(fd["lhs"], fd["rhs"]) for fd in approximate]
+            return {"fds": state["fds"], "approximate": approximate, "stats": stats, "fd_levels": stats["levels"]}
+        outcome = {}
+        self._mine_into(state, outcome, run_cpu)
+        return {"fds": state["fds"], **outcome}
+
+    def _first_nf(self, state, csv_path):
+        mode = self.setting("FIRST_NF_MODE")
+        try:
+            df, summary = to_first_nf(state["df"], mode=mode, max_rows=self.setting("FIRST_NF_MAX_ROWS"))
+        except ValueError as e:
+            if self.setting("FIRST_NF_OVERFLOW") != "stream":
+                return {"error": f"{e} Raise FIRST_NF_MAX_ROWS or enable streaming.", "blocked_step": "1nf"}
+            # Too large to hold twice: write the exploded rows chunk by chunk
+            path = self.work_path(csv_path, "1nf", ".csv")
+            n_rows, head = 0, None
+            for chunk, summary in iter_first_nf(state["df"], mode=mode,
+                                                chunk_rows=self.setting("STREAMING_CHUNK_ROWS")):
+                chunk.to_csv(path, mode="a" if n_rows else "w", header=not n_rows, index=False)
+                head = chunk.iloc[:self.setting("RESULT_PAGE_SIZE")] if head is None else head
+                n_rows += len(chunk)
+            state["df"] = None
+            state["latest_path"] = path
+            return {"summary": summary, "rows": n_rows, "head": head}
+        state["df"] = compact_frame(df)
+        state["latest_path"] = write_frame(state["df"], self.work_path(csv_path, "1nf", ".feather"))
+        return {"summary": summary}
+
+    def _second_nf(self, state, run_cpu):
+        outcome = {}
+        if not state["fds"]:
+            self._mine_into(state, outcome, run_cpu)
+        # Primary key: the smallest candidate key derived from the FDs
+        checker = SecondNFChecker(state["df"], None, state["fds"])
+        outcome.update(primary_key=checker.primary_key, violations=checker.get_violations(),
+                       is_2nf=checker.is_2nf())
+        return outcome
+
+    def _third_nf(self, state, options, run_cpu):
+        outcome = {}
+        if not state["fds"] and options.get("decomposition") == "synthesis":
+            self._mine_into(state, outcome, run_cpu)
+        state["tables"] = decompose_step(state["df"], state["fds"], options).tables
+        outcome["tables"] = state["tables"]
+        return outcome
+
+    def _er(self, state, options):
+        # The diagram shows the tables of the preceding 3NF step
+        if state["tables"] is None:
+            state["tables"] = decompose_step(state["df"], state["fds"], options).tables
+        path = self.render_er(state["tables"], options.get("er_format", "png"), options.get("er_layout", "auto"))
+        return {"path": path}
+
+    def _sql(self, state, csv_path, options):
+        dialect = options.get("sql_dialect", "sqlite")
+        path = self.work_path(csv_path, "sql", EXTENSIONS[dialect])
+        if self.setting("EXPORT_FOLDER"):
+            path = os.path.join(self.setting("EXPORT_FOLDER"), os.path.basename(path))
+        report = export_tables(state["tables"], path, dialect, batch_rows=self.setting("SQL_BATCH_ROWS"))
+        return {"path": path, "report": report, "rows": report["rows"]}
+
+    def _render_er(self, tables, format, layout):
+        folder = self.setting("WORK_FOLDER") or "."
+        return generate_er_diagram(tables, output_folder=folder, filename=f"er_{uuid.uuid4().hex[:8]}",
+                                   format=format, layout=layout)
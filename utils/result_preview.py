@@ -0,0 +1,81 @@
+import html
+import json
+from typing import Dict, List, Optional
+
+import pandas as pd
+from tabulate import tabulate
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def frame_schema(df: pd.DataFrame) -> List[Dict[str, str]]:
+    return [{"name": str(col), "dtype": str(dtype)} for col, dtype in df.dtypes.items()]
+
+
+def frame_page(df: pd.DataFrame, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+               sort_by: Optional[str] = None, ascending: bool = True) -> pd.DataFrame:
+    """
+    Returns rows [offset, offset + limit) of `df`, optionally ordered by one
+    column. Only the sort column is sorted; the page is gathered by position.
+    """
+    offset = max(int(offset), 0)
+    limit = min(max(int(limit), 0), MAX_PAGE_SIZE)
+    if sort_by is None:
+        return df.iloc[offset:offset + limit]
+    if sort_by not in df.columns:
+        raise KeyError(sort_by)
+    order = df[sort_by].reset_index(drop=True).sort_values(
+        ascending=ascending, kind="stable", na_position="last"
+    ).index[offset:offset + limit]
+    return df.iloc[order]
+
+
+def page_payload(df: pd.DataFrame, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                 sort_by: Optional[str] = None, ascending: bool = True) -> Dict:
+    page = frame_page(df, offset, limit, sort_by, ascending)
+    # to_json takes care of NaN and numpy scalars
+    rows = json.loads(page.to_json(orient="values", date_format="iso"))
+    return {
+        "total_rows": len(df),
+        "columns": [str(col) for col in df.columns],
+        "offset": offset,
+        "rows": rows
+    }
+
+
+def csv_page_payload(csv_path: str, total_rows: int, offset: int = 0,
+                     limit: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Page of a streamed (CSV) step output, read without loading the whole file."""
+    offset = max(int(offset), 0)
+    limit = min(max(int(limit), 0), MAX_PAGE_SIZE)
+    page = pd.read_csv(csv_path, skiprows=range(1, offset + 1), nrows=limit)
+    return {
+        "total_rows": total_rows,
+        "columns": [str(col) for col in page.columns],
+        "offset": offset,
+        "rows": json.loads(page.to_json(orient="values", date_format="iso"))
+    }
+
+
+def preview_table_html(df: pd.DataFrame, result_key: str, table: str = "current",
+                       page_size: int = DEFAULT_PAGE_SIZE, total_rows: Optional[int] = None) -> str:
+    """
+    Renders the first page of `df` inside a scrollable wrapper. The data
+    attributes tell the UI where to fetch further pages from. `df` may be
+    just the first page when `total_rows` is given.
+    """
+    page = df.iloc[:page_size]
+    table_html = tabulate(page, headers='keys', tablefmt='html', showindex=False)
+    total = len(df) if total_rows is None else total_rows
+    shown = len(page)
+    note = f"<div class='etl-table-count'>Showing {shown} of {total} rows</div>" if shown < total else ""
+    return (
+        f"{note}<div class='etl-table-wrapper' data-result-key='{html.escape(result_key, quote=True)}'"
+        f" data-table='{html.escape(str(table), quote=True)}' data-total-rows='{total}'"
+        f" data-loaded-rows='{shown}'>{table_html}</div>"
+    )
+
+
+def preview_info(df: pd.DataFrame) -> Dict:
+    return {"rows": len(df), "schema": frame_schema(df)}
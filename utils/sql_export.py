@@ -0,0 +1,437 @@
+"""
+Exports 3NF tables (as the 3NF step produces them) with their schema to a
+database: DDL with column types inferred from the data and the primary and
+foreign keys the data satisfies, then the rows through each target's bulk
+path. Rows are converted and written in batches, so no INSERT statements
+or whole-table copies are built.
+
+- "sqlite": a database file loaded with `executemany`, one transaction per table.
+- "postgres": a psql script (`psql -f export.sql`) in pg_dump's layout:
+  CREATE TABLE, the rows as COPY ... FROM stdin blocks, then the keys, so
+  indexes are built once after the load.
+"""
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DIALECTS = ("sqlite", "postgres")
+EXTENSIONS = {"sqlite": ".sqlite", "postgres": ".sql"}
+# Rows converted per batch
+BATCH_ROWS = 50_000
+
+# Inferred column kinds and their SQL type per dialect
+SQL_TYPES = {
+    "sqlite": {"integer": "INTEGER", "bigint": "INTEGER", "double": "REAL", "boolean": "INTEGER",
+               "timestamp": "TEXT", "text": "TEXT"},
+    "postgres": {"integer": "INTEGER", "bigint": "BIGINT", "double": "DOUBLE PRECISION", "boolean": "BOOLEAN",
+                 "timestamp": "TIMESTAMP", "text": "TEXT"},
+}
+# Kinds a foreign key can compare against each other
+TYPE_FAMILIES = {"integer": "integer", "bigint": "integer"}
+
+# Text parsed as a number only where it prints back the same way (no leading zeros)
+INTEGER_TEXT = r"0|-?[1-9]\d*"
+DECIMAL_TEXT = r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?"
+INT32_MAX = 2 ** 31 - 1
+INT64_MAX = 2 ** 63 - 1
+COPY_NULL = "\\N"
+
+
+def quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _copy_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _integer_kind(low: int, high: int) -> Optional[str]:
+    if -INT32_MAX - 1 <= low and high <= INT32_MAX:
+        return "integer"
+    if -INT64_MAX - 1 <= low and high <= INT64_MAX:
+        return "bigint"
+    return None
+
+
+def _distinct_kind(values: pd.Index) -> Tuple[str, list]:
+    """SQL kind of a column's distinct (non-missing) values, and the values as Python objects."""
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return "boolean", [bool(v) for v in values]
+    if pd.api.types.is_integer_dtype(values.dtype) and len(values):
+        kind = _integer_kind(int(values.min()), int(values.max()))
+        if kind:
+            return kind, [int(v) for v in values]
+    elif pd.api.types.is_float_dtype(values.dtype):
+        numbers = [float(v) for v in values]
+        if all(v.is_integer() for v in numbers) and len(numbers):
+            kind = _integer_kind(int(min(numbers)), int(max(numbers)))
+            if kind:
+                return kind, [int(v) for v in numbers]
+        return "double", numbers
+    elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return "timestamp", [v.isoformat(sep=" ") for v in values]
+    text = pd.Index([str(v) for v in values], dtype=object)
+    if len(text) and text.str.fullmatch(INTEGER_TEXT).all():
+        numbers = [int(v) for v in text]
+        kind = _integer_kind(min(numbers), max(numbers))
+        if kind:
+            return kind, numbers
+    if len(text) and text.str.fullmatch(DECIMAL_TEXT).all():
+        return "double", [float(v) for v in text]
+    return "text", list(text)
+
+
+class ColumnEncoder:
+    """
+    One column's SQL kind and its values, batch by batch, as SQLite
+    parameters or COPY text. Numpy numeric columns are converted directly;
+    other columns through their distinct values (categories, or a
+    factorization), so parsing and escaping happen once per value.
+    """
+
+    def __init__(self, series: pd.Series):
+        self._array = None
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            array = series.to_numpy()
+            self._missing = None
+            if dtype.kind == "b":
+                self.kind = "boolean"
+            elif dtype.kind == "f":
+                self.kind = "double"
+                missing = np.isnan(array)
+                known = array[~missing]
+                # Integers that became floats to hold NaN
+                if len(known) and np.isfinite(known).all() and (np.mod(known, 1) == 0).all():
+                    self.kind = _integer_kind(int(known.min()), int(known.max())) or "double"
+                    if self.kind != "double":
+                        self._missing = missing
+            else:
+                self.kind = _integer_kind(int(array.min()), int(array.max())) if len(array) else "integer"
+            if self.kind:
+                self._array = array
+                return
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+            uniques = pd.Index(uniques)
+        self.kind, values = _distinct_kind(uniques)
+        self._codes = codes
+        # Code -1 (missing) picks the trailing None / \N
+        self._params = np.array(values + [None], dtype=object)
+        if self.kind == "boolean":
+            text = ["t" if v else "f" for v in values]
+        elif self.kind == "double":
+            text = [_float_text(v) for v in values]
+        else:
+            text = [_copy_escape(str(v)) for v in values]
+        self._text = np.array(text + [COPY_NULL], dtype=object)
+
+    def params(self, lo: int, hi: int) -> list:
+        """Values of rows lo:hi as Python objects, None where missing."""
+        if self._array is None:
+            return self._params[self._codes[lo:hi]].tolist()
+        chunk = self._array[lo:hi]
+        if self._missing is not None:
+            missing = self._missing[lo:hi]
+            values = np.where(missing, 0, chunk).astype(np.int64).astype(object)
+            values[missing] = None
+            return values.tolist()
+        if self.kind == "double":
+            values = chunk.astype(object)
+            values[np.isnan(chunk)] = None
+            return values.tolist()
+        return chunk.tolist()
+
+    def copy_text(self, lo: int, hi: int) -> np.ndarray:
+        """Values of rows lo:hi in COPY text format."""
+        if self._array is None:
+            return self._text[self._codes[lo:hi]]
+        chunk = self._array[lo:hi]
+        if self._missing is not None:
+            missing = self._missing[lo:hi]
+            text = np.where(missing, 0, chunk).astype(np.int64).astype(str).astype(object)
+            text[missing] = COPY_NULL
+            return text
+        if self.kind == "boolean":
+            return np.where(chunk, "t", "f").astype(object)
+        if self.kind == "double":
+            text = chunk.astype(str).astype(object)
+            text[np.isnan(chunk)] = COPY_NULL
+            text[np.isposinf(chunk)] = "Infinity"
+            text[np.isneginf(chunk)] = "-Infinity"
+            return text
+        return chunk.astype(str).astype(object)
+
+
+def _float_text(value: float) -> str:
+    if np.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
+
+
+def _unique_names(names: List[str]) -> List[str]:
+    """Table names made unique; SQLite compares identifiers case-insensitively, so this does too."""
+    used, result = set(), []
+    for name in names:
+        unique, suffix = name, 2
+        while unique.lower() in used:
+            unique, suffix = f"{name}_{suffix}", suffix + 1
+        used.add(unique.lower())
+        result.append(unique)
+    return result
+
+
+def _check_primary_key(df: pd.DataFrame, pk: List[str]) -> Optional[str]:
+    """Why `pk` cannot be declared on `df`, or None when the data satisfies it."""
+    if not pk:
+        return "no primary key"
+    missing_cols = [col for col in pk if col not in df.columns]
+    if missing_cols:
+        return f"primary key column(s) {', '.join(missing_cols)} not in the table"
+    keys = df[pk]
+    n_null = int(keys.isna().any(axis=1).sum())
+    if n_null:
+        return f"primary key ({', '.join(pk)}) not declared: {n_null} row(s) without a key"
+    n_dup = int(keys.duplicated().sum())
+    if n_dup:
+        return f"primary key ({', '.join(pk)}) not declared: {n_dup} duplicate key(s)"
+    return None
+
+
+def plan_tables(tables: List[Dict]) -> List[Dict]:
+    """
+    Export plan of each table: its unique SQL name, columns with encoders,
+    and the primary and foreign keys that can be declared. A key the data
+    does not satisfy (duplicate or missing keys, references to a table
+    without that key, dangling references) is left out and explained in
+    the table's "notes", so loading never fails on a constraint.
+    """
+    plans = []
+    for table, name in zip(tables, _unique_names([t["table_name"] for t in tables])):
+        df = table["df"]
+        encoders = {col: ColumnEncoder(df[col]) for col in df.columns}
+        note = _check_primary_key(df, list(table["primary_key"]))
+        plans.append({
+            "name": name,
+            "table_name": table["table_name"],
+            "df": df,
+            "encoders": encoders,
+            "primary_key": list(table["primary_key"]) if note is None else [],
+            "foreign_keys": [],
+            "notes": [note] if note else []
+        })
+
+    by_name = {plan["table_name"]: plan for plan in plans}
+    for table, plan in zip(tables, plans):
+        # One constraint per referenced table, over all its key columns
+        grouped: Dict[str, Dict[str, str]] = {}
+        for fk in table["foreign_keys"]:
+            grouped.setdefault(fk["ref_table"], {})[fk["ref_column"]] = fk["column"]
+        for ref_table, columns_by_ref in grouped.items():
+            ref = by_name.get(ref_table)
+            note = _check_foreign_key(plan, ref, columns_by_ref)
+            if note:
+                plan["notes"].append(note)
+                continue
+            plan["foreign_keys"].append({
+                "columns": [columns_by_ref[col] for col in ref["primary_key"]],
+                "ref_table": ref["name"],
+                "ref_columns": list(ref["primary_key"])
+            })
+    return plans
+
+
+def _check_foreign_key(plan: Dict, ref: Optional[Dict], columns_by_ref: Dict[str, str]) -> Optional[str]:
+    label = f"foreign key ({', '.join(columns_by_ref.values())})"
+    if ref is None:
+        return f"{label} not declared: referenced table missing"
+    if not ref["primary_key"] or set(columns_by_ref) != set(ref["primary_key"]):
+        return f"{label} not declared: {ref['name']} has no primary key on ({', '.join(columns_by_ref)})"
+    if any(col not in plan["df"].columns for col in columns_by_ref.values()):
+        return f"{label} not declared: column not in the table"
+    for ref_col, col in columns_by_ref.items():
+        kinds = plan["encoders"][col].kind, ref["encoders"][ref_col].kind
+        if len({TYPE_FAMILIES.get(kind, kind) for kind in kinds}) > 1:
+            return f"{label} not declared: {col} is {kinds[0]} but {ref['name']}.{ref_col} is {kinds[1]}"
+    # Compare the values as exported: "1" in one table may be 1.0 in the other
+    child = _exported_values(plan, list(columns_by_ref.values()), list(columns_by_ref)).dropna().drop_duplicates()
+    parent = _exported_values(ref, list(columns_by_ref), list(columns_by_ref))
+    dangling = child.merge(parent, on=list(columns_by_ref), how="left", indicator=True)["_merge"] == "left_only"
+    if dangling.any():
+        return f"{label} not declared: {int(dangling.sum())} value(s) missing from {ref['name']}"
+    return None
+
+
+def _exported_values(plan: Dict, columns: List[str], names: List[str]) -> pd.DataFrame:
+    n_rows = len(plan["df"])
+    return pd.DataFrame({name: pd.Series(plan["encoders"][col].params(0, n_rows), dtype=object)
+                         for col, name in zip(columns, names)})
+
+
+def _dependency_order(plans: List[Dict]) -> List[Dict]:
+    """Referenced tables first where the foreign keys allow it (cycles keep their order)."""
+    ordered, placed = [], set()
+    remaining = list(plans)
+    while remaining:
+        ready = [plan for plan in remaining
+                 if all(fk["ref_table"] in placed or fk["ref_table"] == plan["name"] for fk in plan["foreign_keys"])]
+        ready = ready or remaining[:1]
+        for plan in ready:
+            ordered.append(plan)
+            placed.add(plan["name"])
+            remaining.remove(plan)
+    return ordered
+
+
+def _key_clauses(plan: Dict) -> List[str]:
+    clauses = []
+    if plan["primary_key"]:
+        clauses.append(f"PRIMARY KEY ({', '.join(map(quote_ident, plan['primary_key']))})")
+    for fk in plan["foreign_keys"]:
+        clauses.append(f"FOREIGN KEY ({', '.join(map(quote_ident, fk['columns']))}) "
+                       f"REFERENCES {quote_ident(fk['ref_table'])} ({', '.join(map(quote_ident, fk['ref_columns']))})")
+    return clauses
+
+
+def create_table_sql(plan: Dict, dialect: str, keys: bool = True) -> str:
+    types = SQL_TYPES[dialect]
+    lines = [f"{quote_ident(col)} {types[encoder.kind]}" for col, encoder in plan["encoders"].items()]
+    if keys:
+        lines += _key_clauses(plan)
+    return f"CREATE TABLE {quote_ident(plan['name'])} (\n    " + ",\n    ".join(lines) + "\n);"
+
+
+def schema_sql(plans: List[Dict], dialect: str) -> str:
+    """The DDL of all tables, keys inline."""
+    return "\n\n".join(create_table_sql(plan, dialect) for plan in _dependency_order(plans)) + "\n"
+
+
+def _batches(n_rows: int, batch_rows: int):
+    for lo in range(0, n_rows, batch_rows):
+        yield lo, min(lo + batch_rows, n_rows)
+
+
+def _table_report(plan: Dict, seconds: float) -> Dict:
+    rows = len(plan["df"])
+    return {
+        "table": plan["name"],
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+        "primary_key": plan["primary_key"],
+        "foreign_keys": plan["foreign_keys"],
+        "notes": plan["notes"]
+    }
+
+
+def load_sqlite(plans: List[Dict], db_path: str, batch_rows: int = BATCH_ROWS) -> List[Dict]:
+    """
+    Creates a new SQLite database at `db_path` and loads every table with
+    `executemany`, one transaction per table. The file is written under a
+    temporary name and moved into place when complete; journaling and
+    syncing are off while it is built, since a failed export is discarded.
+    """
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    reports = []
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        ordered = _dependency_order(plans)
+        conn.execute("BEGIN")
+        for plan in ordered:
+            conn.execute(create_table_sql(plan, "sqlite"))
+        conn.execute("COMMIT")
+        for plan in ordered:
+            started = time.perf_counter()
+            columns = ", ".join(map(quote_ident, plan["encoders"]))
+            insert = (f"INSERT INTO {quote_ident(plan['name'])} ({columns}) "
+                      f"VALUES ({', '.join('?' * len(plan['encoders']))})")
+            encoders = list(plan["encoders"].values())
+            conn.execute("BEGIN")
+            for lo, hi in _batches(len(plan["df"]), batch_rows):
+                conn.executemany(insert, zip(*(encoder.params(lo, hi) for encoder in encoders)))
+            conn.execute("COMMIT")
+            reports.append(_table_report(plan, time.perf_counter() - started))
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return reports
+
+
+def write_postgres_script(plans: List[Dict], path: str, batch_rows: int = BATCH_ROWS) -> List[Dict]:
+    """
+    Writes a psql script that creates the tables, loads each one with
+    COPY ... FROM stdin (text format) and then adds the keys, all in one
+    transaction. Rows are written batch by batch.
+    """
+    tmp_path = f"{path}.tmp"
+    reports = []
+    ordered = _dependency_order(plans)
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("SET client_encoding = 'UTF8';\nBEGIN;\n\n")
+            for plan in ordered:
+                f.write(create_table_sql(plan, "postgres", keys=False) + "\n\n")
+            for plan in ordered:
+                started = time.perf_counter()
+                encoders = list(plan["encoders"].values())
+                columns = ", ".join(map(quote_ident, plan["encoders"]))
+                f.write(f"COPY {quote_ident(plan['name'])} ({columns}) FROM stdin;\n")
+                for lo, hi in _batches(len(plan["df"]), batch_rows):
+                    lines = encoders[0].copy_text(lo, hi)
+                    for encoder in encoders[1:]:
+                        lines = lines + "\t" + encoder.copy_text(lo, hi)
+                    f.write("\n".join(lines.tolist()))
+                    f.write("\n")
+                f.write("\\.\n\n")
+                reports.append(_table_report(plan, time.perf_counter() - started))
+            for plan in ordered:
+                for clause in _key_clauses(plan):
+                    f.write(f"ALTER TABLE {quote_ident(plan['name'])} ADD {clause};\n")
+            f.write("\nCOMMIT;\n")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return reports
+
+
+def export_tables(tables: List[Dict], path: str, dialect: str = "sqlite", batch_rows: int = BATCH_ROWS) -> Dict:
+    """
+    Exports `tables` to `path` ("sqlite": database file, "postgres": psql
+    script). Returns a report with the DDL, per-table rows, seconds and
+    rows/sec, the keys declared and notes on keys left out.
+    """
+    if dialect not in DIALECTS:
+        raise ValueError(f"Unknown SQL dialect '{dialect}'")
+    started = time.perf_counter()
+    plans = plan_tables(tables)
+    if dialect == "sqlite":
+        reports = load_sqlite(plans, path, batch_rows)
+    else:
+        reports = write_postgres_script(plans, path, batch_rows)
+    seconds = time.perf_counter() - started
+    rows = sum(report["rows"] for report in reports)
+    return {
+        "dialect": dialect,
+        "path": path,
+        "ddl": schema_sql(plans, dialect),
+        "tables": reports,
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+        "bytes": os.path.getsize(path)
+    }
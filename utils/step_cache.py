@@ -0,0 +1,149 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from utils.columnar_store import read_frame, write_frame
+
+_digest_memo: Dict[str, Tuple[float, int, str]] = {}
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, memoized on (path, mtime, size)."""
+    stat = os.stat(path)
+    memo = _digest_memo.get(path)
+    if memo and memo[0] == stat.st_mtime and memo[1] == stat.st_size:
+        return memo[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digest_memo[path] = (stat.st_mtime, stat.st_size, digest)
+    return digest
+
+
+def remember_digest(path: str, digest: str) -> None:
+    """Records a digest computed while the file was written, so file_digest need not read it again."""
+    stat = os.stat(path)
+    _digest_memo[path] = (stat.st_mtime, stat.st_size, digest)
+
+
+def entry_size(entry: Dict) -> int:
+    """Approximate in-memory size of a cached step state in bytes."""
+    size = 0
+    df = entry.get("df")
+    if isinstance(df, pd.DataFrame):
+        size += int(df.memory_usage(index=True, deep=True).sum())
+    for table in entry.get("tables") or []:
+        if isinstance(table.get("df"), pd.DataFrame):
+            size += int(table["df"].memory_usage(index=True, deep=True).sum())
+    size += len(pickle.dumps(entry.get("result", {}), protocol=pickle.HIGHEST_PROTOCOL))
+    return size
+
+
+class StepCache:
+    """
+    Caches the state after each step prefix of a pipeline run, keyed by
+    (upload content hash, step prefix). Entries hold the intermediate
+    DataFrame and artifacts (FDs, tables, per-step results). When the
+    in-memory total exceeds `max_bytes`, least recently used entries are
+    spilled to `spill_folder` (the DataFrame in columnar form, the rest
+    pickled) and loaded back on demand.
+
+    Cached states are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, spill_folder: str, max_bytes: int = 512 * 1024 * 1024):
+        self.spill_folder = spill_folder
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Tuple[Dict, int]]" = OrderedDict()
+        self._spilled: Dict[str, str] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        os.makedirs(spill_folder, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, steps: List[str]) -> str:
+        return hashlib.sha256(f"{content_hash}|{'/'.join(steps)}".encode()).hexdigest()
+
+    def get(self, content_hash: str, steps: List[str]) -> Optional[Dict]:
+        key = self.make_key(content_hash, steps)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key][0]
+            path = self._spilled.get(key)
+            if path is None:
+                return None
+            try:
+                with open(path, "rb") as f:
+                    entry = pickle.load(f)
+                if entry.get("df_path"):
+                    entry["df"] = read_frame(entry.pop("df_path"))
+            except (OSError, pickle.UnpicklingError, EOFError):
+                self._drop_spilled(key)
+                return None
+            # Back in memory: spilled again (from this copy) if it is evicted again
+            self._drop_spilled(key)
+            self._insert(key, entry)
+            return entry
+
+    def put(self, content_hash: str, steps: List[str], entry: Dict) -> None:
+        key = self.make_key(content_hash, steps)
+        with self._lock:
+            if key in self._memory:
+                self._bytes -= self._memory.pop(key)[1]
+            self._drop_spilled(key)
+            self._insert(key, entry)
+
+    def longest_prefix(self, content_hash: str, steps: List[str]) -> Tuple[int, Optional[Dict]]:
+        """Returns (number of cached steps, cached state) for the longest cached prefix of `steps`."""
+        for n in range(len(steps), 0, -1):
+            entry = self.get(content_hash, steps[:n])
+            if entry is not None:
+                return n, entry
+        return 0, None
+
+    def _insert(self, key: str, entry: Dict) -> None:
+        size = entry_size(entry)
+        self._memory[key] = (entry, size)
+        self._bytes += size
+        self._evict(keep=key)
+
+    def _evict(self, keep: str) -> None:
+        while self._bytes > self.max_bytes and len(self._memory) > 1:
+            key, (entry, size) = next(iter(self._memory.items()))
+            if key == keep:
+                self._memory.move_to_end(key)
+                continue
+            del self._memory[key]
+            self._bytes -= size
+            path = os.path.join(self.spill_folder, f"{key}.pkl")
+            spilled = dict(entry)
+            if isinstance(spilled.get("df"), pd.DataFrame):
+                try:
+                    spilled["df_path"] = write_frame(
+                        spilled["df"], os.path.join(self.spill_folder, f"{key}.feather")
+                    )
+                    del spilled["df"]
+                except (TypeError, ValueError, NotImplementedError):
+                    # Mixed-type object columns (and types pyarrow cannot write, raised as
+                    # ArrowNotImplementedError) have no Arrow form; pickle them instead
+                    pass
+            with open(path, "wb") as f:
+                pickle.dump(spilled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._spilled[key] = path
+
+    def _drop_spilled(self, key: str) -> None:
+        """Forgets the spilled copy of an entry and removes its files."""
+        if self._spilled.pop(key, None) is None:
+            return
+        for ext in (".pkl", ".feather"):
+            try:
+                os.remove(os.path.join(self.spill_folder, f"{key}{ext}"))
+            except OSError:
+                pass
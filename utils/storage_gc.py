@@ -0,0 +1,118 @@
+"""
+Retention policy for the files the app accumulates: uploads and the
+intermediates derived from them, spilled step-cache states, job profiles,
+FD results, rendered ER diagrams and SQL exports.
+
+    python -m utils.storage_gc uploads static/er_diagrams static/sql_exports \\
+        --max-age-days 7 --max-gb 5
+
+Only files the app names itself are considered: names starting with a hex
+digest or uuid (optionally after `er_` or `tmp_`), so files put in these
+folders by hand are left alone. Files unused for longer than the maximum
+age are removed, then the least recently used until the total fits the
+disk budget. Removing an upload removes everything derived from it. Files
+used within the minimum age are never removed, so work in progress keeps
+its inputs.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANAGED_NAME = re.compile(r"(?:er_|tmp_)?[0-9a-f]{32}")
+# Content-addressed uploads (see utils.upload_store); their derived files share the digest prefix
+UPLOAD_NAME = re.compile(r"([0-9a-f]{64})\.csv")
+MIN_AGE_SECONDS = 3600
+
+
+def _last_used(stat: os.stat_result) -> float:
+    # Uploads are marked as used through their access time
+    return max(stat.st_atime, stat.st_mtime)
+
+
+def managed_files(folders: Iterable[str]) -> List[Tuple[float, int, str]]:
+    """(last used, size, path) of the managed files under `folders`, least recently used first."""
+    files = []
+    for folder in folders:
+        for dirpath, _, names in os.walk(folder):
+            for name in names:
+                if not MANAGED_NAME.match(name):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((_last_used(stat), stat.st_size, path))
+    return sorted(files)
+
+
+def collect_garbage(folders: Iterable[str], max_age_seconds: Optional[float] = None,
+                    max_bytes: Optional[int] = None, min_age_seconds: float = MIN_AGE_SECONDS,
+                    now: Optional[float] = None) -> Dict:
+    """
+    Applies the retention policy to `folders`. Returns the number and size
+    of the files removed and of the files kept.
+    """
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    files = managed_files(folders)
+    sizes = {path: size for _, size, path in files}
+    last_used = {path: used for used, _, path in files}
+    total = sum(sizes.values())
+    removed: Dict[str, int] = {}
+
+    def remove(path: str) -> None:
+        nonlocal total
+        if path in removed or path not in sizes:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        removed[path] = sizes[path]
+        total -= sizes[path]
+        match = UPLOAD_NAME.fullmatch(os.path.basename(path))
+        if match:
+            prefix = os.path.join(os.path.dirname(path), match.group(1))
+            for derived in [p for p in sizes if p.startswith(prefix)]:
+                if now - last_used[derived] >= min_age_seconds:
+                    remove(derived)
+
+    for used, _, path in files:
+        if now - used < min_age_seconds:
+            break  # The rest were used more recently
+        expired = max_age_seconds is not None and now - used > max_age_seconds
+        if expired or (max_bytes is not None and total > max_bytes):
+            remove(path)
+    return {
+        "files_removed": len(removed),
+        "bytes_removed": sum(removed.values()),
+        "files_kept": len(sizes) - len(removed),
+        "bytes_kept": total,
+        "seconds": round(time.perf_counter() - started, 6)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folders", nargs="+")
+    parser.add_argument("--max-age-days", type=float, default=None)
+    parser.add_argument("--max-gb", type=float, default=None, help="disk budget of the managed files")
+    parser.add_argument("--min-age-hours", type=float, default=MIN_AGE_SECONDS / 3600)
+    args = parser.parse_args(argv)
+    report = collect_garbage(
+        args.folders,
+        max_age_seconds=args.max_age_days * 86400 if args.max_age_days is not None else None,
+        max_bytes=int(args.max_gb * 1024 ** 3) if args.max_gb is not None else None,
+        min_age_seconds=args.min_age_hours * 3600
+    )
+    print(f"removed {report['files_removed']} files ({report['bytes_removed']} bytes), "
+          f"kept {report['files_kept']} ({report['bytes_kept']} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Content-addressed storage of uploaded CSV files.
+
+An upload is streamed to disk in chunks while its SHA-256 is computed and
+is then stored as `<sha256>.csv`, so the same file uploaded twice (under
+any name) is stored once, and everything derived from it (the columnar
+frame, step intermediates, cached step states) is reused. `uploads.json`
+remembers which contents were uploaded under which file name, so a new
+version of a file can be compared with the previous one.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, Optional
+
+from utils.step_cache import remember_digest
+
+CHUNK_SIZE = 1 << 20
+INDEX_NAME = "uploads.json"
+# Versions remembered per file name
+INDEX_MAX_VERSIONS = 20
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the store's size limit; nothing is kept."""
+
+
+class UploadStore:
+    """
+    Uploads in `folder`, named by the SHA-256 of their content. Uploads
+    larger than `max_bytes` are refused as soon as the limit is passed.
+    """
+
+    def __init__(self, folder: str, max_bytes: Optional[int] = None, chunk_size: int = CHUNK_SIZE):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        return os.path.abspath(os.path.join(self.folder, f"{digest}.csv"))
+
+    def save(self, stream: BinaryIO, filename: str) -> Dict:
+        """
+        Streams `stream` into the store. Returns the stored path, the
+        content digest and size, whether the content was already stored,
+        and the path of the previous upload under the same file name
+        (None for a first upload).
+        """
+        h = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.folder, f"tmp_{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b""):
+                    size += len(chunk)
+                    if self.max_bytes is not None and size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds the limit of {self.max_bytes} bytes.")
+                    h.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        digest = h.hexdigest()
+        path = self.path_for(digest)
+        with self._lock:
+            deduplicated = os.path.exists(path)
+            if deduplicated:
+                os.remove(tmp_path)
+                self.touch(path)
+            else:
+                os.replace(tmp_path, path)
+            remember_digest(path, digest)
+            previous = self._record(filename, digest)
+        return {"path": path, "digest": digest, "size": size, "deduplicated": deduplicated,
+                "previous": previous}
+
+    @staticmethod
+    def touch(path: str) -> None:
+        """
+        Marks an upload as used, for the retention policy. Only the access
+        time changes: derived files are reused while newer than the upload.
+        """
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(os.path.join(self.folder, INDEX_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, filename: str, digest: str) -> Optional[str]:
+        """Adds an upload of `filename` to the index; returns the previous upload still stored."""
+        index = self._load_index()
+        # Uploads removed by the retention policy are forgotten
+        versions = [v for v in index.get(filename, []) if os.path.exists(self.path_for(v["digest"]))]
+        previous = self.path_for(versions[-1]["digest"]) if versions else None
+        versions.append({"digest": digest, "uploaded": time.time()})
+        index[filename] = versions[-INDEX_MAX_VERSIONS:]
+        index = {name: v for name, v in index.items()
+                 if name == filename or any(os.path.exists(self.path_for(e["digest"])) for e in v)}
+        path = os.path.join(self.folder, INDEX_NAME)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+        return previous